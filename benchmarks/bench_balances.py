@@ -0,0 +1,84 @@
+import random
+import time
+import tracemalloc
+
+from cryptrade.history import BalanceHistory
+
+CURRENCIES = 20
+UPDATES = 200000
+
+
+def balances() -> list:
+    # an update every 10 seconds, most of them change nothing or one or two currencies
+    random.seed(0)
+    balance = {f"C{i}": random.uniform(0, 1000) for i in range(CURRENCIES)}
+    result = []
+    for _ in range(UPDATES):
+        for _ in range(random.choice([0, 0, 1, 2])):
+            balance[f"C{random.randrange(CURRENCIES)}"] = random.uniform(0, 1000)
+        result.append(dict(balance))
+    return result
+
+
+def dict_history(updates: list) -> list:
+    # a copy of every balance, what the account monitor would need to keep them right
+    return [{"time": i * 10000000000, "balance": dict(balance)} for i, balance in enumerate(updates)]
+
+
+def balance_history(updates: list) -> BalanceHistory:
+    history = BalanceHistory(max_bytes=1 << 30)
+    for i, balance in enumerate(updates):
+        history.append(i * 10000000000, balance)
+    return history
+
+
+def allocated(factory, updates: list) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = factory(updates)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def timed(function, queries: list) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main() -> None:
+    updates = balances()
+    entries, dict_size, _ = allocated(dict_history, updates)
+    history, history_size, elapsed = allocated(balance_history, updates)
+    print(f"{UPDATES} updates of {CURRENCIES} currencies, {len(history)} of them changed something")
+    print(f"dict list      : {dict_size / UPDATES:8.1f} bytes/update")
+    print(f"BalanceHistory : {history_size / UPDATES:8.1f} bytes/update ({history.nbytes / UPDATES:.1f} in arrays), "
+          f"{elapsed / UPDATES * 1e6:.1f} us/append")
+
+    random.seed(1)
+    queries = [random.randrange(UPDATES * 10000000000) for _ in range(2000)]
+
+    def scan(timestamp: int) -> dict:
+        balance = None
+        for entry in entries:
+            if entry["time"] > timestamp:
+                break
+            balance = entry["balance"]
+        return balance
+
+    same = all(history.balance(query) == scan(query) for query in queries[:100])
+    print(f"as of lookup   : {timed(history.balance, queries) * 1e6:8.1f} us "
+          f"(scan {timed(scan, queries[:100]) * 1e6:.1f} us), {'same' if same else 'DIFFERENT'}")
+
+    bounded = BalanceHistory(retention=86400, max_bytes=64 * 1024)
+    for i, balance in enumerate(updates):
+        bounded.append(i * 10000000000, balance)
+    print(f"1 day, 64 KiB  : {len(bounded)} records, {bounded.nbytes} bytes, "
+          f"{(bounded.newest - bounded.oldest) / 3.6e12:.1f} hours")
+
+
+if __name__ == "__main__":
+    main()
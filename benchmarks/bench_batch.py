@@ -0,0 +1,49 @@
+import time
+
+import numpy as np
+
+from cryptrade.exchange_api import TradeClient, Currency, Product
+
+DETAILS = {"min_order_amount": 0.0001, "min_order_price": 0.01, "min_order_value": 10.0,
+           "order_price_precision": 0.01, "order_amount_precision": 1e-05}
+
+
+def scalar_ladder(product: Product, prices: list, amounts: list) -> tuple:
+    # one call per level for price, amount and validity
+    formatted_prices = [product.format_price(price) for price in prices]
+    formatted_amounts = [product.format_amount(amount) for amount in amounts]
+    valid = [product.valid(amount, price) for price, amount in zip(formatted_prices, formatted_amounts)]
+    return formatted_prices, formatted_amounts, valid
+
+
+def timed(function, *args) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    product = Product(TradeClient(), Currency("BTC"), Currency("EUR"))
+    product._set_details(DETAILS)
+
+    print(f"{'levels':>7} {'scalar (us)':>12} {'batch (us)':>11} {'mismatches':>11}")
+    for levels in [200, 1000, 10000, 100000]:
+        # a grid below the market with amounts around the minimum value
+        prices = np.linspace(30000.0, 20000.0, levels) + np.random.default_rng(levels).uniform(0, 0.01, levels)
+        amounts = np.random.default_rng(levels + 1).uniform(0.0, 0.001, levels)
+
+        scalar = scalar_ladder(product, prices.tolist(), amounts.tolist())
+        batch = product.format_batch(prices, amounts)
+        mismatches = sum(1 for i in range(levels) if (scalar[0][i], scalar[1][i], scalar[2][i]) !=
+                         (batch[0][i], batch[1][i], bool(batch[2][i])))
+
+        scalar_time = timed(scalar_ladder, product, prices.tolist(), amounts.tolist())
+        batch_time = timed(product.format_batch, prices, amounts)
+        print(f"{levels:7d} {scalar_time * 1e6:12.1f} {batch_time * 1e6:11.1f} {mismatches:11d}")
+
+
+if __name__ == "__main__":
+    main()
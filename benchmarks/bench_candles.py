@@ -0,0 +1,79 @@
+import random
+import time
+
+from cryptrade.candles import CandleAggregator, TIMEFRAMES
+
+PRODUCTS = 10
+TICKS = 500000
+
+
+class NaiveCandles:
+    # every tick updates the bar of every timeframe, kept as a reference point
+    def __init__(self, timeframes: tuple) -> None:
+        self._timeframes = timeframes
+        self._bars = {}
+        # (product, timeframe) -> closed bars
+        self.closed = {}
+
+    def add(self, product: str, timestamp: float, price: float, volume: float) -> None:
+        bars = self._bars.setdefault(product, {})
+        for timeframe in self._timeframes:
+            start = int(timestamp // timeframe) * timeframe
+            bar = bars.get(timeframe)
+            if bar is None or bar[0] != start:
+                if bar is not None:
+                    self.closed.setdefault((product, timeframe), []).append(bar)
+                bars[timeframe] = [start, price, price, price, price, volume]
+            else:
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                bar[5] += volume
+
+
+def ticks() -> list:
+    # a few ticks per second over all products, like a busy day on a handful of markets
+    random.seed(PRODUCTS)
+    prices = [random.uniform(1, 50000) for _ in range(PRODUCTS)]
+    timestamp = 1.6e9
+    result = []
+    for _ in range(TICKS):
+        timestamp += random.expovariate(20)
+        product = random.randrange(PRODUCTS)
+        prices[product] *= 1 + random.gauss(0, 0.0002)
+        result.append((f"P{product}-EUR", timestamp, prices[product], random.uniform(0.001, 1.0)))
+    return result
+
+
+def timed(candles, updates: list) -> float:
+    add = candles.add
+    start = time.perf_counter()
+    for update in updates:
+        add(*update)
+    return (time.perf_counter() - start) / len(updates)
+
+
+def main() -> None:
+    updates = ticks()
+    hours = (updates[-1][1] - updates[0][1]) / 3600
+    print(f"{TICKS} ticks of {PRODUCTS} products over {hours:.1f} hours, timeframes {TIMEFRAMES}")
+    aggregator = CandleAggregator(TIMEFRAMES, capacity=100000)
+    cascade = timed(aggregator, updates)
+    naive = NaiveCandles(TIMEFRAMES)
+    every = timed(naive, updates)
+    print(f"  cascading: {cascade * 1e9:7.0f} ns/tick")
+    print(f"  naive    : {every * 1e9:7.0f} ns/tick (every timeframe on every tick)")
+
+    # both build the same bars
+    product = updates[0][0]
+    for timeframe in TIMEFRAMES:
+        history = aggregator.history(product, timeframe).slice()
+        bars = {bar[0]: bar for bar in naive.closed.get((product, timeframe), [])}
+        same = all(time_ in bars and (round(high, 6), round(low, 6)) == (round(bars[time_][2], 6),
+                                                                         round(bars[time_][3], 6))
+                   for time_, high, low in zip(history.time, history.high, history.low))
+        print(f"  {timeframe:6d}s: {len(history.time):6d} closed bars, {'same' if same else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import requests
+
+from cryptrade.connections import ConnectionPool
+
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+# a few bots sharing one exchange, each doing a number of requests
+CLIENTS = 8
+REQUESTS = 50
+
+
+class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive, like the exchanges do
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        body = b'{"bid": "9999.0", "ask": "10001.0", "price": "10000.0"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def start_server(directory: str) -> ThreadingHTTPServer:
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-addext", "subjectAltName=IP:127.0.0.1",
+                    "-keyout", key, "-out", cert], check=True, capture_output=True)
+    # requests verifies against this bundle, also for the sessions created by the connection pool
+    os.environ["REQUESTS_CA_BUNDLE"] = cert
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(sessions: list, url: str) -> list:
+    latencies = []
+    for _ in range(REQUESTS):
+        for session in sessions:
+            start = time.perf_counter()
+            (session() if callable(session) else session).get(url + "/ticker").json()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<26}: p50 {p50 * 1000:6.2f} ms, p99 {p99 * 1000:6.2f} ms")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        server = start_server(directory)
+        url = f"https://127.0.0.1:{server.server_address[1]}"
+
+        # every request on a fresh session, i.e. a TCP and TLS handshake each time
+        report("new connection / request", measure([requests.Session] * CLIENTS, url))
+
+        # every client its own session, one handshake per client and no sharing
+        report("session per client", measure([requests.Session() for _ in range(CLIENTS)], url))
+
+        # all clients on the shared, pre-warmed pool
+        ConnectionPool.configure(pool_size=CLIENTS)
+        ConnectionPool.prewarm(url, CLIENTS)
+        report("shared pre-warmed pool", measure([ConnectionPool.mount(requests.Session(), url)
+                                                   for _ in range(CLIENTS)], url))
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
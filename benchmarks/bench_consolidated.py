@@ -0,0 +1,61 @@
+import random
+import time
+
+from cryptrade.consolidated import ConsolidatedQuote
+
+PRODUCTS = 40
+UPDATES = 200000
+
+
+class ScanQuote:
+    # best bid and ask by scanning all venues on every update, kept as a reference point
+    def __init__(self, threshold: float, max_age: float) -> None:
+        self._threshold = threshold
+        self._max_age = max_age
+        self._quotes = {}
+
+    def update(self, product: str, venue: str, bid: float, ask: float, timestamp: float, fee: float = 0.0):
+        quotes = self._quotes.setdefault(product, {})
+        quotes[venue] = (bid * (1 - fee), ask * (1 + fee), timestamp)
+        newest = max(quote[2] for quote in quotes.values())
+        fresh = {venue: quote for venue, quote in quotes.items() if newest - quote[2] <= self._max_age}
+        sell = max(fresh, key=lambda venue: fresh[venue][0])
+        buy = min(fresh, key=lambda venue: fresh[venue][1])
+        return sell != buy and fresh[sell][0] - fresh[buy][1] >= self._threshold * fresh[buy][1]
+
+
+def ticks(venues: int) -> list:
+    # every venue quotes every product around its own slowly moving price, now and then a venue is off
+    random.seed(venues)
+    mids = [random.uniform(1, 50000) for _ in range(PRODUCTS)]
+    result = []
+    for i in range(UPDATES):
+        product = random.randrange(PRODUCTS)
+        mid = mids[product] * (1 + random.gauss(0, 0.0002) + (0.01 if random.random() < 0.001 else 0))
+        result.append((f"P{product}-EUR", f"venue{random.randrange(venues)}", mid * 0.9999, mid * 1.0001,
+                       i * 0.01, 0.001))
+    return result
+
+
+def per_update(quote, updates: list) -> tuple:
+    opportunities = 0
+    start = time.perf_counter()
+    for update in updates:
+        if quote.update(*update):
+            opportunities += 1
+    return (time.perf_counter() - start) / len(updates), opportunities
+
+
+def main() -> None:
+    print(f"{'venues':>7} {'sorted (us)':>12} {'scan (us)':>10} {'opened':>14}")
+    for venues in [4, 16, 64, 256]:
+        updates = ticks(venues)
+        consolidated = ConsolidatedQuote(threshold=0.002, max_age=5.0)
+        # the consolidated quote reports an opportunity once, when it opens
+        sorted_time, opened = per_update(consolidated, updates)
+        scan_time, _ = per_update(ScanQuote(0.002, 5.0), updates)
+        print(f"{venues:7d} {sorted_time * 1e6:12.2f} {scan_time * 1e6:10.2f} {opened:14d}")
+
+
+if __name__ == "__main__":
+    main()
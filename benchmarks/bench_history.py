@@ -0,0 +1,60 @@
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from cryptrade.history import TickHistory, np
+
+
+def dict_history(samples: int) -> list:
+    start = datetime.now()
+    return [{"time": start + timedelta(seconds=i), "ask": 1.0 + i, "bid": 0.5 + i, "price": 0.75 + i}
+            for i in range(samples)]
+
+
+def tick_history(samples: int) -> TickHistory:
+    history = TickHistory(samples)
+    for i in range(samples):
+        history.append(i * 1000000000, 1.0 + i, 0.5 + i, 0.75 + i)
+    return history
+
+
+def allocated(factory, samples: int) -> int:
+    tracemalloc.start()
+    result = factory(samples)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def timed(function, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    samples = 100000
+    print(f"backend: {'numpy' if np is not None else 'array'}")
+    print(f"dict list   : {allocated(dict_history, samples) / samples:8.1f} bytes/tick")
+    print(f"TickHistory : {allocated(tick_history, samples) / samples:8.1f} bytes/tick")
+
+    random.seed(0)
+    history = TickHistory(samples)
+    price = 30000.0
+    for i in range(samples + samples // 3):
+        price += random.gauss(0, 5)
+        history.append(i * 1000000000, price + 1, price - 1, price)
+
+    t0 = history.oldest + (history.newest - history.oldest) // 4
+    t1 = history.newest - (history.newest - history.oldest) // 4
+    print(f"slice       : {timed(lambda: history.slice(t0, t1)) * 1e6:10.1f} us")
+    print(f"resample 1m : {timed(lambda: history.resample(60 * 1000000000)) * 1e6:10.1f} us")
+    print(f"percentile  : {timed(lambda: history.percentile(95)) * 1e6:10.1f} us")
+    print(f"returns     : {timed(lambda: history.returns(t0, t1)) * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
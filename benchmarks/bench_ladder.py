@@ -0,0 +1,73 @@
+import asyncio
+import itertools
+import time
+
+from cryptrade.exchange_api import TradeClient, Currency, Product, Order, ApiCreator
+from cryptrade.ladder import Ladder, fixed_amount
+from cryptrade.scheduler import PRIORITY_TRADE
+
+# simulated round-trip of an order placement
+LATENCY = 0.05
+LEVELS = 25
+
+
+class SimClient(TradeClient):
+    _max_workers = 16
+    # 50 orders per second, a burst of 20
+    _rate_limits = {"orders": (20, 50)}
+    _request_costs = {"order": (PRIORITY_TRADE, {"orders": 1})}
+
+
+class SimOrder(Order):
+    _ids = itertools.count(1)
+
+    def __init__(self, auth_client: TradeClient, product: Product, order_type: str, price: float,
+                 amount: float) -> None:
+        super().__init__(auth_client, product, order_type, price, amount)
+        self._auth_client.request("order", time.sleep, LATENCY)
+        self._created = True
+        self._order_id = next(SimOrder._ids)
+
+
+class SimApiCreator(ApiCreator):
+    @staticmethod
+    def create_order(auth_client: TradeClient, product: Product, order_type: str, price: float,
+                     amount: float) -> SimOrder:
+        return SimOrder(auth_client, product, order_type, price, amount)
+
+
+def serial(client: TradeClient, product: Product) -> float:
+    # the former way: one blocking order after the other
+    start = time.perf_counter()
+    for level in range(1, LEVELS + 1):
+        SimApiCreator.create_order(client, product, "buy", 30000.0 - level * 10, 0.001)
+        SimApiCreator.create_order(client, product, "sell", 30000.0 + level * 10, 0.001)
+    return time.perf_counter() - start
+
+
+async def concurrent(client: TradeClient, product: Product) -> Ladder:
+    api_factory = SimApiCreator()
+    executions = api_factory.create_execution_stream(client, api_factory.create_order_manager(client), [product])
+    ladder = Ladder(api_factory, client, product, executions, 30000.0, 10.0, LEVELS, fixed_amount(0.001))
+    await ladder.place()
+    return ladder
+
+
+def main() -> None:
+    client = SimClient()
+    product = Product(client, Currency("BTC"), Currency("EUR"))
+
+    print(f"{2 * LEVELS} legs, {LATENCY * 1000:.0f} ms per placement, at most 50 orders/s")
+    print(f"serial placement : {serial(SimClient(), product) * 1000:7.1f} ms")
+
+    start = time.perf_counter()
+    ladder = asyncio.run(concurrent(client, product))
+    elapsed = time.perf_counter() - start
+    latencies = ladder.latencies()
+    print(f"ladder placement : {elapsed * 1000:7.1f} ms, {len(ladder.live)} live levels")
+    print(f"per leg          : p50 {latencies['p50'] * 1000:.1f} ms, p99 {latencies['p99'] * 1000:.1f} ms")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
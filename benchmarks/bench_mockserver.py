@@ -0,0 +1,92 @@
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.scheduler import RequestScheduler
+from cryptrade.mockserver import MockExchangeServer
+from cryptrade.coinbase import CBApiCreator
+from cryptrade.binance import BinApiCreator
+from cryptrade.kraken import KrakenApiCreator
+from cryptrade.bitfinex import BfxApiCreator
+
+CYCLES = 200
+WORKERS = 8
+EXCHANGES = {"coinbase": CBApiCreator, "binance": BinApiCreator, "kraken": KrakenApiCreator,
+             "bitfinex": BfxApiCreator}
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if len(values) > 0 else 0.0
+
+
+def load(api_factory, credentials: dict) -> tuple:
+    # every worker repeatedly polls the ticker, places an order below the market, checks it and cancels it
+    client = api_factory.create_trade_client(credentials, WORKERS)
+    # the client's own rate limits would be all that is measured, the mock server's limits apply instead
+    client._scheduler = RequestScheduler({}, {})
+    product = api_factory.create_product(client, api_factory.create_currency("BTC"),
+                                         api_factory.create_currency("EUR"))
+    timings = {operation: [] for operation in ["ticker", "order", "status", "cancel", "account"]}
+    failures = {"order": 0}
+
+    def timed(operation: str, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        timings[operation].append(time.perf_counter() - start)
+        return result
+
+    def cycle(_) -> None:
+        ticker = api_factory.create_ticker(client, product)
+        timed("ticker", ticker.update)
+        if ticker.bid is None:
+            failures["order"] += 1
+            return
+        order = timed("order", api_factory.create_order, client, product, "buy", ticker.bid * 0.99, 0.001)
+        if not order.created:
+            failures["order"] += 1
+            return
+        timed("status", order.status)
+        timed("cancel", order.cancel)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(WORKERS) as executor:
+        list(executor.map(cycle, range(CYCLES)))
+    account = api_factory.create_account(client)
+    for _ in range(CYCLES // 10):
+        timed("account", account.update)
+    elapsed = time.perf_counter() - start
+    client.close()
+    return timings, failures, elapsed
+
+
+def run(server: MockExchangeServer, title: str) -> None:
+    print(title)
+    for name, api_factory in EXCHANGES.items():
+        before = server.statistics[name]
+        timings, failures, elapsed = load(api_factory, server.credentials())
+        after = server.statistics[name]
+        requests = after["requests"] - before["requests"]
+        print(f"  {name:9}: {requests / elapsed:7.0f} requests/s, {failures['order']:3d} of {CYCLES} cycles failed, "
+              f"{after['errors'] - before['errors']} errors, {after['rate_limited'] - before['rate_limited']} "
+              f"rate limited")
+        print("             " + ", ".join(f"{operation} p50 {percentile(values, 0.5) * 1e3:.1f} / "
+                                          f"p99 {percentile(values, 0.99) * 1e3:.1f} ms"
+                                          for operation, values in timings.items()))
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        # keeps the mock products out of the real product cache
+        ProductCatalogue.configure(cache_dir=directory)
+        with MockExchangeServer(seed=1) as server:
+            run(server, "no latency")
+            server.configure(latency=0.005, jitter=0.002)
+            run(server, "5 ms latency, 2 ms jitter")
+            server.configure(error_rate=0.02, rate_limit_rate=0.02)
+            run(server, "5 ms latency, 2 ms jitter, 2% errors, 2% rate limited")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import random
+import time
+
+from cryptrade.rolling import RollingWindow
+
+
+class ListWindow:
+    # the former TickerMonitor bookkeeping, kept as a reference point
+    def __init__(self, time_window: float) -> None:
+        self._time_window = time_window
+        self._ticker_data = []
+        self.high = self.low = self.average = 0.0
+
+    def fill(self, ticks: list) -> None:
+        # adding them one by one recomputes the statistics every time, quadratic in the window size
+        self._ticker_data = [{"time": timestamp, "ask": ask, "bid": bid, "price": price}
+                             for timestamp, price, bid, ask in ticks]
+
+    def add(self, timestamp: float, price: float, bid: float = 0.0, ask: float = 0.0) -> None:
+        while len(self._ticker_data) > 0 and timestamp - self._ticker_data[0]["time"] > self._time_window:
+            self._ticker_data.pop(0)
+        self._ticker_data.append({"time": timestamp, "ask": ask, "bid": bid, "price": price})
+        prices = [data["price"] for data in self._ticker_data]
+        self.high = max(prices)
+        self.low = min(prices)
+        self.average = sum(prices) / len(prices)
+
+
+def check(seed: int = 1, ticks: int = 5000) -> None:
+    # the window against the ticks it should hold, with ticks out of order and a ring that fills up
+    window = RollingWindow(1e6, capacity=4)
+    for price, timestamp in enumerate([100, 101, 102, 103, 50, 104]):
+        window.add(float(timestamp), float(price + 1))
+    assert (len(window), window.low, window.high) == (4, 3.0, 6.0), (len(window), window.low, window.high)
+
+    random.seed(seed)
+    for time_window, capacity in [(5.0, 1000), (50.0, 16), (0.5, 4)]:
+        window = RollingWindow(time_window, capacity=capacity)
+        expected = []
+        timestamp = 0.0
+        for _ in range(ticks):
+            timestamp += random.choice([0.0, 0.25, 1.0, -2.0])
+            price, bid, volume = random.uniform(90, 110), random.uniform(88, 90), random.uniform(0, 3)
+            window.add(timestamp, price, bid, price, volume)
+            spread = price - bid
+
+            now = max([timestamp] + [tick[0] for tick in expected[-1:]])
+            expected = [tick for tick in expected if tick[0] >= now - time_window][-(capacity - 1):]
+            expected.append((now, price, spread, volume))
+            prices = [tick[1] for tick in expected]
+            spreads = [tick[2] for tick in expected]
+            volume = sum(tick[3] for tick in expected)
+            assert len(window) == len(expected)
+            assert (window.high, window.low) == (max(prices), min(prices))
+            assert (window.max_spread, window.min_spread) == (max(spreads), min(spreads))
+            assert abs(window.average - sum(prices) / len(prices)) < 1e-6
+            assert abs(window.average_spread - sum(spreads) / len(spreads)) < 1e-6
+            if volume > 1e-3:
+                assert abs(window.vwap - sum(tick[1] * tick[3] for tick in expected) / volume) < 1e-4
+
+
+def per_tick(window, window_size: int, ticks: int) -> float:
+    random.seed(window_size)
+    price = 30000.0
+    warm_up = []
+    for t in range(window_size):
+        price += random.gauss(0, 5)
+        warm_up.append((float(t), price, price - 1, price + 1))
+    if hasattr(window, "fill"):
+        window.fill(warm_up)
+    else:
+        for tick in warm_up:
+            window.add(*tick)
+
+    start = time.perf_counter()
+    for t in range(window_size, window_size + ticks):
+        price += random.gauss(0, 5)
+        window.add(float(t), price, price - 1, price + 1)
+    return (time.perf_counter() - start) / ticks
+
+
+def main() -> None:
+    check()
+    print(f"{'window':>8} {'rolling (us/tick)':>18} {'list (us/tick)':>15}")
+    for window_size in [100, 1000, 10000, 100000]:
+        rolling = per_tick(RollingWindow(window_size - 1, capacity=window_size), window_size, 20000)
+        legacy = per_tick(ListWindow(window_size - 1), window_size, max(20, 2000000 // window_size))
+        print(f"{window_size:8d} {rolling * 1e6:18.3f} {legacy * 1e6:15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from cryptrade.observers import Observable, Observer, CONFLATE, DROP_OLDEST, BLOCK
+
+EVENTS = 1000
+
+
+class CountingObserver(Observer):
+    def __init__(self, observable: Observable, delay: float = 0.0, policy: int = CONFLATE, maxsize: int = 1) -> None:
+        self._policy = policy
+        self._maxsize = maxsize
+        self._delay = delay
+        self.count = 0
+        super().__init__(observable)
+
+    async def notify(self, observable: Observable) -> None:
+        self.count += 1
+        if self._delay > 0:
+            await asyncio.sleep(self._delay)
+
+
+async def fan_out(observers: int) -> float:
+    observable = Observable()
+    for _ in range(observers):
+        CountingObserver(observable)
+
+    start = time.perf_counter()
+    for _ in range(EVENTS):
+        await observable.notify()
+        await asyncio.sleep(0)
+    await observable.drain()
+    return (time.perf_counter() - start) / EVENTS
+
+
+async def slow_observer(policy: int) -> tuple:
+    observable = Observable()
+    fast = CountingObserver(observable)
+    slow = CountingObserver(observable, 0.01, policy, 10)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        await observable.notify()
+        await asyncio.sleep(0)
+    producer = time.perf_counter() - start
+    subscription = observable.subscription(slow)
+    await observable.drain()
+    return producer / 100, fast.count, slow.count, subscription.dropped
+
+
+def main() -> None:
+    print(f"{'observers':>10} {'us/event':>10}")
+    for observers in [1, 10, 100, 1000]:
+        print(f"{observers:10d} {asyncio.run(fan_out(observers)) * 1e6:10.1f}")
+
+    print(f"\n{'policy':>12} {'producer us/event':>18} {'fast':>5} {'slow':>5} {'dropped':>8}")
+    for name, policy in [("conflate", CONFLATE), ("drop oldest", DROP_OLDEST), ("block", BLOCK)]:
+        producer, fast, slow, dropped = asyncio.run(slow_observer(policy))
+        print(f"{name:>12} {producer * 1e6:18.1f} {fast:5d} {slow:5d} {dropped:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import random
+import tempfile
+import time
+import zlib
+
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.exceptions import SequenceError
+from cryptrade.mockserver import MockExchangeServer
+from cryptrade.orderbook import BookSide
+from cryptrade.coinbase import CBApiCreator, CBOrderBook
+from cryptrade.binance import BinApiCreator, BinOrderBook
+from cryptrade.kraken import KrakenApiCreator, KrakenOrderBook
+from cryptrade.bitfinex import BfxApiCreator, BfxOrderBook
+
+MESSAGES = 100000
+DEPTH = 100
+# price levels on either side of the mid the changes are spread over
+SPREAD = 2000
+MID = 30000.0
+TICK = 0.1
+EXCHANGES = {"coinbase": CBApiCreator, "binance": BinApiCreator, "kraken": KrakenApiCreator,
+             "bitfinex": BfxApiCreator}
+
+
+class ReferenceBook:
+    # the exchange's side of the stream: the book the messages are generated from
+    def __init__(self, rng: random.Random) -> None:
+        self._rng = rng
+        self.bids = {}
+        self.asks = {}
+        self.sequence = 0
+        self.last = None
+
+    def change(self) -> tuple:
+        # (is bid, price, size), a size of 0 removes the level
+        bid = self._rng.random() < 0.5
+        # most changes are close to the top of the book
+        distance = 1 + int(self._rng.expovariate(1 / 50)) % SPREAD
+        price = round(MID - distance * TICK if bid else MID + distance * TICK, 1)
+        levels = self.bids if bid else self.asks
+        if price in levels and self._rng.random() < 0.3:
+            size = 0.0
+            del levels[price]
+        else:
+            size = round(self._rng.uniform(0.001, 2.0), 8)
+            levels[price] = size
+        self.sequence += 1
+        self.last = (bid, price, size)
+        return bid, price, size
+
+    def fill(self, levels: int) -> None:
+        for _ in range(levels):
+            self.change()
+
+    def truncate(self, levels: int) -> None:
+        for side, reverse in [(self.bids, True), (self.asks, False)]:
+            for price in sorted(side, reverse=reverse)[levels:]:
+                del side[price]
+
+    def levels(self, depth: int = None) -> tuple:
+        return sorted(self.bids.items(), reverse=True)[:depth], sorted(self.asks.items())[:depth]
+
+
+def _text(price: float, size: float) -> list:
+    return [f"{price:.1f}", f"{size:.8f}"]
+
+
+class CoinbaseMessages:
+    def __init__(self, book: CBOrderBook, reference: ReferenceBook) -> None:
+        self._product_id = book.product.prod_id
+        self._reference = reference
+
+    def snapshot(self) -> str:
+        bids, asks = self._reference.levels()
+        return json.dumps({"type": "snapshot", "product_id": self._product_id,
+                           "bids": [_text(price, size) for price, size in bids],
+                           "asks": [_text(price, size) for price, size in asks]})
+
+    def update(self) -> tuple:
+        bid, price, size = self._reference.change()
+        return json.dumps({"type": "l2update", "product_id": self._product_id,
+                           "changes": [["buy" if bid else "sell"] + _text(price, size)],
+                           "time": "2020-01-01T00:00:00.000000Z"}), 1
+
+
+class BinanceMessages:
+    # events of 1 to 20 changes, like 100 ms of a busy market
+    def __init__(self, book: BinOrderBook, reference: ReferenceBook) -> None:
+        self._symbol = book.product.prod_id
+        self._reference = reference
+        self._rng = random.Random(2)
+
+    def snapshot(self) -> tuple:
+        bids, asks = self._reference.levels()
+        return [_text(price, size) for price, size in bids], [_text(price, size) for price, size in asks], \
+            self._reference.sequence
+
+    def update(self) -> tuple:
+        first = self._reference.sequence + 1
+        bids, asks = [], []
+        changes = self._rng.randint(1, 20)
+        for _ in range(changes):
+            bid, price, size = self._reference.change()
+            (bids if bid else asks).append(_text(price, size))
+        return json.dumps({"e": "depthUpdate", "E": 0, "s": self._symbol, "U": first,
+                           "u": self._reference.sequence, "b": bids, "a": asks}), changes
+
+
+class KrakenMessages:
+    def __init__(self, book: KrakenOrderBook, reference: ReferenceBook) -> None:
+        self._wsname = book._wsname
+        self._reference = reference
+        self._channel = f"book-{DEPTH}"
+
+    def snapshot(self) -> str:
+        self._reference.truncate(DEPTH)
+        bids, asks = self._reference.levels()
+        return json.dumps([0, {"as": [_text(price, size) + ["0.0"] for price, size in asks],
+                               "bs": [_text(price, size) + ["0.0"] for price, size in bids]},
+                           self._channel, self._wsname])
+
+    def _checksum(self) -> str:
+        bids, asks = self._reference.levels(10)
+        parts = []
+        for price, size in asks + bids:
+            parts += [text.replace(".", "").lstrip("0") for text in _text(price, size)]
+        return str(zlib.crc32("".join(parts).encode()))
+
+    def update(self) -> tuple:
+        bid, price, size = self._reference.change()
+        self._reference.truncate(DEPTH)
+        return json.dumps([0, {"b" if bid else "a": [_text(price, size) + ["0.0"]], "c": self._checksum()},
+                           self._channel, self._wsname]), 1
+
+
+class BitfinexMessages:
+    # one change per message, with a heartbeat now and then
+    def __init__(self, book: BfxOrderBook, reference: ReferenceBook) -> None:
+        self._reference = reference
+        self._channel = 17
+        self._sequence = 0
+
+    def subscribed(self) -> str:
+        return json.dumps({"event": "subscribed", "channel": "book", "chanId": self._channel})
+
+    def _next(self) -> int:
+        self._sequence += 1
+        return self._sequence
+
+    def snapshot(self) -> str:
+        bids, asks = self._reference.levels()
+        return json.dumps([self._channel, [[price, 1, size] for price, size in bids] +
+                           [[price, 1, -size] for price, size in asks], self._next()])
+
+    def update(self) -> tuple:
+        if self._sequence % 100 == 99:
+            return json.dumps([self._channel, "hb", self._next()]), 0
+        bid, price, size = self._reference.change()
+        if size == 0:
+            entry = [price, 0, 1 if bid else -1]
+        else:
+            entry = [price, 1, size if bid else -size]
+        return json.dumps([self._channel, entry, self._next()]), 1
+
+
+class ReplayBinOrderBook(BinOrderBook):
+    # the REST snapshot comes from the reference book instead of the exchange
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.messages = None
+
+    def _fetch(self) -> tuple:
+        return self.messages.snapshot()
+
+
+def matches(book, reference: ReferenceBook, depth: int = None) -> bool:
+    bids, asks = reference.levels(depth)
+    return book.bids.levels() == bids and book.asks.levels() == asks
+
+
+def subscribe(book, messages) -> None:
+    # what happens on (re)connecting, without the socket
+    book._subscriptions()
+    if isinstance(messages, BitfinexMessages):
+        book.feed(json.loads(messages.subscribed()))
+    book.feed(json.loads(messages.snapshot()))
+
+
+async def resync_binance(book: ReplayBinOrderBook, messages: BinanceMessages, texts: list) -> None:
+    # diffs keep arriving while the snapshot is fetched
+    for text in texts:
+        book.feed(json.loads(text))
+        if book.synced:
+            return
+        await asyncio.sleep(0.001)
+
+
+async def replay(name: str, book, messages) -> None:
+    reference = messages._reference
+    if isinstance(book, BinOrderBook):
+        book.messages = messages
+        book._subscriptions()
+        book._load(*messages.snapshot())
+    else:
+        subscribe(book, messages)
+
+    texts, changes = zip(*[messages.update() for _ in range(MESSAGES)])
+    start = time.perf_counter()
+    for text in texts:
+        book.feed(json.loads(text))
+    elapsed = time.perf_counter() - start
+    depth = DEPTH if isinstance(book, KrakenOrderBook) else None
+    print(f"  {name:9}: {MESSAGES / elapsed:9.0f} messages/s, {sum(changes) / elapsed:9.0f} level updates/s, "
+          f"{len(book.bids)}/{len(book.asks)} levels, {'in sync' if matches(book, reference, depth) else 'WRONG'}")
+
+    # a missed message
+    if isinstance(book, CBOrderBook):
+        print("             gaps: level2 has no sequence numbers, a new snapshot comes with every reconnect")
+        return
+    # one of the best 10 levels, Kraken's checksum doesn't cover the others
+    lost = 0
+    while True:
+        _, changes = messages.update()
+        lost += 1
+        if changes > 0 and abs(reference.last[1] - MID) <= 10 * TICK:
+            break
+    resyncs = book.resyncs
+    for received in range(1, 1001):
+        text, _ = messages.update()
+        try:
+            book.feed(json.loads(text))
+        except SequenceError:
+            # the stream subscribes again
+            subscribe(book, messages)
+            break
+        if isinstance(book, BinOrderBook) and not book.synced:
+            await resync_binance(book, messages, [messages.update()[0] for _ in range(100)])
+            break
+    outcome = "detected and resynced" if book.resyncs > resyncs else "missed"
+    print(f"             gaps: {lost} lost message(s) {outcome} at the next {received}, "
+          f"{'in sync' if matches(book, reference, depth) else 'WRONG'}")
+
+
+def queries(levels: int) -> None:
+    rng = random.Random(3)
+    side = BookSide(False)
+    prices = sorted(rng.sample(range(1, 100 * levels), levels))
+    for price in prices:
+        side.set(MID + price * TICK, round(rng.uniform(0.001, 2.0), 8))
+    total = side.depth()
+    book = side.levels()
+
+    def naive_vwap(size: float) -> float:
+        remaining, value = size, 0.0
+        for price, level_size in book:
+            taken = min(remaining, level_size)
+            value += taken * price
+            remaining -= taken
+            if remaining <= 0:
+                return value / size
+        return None
+
+    def timed(function, *args) -> float:
+        repeats = 2000
+        start = time.perf_counter()
+        for _ in range(repeats):
+            function(*args)
+        return (time.perf_counter() - start) / repeats * 1e6
+
+    size = total / 2
+    print(f"  {levels:6d} levels: vwap {timed(side.vwap, size):6.1f} us (walk {timed(naive_vwap, size):8.1f} us), "
+          f"depth(n/2) {timed(side.depth, levels // 2):5.1f} us, "
+          f"size within 1% {timed(side.size_within, MID * 1.01):5.1f} us, "
+          f"set {timed(side.set, MID + TICK * 7, 1.5):5.1f} us")
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        ProductCatalogue.configure(cache_dir=directory)
+        with MockExchangeServer(seed=1) as server:
+            print(f"replaying {MESSAGES} messages")
+            for name, api_factory in EXCHANGES.items():
+                client = api_factory.create_trade_client(server.credentials())
+                product = api_factory.create_product(client, api_factory.create_currency("BTC"),
+                                                     api_factory.create_currency("EUR"))
+                if name == "binance":
+                    book = ReplayBinOrderBook(client, product, DEPTH)
+                else:
+                    book = api_factory.create_order_book(client, product, DEPTH)
+                reference = ReferenceBook(random.Random(1))
+                reference.fill(4 * DEPTH)
+                messages = {"coinbase": CoinbaseMessages, "binance": BinanceMessages, "kraken": KrakenMessages,
+                            "bitfinex": BitfinexMessages}[name](book, reference)
+                await replay(name, book, messages)
+                client.close()
+
+    print("queries, against walking the levels")
+    for levels in [100, 1000, 10000]:
+        queries(levels)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
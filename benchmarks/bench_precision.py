@@ -0,0 +1,143 @@
+import random
+import time
+from decimal import Decimal, ROUND_FLOOR
+from math import trunc, nextafter, inf
+
+from cryptrade.exchange_api import TradeClient, Currency, Product
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PRECISIONS = [10.0, 1.0, 0.1, 0.05, 0.01, 0.005, 0.001, 0.00025, 1e-05, 1e-06, 1e-08]
+SAMPLES = 200000
+
+
+class FloatProduct(Product):
+    # the former float formatting, kept as a reference point
+    @staticmethod
+    def apply_precision(number: float, precision: float) -> float:
+        stepper = 10 ** (len(str(precision)) - 2)
+        return trunc(stepper * (number // precision * precision)) / stepper
+
+    def valid(self, amount: float, price: float) -> bool:
+        return amount >= self._min_order_amount and \
+               price >= self._min_order_price and \
+               amount * price >= self._min_order_value
+
+    def format_price(self, price: float) -> float:
+        return FloatProduct.apply_precision(price, self._order_price_precision)
+
+    def format_amount(self, amount: float) -> float:
+        return FloatProduct.apply_precision(amount, self._order_amount_precision)
+
+
+def reference(number: float, precision: float) -> float:
+    # exact decimal truncation to a multiple of the precision
+    step = Decimal(repr(precision))
+    return float((Decimal(repr(number)) / step).to_integral_value(ROUND_FLOOR) * step)
+
+
+def products(precision: float) -> tuple:
+    details = {"min_order_amount": precision, "min_order_price": precision, "min_order_value": 10 * precision,
+               "order_price_precision": precision, "order_amount_precision": precision}
+    client = TradeClient()
+    result = []
+    for product_class in [Product, FloatProduct]:
+        product = product_class(client, Currency("BTC"), Currency("EUR"))
+        product._set_details(details)
+        result.append(product)
+    return tuple(result)
+
+
+def compare() -> None:
+    random.seed(14)
+    print(f"{'precision':>10} {'ticks exact':>12} {'float exact':>12}")
+    for precision in PRECISIONS:
+        product, float_product = products(precision)
+        exact = float_exact = 0
+        for _ in range(SAMPLES // 10):
+            # prices on, just below and between ticks
+            ticks = random.randrange(1, 10 ** 7)
+            number = random.choice([ticks * precision, (ticks - 1e-9) * precision, random.uniform(0, 10 ** 5)])
+            expected = reference(number, precision)
+            exact += product.format_price(number) == expected
+            float_exact += float_product.format_price(number) == expected
+        print(f"{precision:>10} {exact / (SAMPLES // 10):12.4%} {float_exact / (SAMPLES // 10):12.4%}")
+
+
+def check(seed: int = 14, samples: int = 20000) -> None:
+    # the integer steps against Decimal arithmetic on the decimals the floats represent
+    random.seed(seed)
+    for _ in range(samples // 100):
+        precisions = [random.choice(PRECISIONS), float(f"{random.choice([1, 2, 5, 25])}e-{random.randrange(0, 9)}")]
+        precision, minimum = random.choice(precisions), random.choice(precisions)
+        product, _ = products(precision)
+        product._set_details({"min_order_amount": minimum, "min_order_price": precision,
+                              "min_order_value": random.choice([0, minimum * random.randrange(1, 1000)]),
+                              "order_price_precision": precision, "order_amount_precision": minimum})
+        decimals, step = Product.decimal_step(precision)
+        assert Decimal(step).scaleb(-decimals) == Decimal(repr(precision)), precision
+
+        for _ in range(100):
+            # on, just below, just above and between steps; below 1e7 a float holds the decimals exactly
+            steps = random.randrange(0, min(10 ** 7, int(10 ** 7 / precision)))
+            on_step = float(Decimal(steps) * Decimal(repr(precision)))
+            number = random.choice([on_step, nextafter(on_step, 0), nextafter(on_step, inf),
+                                    random.uniform(0, min(10 ** 7, steps * precision + 1))])
+            expected = int((Decimal(repr(number)) / Decimal(repr(precision))).to_integral_value(ROUND_FLOOR))
+            ticks = Product.to_steps(number, 10 ** decimals, step)
+            assert ticks == expected, (number, precision, ticks, expected)
+            assert product.format_price(number) == reference(number, precision), (number, precision)
+            # the strings are exact for any number of steps, beyond what a float holds too
+            for count in [ticks, random.randrange(10 ** 18)]:
+                text = Product.steps_string(count, decimals, step)
+                assert Decimal(text) == Decimal(count) * Decimal(repr(precision)), (count, precision, text)
+                assert len(text.partition(".")[2]) == decimals, (count, precision, text)
+
+            lots = product.amount_lots(random.uniform(0, 100 * minimum))
+            amount, price = Decimal(lots) * Decimal(repr(minimum)), Decimal(ticks) * Decimal(repr(precision))
+            valid = amount >= Decimal(repr(product._min_order_amount)) and \
+                price >= Decimal(repr(product._min_order_price)) and \
+                amount * price >= Decimal(repr(product._min_order_value))
+            assert product.valid_steps(lots, ticks) == valid, (lots, ticks, minimum, precision)
+            if np is not None:
+                batch_ticks, batch_lots, batch_valid = product.batch_steps([number], [float(amount)])
+                assert (batch_ticks[0], batch_lots[0], bool(batch_valid[0])) == (ticks, lots, valid), \
+                    (number, float(amount), precision, minimum)
+
+
+def per_call(function, arguments: list) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for argument in arguments:
+            function(*argument)
+        best = min(best, time.perf_counter() - start)
+    return best / len(arguments)
+
+
+def speed() -> None:
+    random.seed(15)
+    product, float_product = products(0.01)
+    prices = [(random.uniform(1, 10 ** 5),) for _ in range(SAMPLES)]
+    orders = [(random.uniform(0, 10), random.uniform(1, 10 ** 5)) for _ in range(SAMPLES)]
+    steps = [(product.amount_lots(amount), product.price_ticks(price)) for amount, price in orders]
+
+    print(f"\n{'operation':<14} {'ticks (ns)':>11} {'float (ns)':>11}")
+    print(f"{'format_price':<14} {per_call(product.format_price, prices) * 1e9:11.1f} "
+          f"{per_call(float_product.format_price, prices) * 1e9:11.1f}")
+    print(f"{'valid':<14} {per_call(product.valid_steps, steps) * 1e9:11.1f} "
+          f"{per_call(float_product.valid, orders) * 1e9:11.1f}")
+    print(f"{'price_ticks':<14} {per_call(product.price_ticks, prices) * 1e9:11.1f}")
+
+
+def main() -> None:
+    check()
+    compare()
+    speed()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker
+
+# simulated round-trip per exchange, in seconds
+LATENCIES = {"coinbase": 0.10, "binance": 0.05, "kraken": 0.20, "bitfinex": 0.15}
+CYCLES = 5
+
+
+class SlowTicker(Ticker):
+    def __init__(self, auth_client: TradeClient, product: Product, latency: float) -> None:
+        super().__init__(auth_client, product)
+        self._latency = latency
+        self.cycles = 0
+
+    def update(self) -> None:
+        time.sleep(self._latency)
+        super().update()
+        self.cycles += 1
+
+
+class BlockingTicker(SlowTicker):
+    # the former produce(), calling the blocking update() on the event loop
+    async def produce(self, interval: int) -> None:
+        while True:
+            self.update()
+            await self.notify()
+            await asyncio.sleep(interval)
+
+
+async def cycle_time(ticker_class) -> float:
+    tickers = []
+    for latency in LATENCIES.values():
+        client = TradeClient()
+        product = Product(client, Currency("BTC"), Currency("EUR"))
+        tickers.append(ticker_class(client, product, latency))
+
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(ticker.produce(0)) for ticker in tickers]
+    while min(ticker.cycles for ticker in tickers) < CYCLES:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return elapsed / CYCLES
+
+
+def main() -> None:
+    print(f"slowest exchange : {max(LATENCIES.values()) * 1000:6.1f} ms")
+    print(f"sum of exchanges : {sum(LATENCIES.values()) * 1000:6.1f} ms")
+    print(f"blocking produce : {asyncio.run(cycle_time(BlockingTicker)) * 1000:6.1f} ms/cycle")
+    print(f"executor produce : {asyncio.run(cycle_time(SlowTicker)) * 1000:6.1f} ms/cycle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker
+from cryptrade.recorder import TickRecorder, TickReader
+
+TICKS = 1000000
+CAPACITY = 1 << 18
+
+# writes ticks and dies without closing anything
+CRASH = """
+import os, sys
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker
+from cryptrade.recorder import TickRecorder
+recorder = TickRecorder(Ticker(TradeClient(), Product(TradeClient(), Currency("BTC"), Currency("EUR"))),
+                        sys.argv[1], "Bench", int(sys.argv[2]))
+for i in range(int(sys.argv[3])):
+    recorder.record(1600000000 * 10 ** 9 + i, 30000.0 + i, 30001.0 + i, 30000.5 + i)
+os._exit(1)
+"""
+
+
+def ticker() -> Ticker:
+    client = TradeClient()
+    return Ticker(client, Product(client, Currency("BTC"), Currency("EUR")))
+
+
+def write_cost(directory: str) -> None:
+    source = ticker()
+    recorder = TickRecorder(source, directory, "Bench", CAPACITY)
+
+    start = time.perf_counter()
+    for i in range(TICKS):
+        recorder.record(1600000000 * 10 ** 9 + i * 10 ** 8, 30000.0, 30001.0, 30000.5)
+    elapsed = time.perf_counter() - start
+    print(f"record         : {elapsed / TICKS * 1e9:7.1f} ns per tick, {len(recorder.segments)} segments")
+
+    async def notifications() -> float:
+        begin = time.perf_counter()
+        for i in range(TICKS // 10):
+            source._set_quote(30000.0 + i, 30001.0 + i, 30000.5 + i, datetime.now())
+            await recorder.notify(source)
+        return time.perf_counter() - begin
+    elapsed = asyncio.run(notifications())
+    print(f"notify         : {elapsed / (TICKS // 10) * 1e9:7.1f} ns per tick (incl. quote and timestamp)")
+    recorder.close()
+
+    reader = TickReader(directory, "Bench", source.product.prod_id)
+    start = time.perf_counter()
+    segments = reader.records()
+    elapsed = time.perf_counter() - start
+    print(f"open segments  : {elapsed * 1e3:7.2f} ms for {sum(len(segment) for segment in segments):,} records")
+    start = time.perf_counter()
+    ticks = reader.ticks()
+    elapsed = time.perf_counter() - start
+    print(f"ticks          : {elapsed * 1e3:7.2f} ms, sequences contiguous: "
+          f"{bool((segments[-1]['sequence'][-1] - segments[0]['sequence'][0] + 1) == len(ticks.time))}")
+
+
+def crash_recovery(directory: str) -> None:
+    # the process dies twice, the second time halfway through a segment; the next run continues the sequence
+    environment = dict(os.environ, PYTHONPATH=os.getcwd())
+    for count in [CAPACITY + 1000, 5000]:
+        subprocess.run([sys.executable, "-c", CRASH, directory, str(CAPACITY), str(count)], env=environment)
+
+    source = ticker()
+    recorder = TickRecorder(source, directory, "Bench", CAPACITY)
+    reader = TickReader(directory, "Bench", source.product.prod_id)
+    records = sum(len(segment) for segment in reader.records())
+    print(f"after crashes  : {records:,} records recovered, next sequence {recorder.sequence:,}, "
+          f"expected {CAPACITY + 1000 + 5000:,} records")
+    recorder.close()
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        write_cost(directory)
+    with tempfile.TemporaryDirectory() as directory:
+        crash_recovery(directory)
+
+
+if __name__ == "__main__":
+    main()
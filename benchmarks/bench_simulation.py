@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import numpy as np
+
+from cryptrade.exchange_api import Order
+from cryptrade.monitor import Transactions
+from cryptrade.observers import Observer
+from cryptrade.coinbase import CBApiCreator
+from cryptrade.simulation import MatchingEngine, SimulatedApiCreator, replay
+
+TICKS = 5000000
+DELTA = 0.002
+AMOUNT = 0.01
+
+
+def random_walk(ticks: int) -> tuple:
+    # one tick per 100 ms around 30000 with a 1 unit spread
+    rng = np.random.default_rng(17)
+    prices = 30000.0 * np.exp(np.cumsum(rng.normal(0, 0.00005, ticks)))
+    times = 1600000000 * 10 ** 9 + np.arange(ticks, dtype=np.int64) * 10 ** 8
+    volumes = rng.exponential(0.02, ticks)
+    return times, prices + 0.5, prices - 0.5, prices, volumes
+
+
+class OrderSettled(Observer):
+    def __init__(self, order: Order, settled: asyncio.Event) -> None:
+        super().__init__(order)
+        self._settled = settled
+
+    async def notify(self, observable: Order) -> None:
+        if observable.settled:
+            self._settled.set()
+
+
+async def delta_strategy(api_factory, buying: Transactions, selling: Transactions) -> None:
+    # the trading loop of cryptrade.py, written against the factory API only
+    client = api_factory.create_trade_client({})
+    product = api_factory.create_product(client, api_factory.create_currency("BTC"),
+                                         api_factory.create_currency("EUR"))
+    ticker = api_factory.create_ticker(client, product)
+    executions = api_factory.create_execution_stream(client, api_factory.create_order_manager(client), [product])
+    asyncio.ensure_future(executions.produce(60))
+
+    while True:
+        await client.run_in_executor(ticker.update)
+        buy_order, sell_order = await asyncio.gather(
+            client.run_in_executor(api_factory.create_order, client, product, "buy", ticker.bid * (1 - DELTA), AMOUNT),
+            client.run_in_executor(api_factory.create_order, client, product, "sell", ticker.ask * (1 + DELTA), AMOUNT))
+
+        settled = asyncio.Event()
+        observers = [(order, OrderSettled(order, settled)) for order in [buy_order, sell_order] if order.created]
+        for order, _ in observers:
+            await executions.track(order)
+        await settled.wait()
+
+        for order, transactions in [(buy_order, buying), (sell_order, selling)]:
+            if order.created and order.settled and order.filled_size > 0:
+                transactions.add(order.filled_size, order.executed_value)
+
+        for order in [buy_order, sell_order]:
+            executions.untrack(order)
+        for order, observer in observers:
+            # stops the consumer task of the subscription
+            order.detach(observer)
+        await asyncio.gather(client.run_in_executor(buy_order.cancel), client.run_in_executor(sell_order.cancel))
+
+
+def main() -> None:
+    data = random_walk(TICKS)
+    engine = MatchingEngine(*data, maker_fee=CBApiCreator.maker_fee(), taker_fee=CBApiCreator.taker_fee(),
+                            balances={"BTC": 1.0, "EUR": 30000.0},
+                            details={"min_order_amount": 0.001, "min_order_price": 0.01, "min_order_value": 10.0,
+                                     "order_price_precision": 0.01, "order_amount_precision": 1e-08})
+    api_factory = SimulatedApiCreator(engine)
+    buying = Transactions("buy", api_factory.maker_fee())
+    selling = Transactions("sell", api_factory.maker_fee())
+
+    start = time.perf_counter()
+    asyncio.run(replay(delta_strategy(api_factory, buying, selling), engine))
+    elapsed = time.perf_counter() - start
+
+    print(f"ticks replayed : {len(engine):,} in {elapsed:.2f} s, {len(engine) / elapsed / 1e6:.1f} M ticks/s")
+    print(f"fills          : {engine.fills:,}, fees {engine.fees:.2f}")
+    print(f"balances       : " + ", ".join(f"{k} {v:.4f}" for k, v in engine.balances.items()))
+    print(f"{buying}\n{selling}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import asyncio
+import statistics
+import tempfile
+import time
+
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.coinbase import CBApiCreator
+from cryptrade.mockserver import MockExchangeServer, MockStreamServer
+from cryptrade.observers import Observer
+
+MESSAGES = 500
+
+
+class Notifications(Observer):
+    def __init__(self, ticker) -> None:
+        super().__init__(ticker)
+        self.count = 0
+        self.received = asyncio.Event()
+
+    async def notify(self, ticker) -> None:
+        self.count += 1
+        self.received.set()
+
+
+async def call(function) -> None:
+    # the stand-in's controls wait for the closing handshakes, which need the client's loop
+    await asyncio.get_running_loop().run_in_executor(None, function)
+
+
+async def until(condition, message: str, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, message
+        await asyncio.sleep(0.01)
+
+
+def streaming_ticker(server: MockExchangeServer, stream: MockStreamServer):
+    client = CBApiCreator.create_trade_client(server.credentials())
+    product = CBApiCreator.create_product(client, CBApiCreator.create_currency("BTC"),
+                                          CBApiCreator.create_currency("EUR"))
+    ticker = CBApiCreator.create_streaming_ticker(client, product)
+    ticker.stream_url = stream.url
+    # reconnect within the check's time
+    ticker._reconnect_delay = 0.05
+    ticker._max_reconnect_delay = 0.2
+    return client, ticker
+
+
+async def failover(server: MockExchangeServer, stream: MockStreamServer) -> None:
+    client, ticker = streaming_ticker(server, stream)
+    notifications = Notifications(ticker)
+    task = asyncio.ensure_future(ticker.produce(0.05))
+    try:
+        await until(lambda: ticker.connected and notifications.count >= 10, "no quotes from the stream")
+        assert stream.subscriptions[0]["product_ids"] == ["BTC-EUR"], stream.subscriptions
+        assert 0 < ticker.bid < ticker.ask, (ticker.bid, ticker.ask)
+        requests = server.statistics["coinbase"]["requests"]
+        await asyncio.sleep(0.2)
+        assert server.statistics["coinbase"]["requests"] == requests, "polled REST while streaming"
+
+        # connection lost: the ticker reconnects and subscribes again
+        await call(stream.drop)
+        await until(lambda: len(stream.subscriptions) == 2 and ticker.connected, "no resubscription after a drop")
+
+        # stream down: REST polling keeps the quotes coming
+        await call(stream.stop)
+        await until(lambda: not ticker.connected, "still connected to a stopped stream")
+        count = notifications.count
+        await until(lambda: server.statistics["coinbase"]["requests"] >= requests + 3, "no REST fallback")
+        await until(lambda: notifications.count > count, "no quotes while the stream is down")
+
+        # stream up again: back to streaming, without polling
+        await call(stream.start)
+        await until(lambda: len(stream.subscriptions) == 3 and ticker.connected, "no reconnection to the stream")
+        await asyncio.sleep(0.1)
+        requests, count = server.statistics["coinbase"]["requests"], notifications.count
+        await asyncio.sleep(0.2)
+        assert server.statistics["coinbase"]["requests"] == requests, "polled REST after reconnecting"
+        assert notifications.count > count, "no quotes after reconnecting"
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        client.close()
+
+
+def check() -> None:
+    # the streaming ticker against the stand-ins: quotes from the stream, resubscribing after the connection
+    # drops, REST polling while the stream is down and streaming again once it is back
+    with tempfile.TemporaryDirectory() as directory:
+        ProductCatalogue.configure(cache_dir=directory)
+        with MockExchangeServer(seed=8) as server, MockStreamServer(server) as stream:
+            asyncio.run(failover(server, stream))
+
+
+async def latencies(server: MockExchangeServer, stream: MockStreamServer) -> list:
+    # from sending a message to the notification of the observer
+    client, ticker = streaming_ticker(server, stream)
+    notifications = Notifications(ticker)
+    task = asyncio.ensure_future(ticker.produce(60))
+    await until(lambda: len(stream.subscriptions) > 0, "no subscription")
+    timings = []
+    for i in range(MESSAGES):
+        notifications.received.clear()
+        start = time.perf_counter()
+        stream.broadcast({"type": "ticker", "product_id": "BTC-EUR", "sequence": i, "price": "30000.00",
+                          "best_bid": "29999.00", "best_ask": "30001.00", "last_size": "0.001"})
+        await notifications.received.wait()
+        timings.append(time.perf_counter() - start)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    client.close()
+    return timings
+
+
+def main() -> None:
+    check()
+    with tempfile.TemporaryDirectory() as directory:
+        ProductCatalogue.configure(cache_dir=directory)
+        with MockExchangeServer(seed=8) as server, MockStreamServer(server, interval=None) as stream:
+            timings = sorted(asyncio.run(latencies(server, stream)))
+    print(f"message to notification: median {statistics.median(timings) * 1e6:8.1f} us, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:8.1f} us ({MESSAGES} messages)")
+
+
+if __name__ == "__main__":
+    main()
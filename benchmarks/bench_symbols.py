@@ -0,0 +1,33 @@
+import timeit
+
+from cryptrade.kraken import KrakenCurrency, KrakenProduct
+
+
+def scan_currency(currency: str) -> str:
+    # former Currency.map_from_exchange_currency
+    results = [key for key, value in KrakenCurrency._currency_map.items() if value == currency]
+    return results[0] if results else currency
+
+
+def scan_product(prod_id: str) -> str:
+    # former Product.map_from_exchange_product
+    return next(key for key, value in KrakenProduct._product_map.items() if value == prod_id)
+
+
+def per_call(statement, symbols: list, number: int = 2000) -> float:
+    return timeit.timeit(lambda: [statement(symbol) for symbol in symbols], number=number) / number / len(symbols)
+
+
+def main() -> None:
+    currencies = list(KrakenCurrency._currency_map.values()) + ["ADA", "DOT", "ZAUD"]
+    products = list(KrakenProduct._product_map.values())
+
+    print(f"{'lookup':<10} {'scan (ns)':>10} {'index (ns)':>11}")
+    print(f"{'currency':<10} {per_call(scan_currency, currencies) * 1e9:10.1f} "
+          f"{per_call(KrakenCurrency.map_from_exchange_currency, currencies) * 1e9:11.1f}")
+    print(f"{'product':<10} {per_call(scan_product, products) * 1e9:10.1f} "
+          f"{per_call(KrakenProduct.map_from_exchange_product, products) * 1e9:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
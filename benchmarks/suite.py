@@ -0,0 +1,540 @@
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker
+from cryptrade.monitor import TickerMonitor
+from cryptrade.observers import Observable, Observer
+from cryptrade.scheduler import RequestScheduler
+from cryptrade.metrics import Metrics
+from cryptrade.consolidated import ConsolidatedQuote
+from cryptrade.orderbook import BookSide
+from cryptrade.candles import CandleAggregator
+from cryptrade.history import BalanceHistory
+from cryptrade.mockserver import MockExchangeServer
+from cryptrade.coinbase import CBApiCreator
+from cryptrade.binance import BinApiCreator
+from cryptrade.kraken import KrakenApiCreator, KrakenCurrency, KrakenProduct
+from cryptrade.bitfinex import BfxApiCreator
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+EXCHANGES = {"coinbase": CBApiCreator, "binance": BinApiCreator, "kraken": KrakenApiCreator,
+             "bitfinex": BfxApiCreator}
+CASES = []
+# benchmark modules with a check() asserting the optimized code against a straightforward implementation
+CHECKS = ["bench_monitor", "bench_precision", "bench_streaming"]
+
+
+def case(name: str, **grid):
+    # registers a benchmark; the function is a generator yielding (run, operations) once set up and cleaning up
+    # afterwards, it is called once for every value of its (single) parameter
+    def register(function):
+        CASES.append((name, function, grid))
+        return function
+    return register
+
+
+class Context:
+    # what the cases share: a mock exchange server and clients pointing at it
+    def __init__(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        # keeps the mock products out of the real product cache
+        ProductCatalogue.configure(cache_dir=self._directory.name)
+        self.server = MockExchangeServer(seed=20).start()
+
+    def trade_client(self, exchange: str) -> TradeClient:
+        client = EXCHANGES[exchange].create_trade_client(self.server.credentials())
+        # the client's own rate limits would be all that is measured
+        client._scheduler = RequestScheduler({}, {})
+        return client
+
+    def close(self) -> None:
+        self.server.stop()
+        self._directory.cleanup()
+
+
+class Transport:
+    # records the decoded responses of an adapter's SDK client, or replays them instead of doing the HTTP requests;
+    # responses are keyed by method and endpoint and decoded from JSON again on every replay
+    def __init__(self, exchange: str, trade_client: TradeClient, fixtures: dict = None) -> None:
+        self.recording = fixtures is None
+        self.responses = {}
+        self._texts = {key: json.dumps(response) for key, response in (fixtures or {}).items()}
+        getattr(self, f"_install_{exchange}")(trade_client.client)
+
+    def _respond(self, key: str, call, loads=json.loads):
+        if self.recording:
+            self.responses[key] = result = call()
+            return result
+        return loads(self._texts[key])
+
+    async def _async_respond(self, key: str, call, loads=json.loads):
+        if self.recording:
+            self.responses[key] = result = await call()
+            return result
+        return loads(self._texts[key])
+
+    def _install_coinbase(self, client) -> None:
+        original = client._send_message
+
+        def send_message(method, endpoint, params=None, data=None):
+            return self._respond(f"{method.upper()} {endpoint}", lambda: original(method, endpoint, params, data))
+        client._send_message = send_message
+
+    def _install_binance(self, client) -> None:
+        original = client._request
+
+        def request(method, uri, signed, force_params=False, **kwargs):
+            return self._respond(f"{method.upper()} {uri.split('/api/', 1)[1]}",
+                                 lambda: original(method, uri, signed, force_params, **kwargs))
+        client._request = request
+
+    def _install_kraken(self, client) -> None:
+        original = client._query
+
+        def query(urlpath, data, headers=None, timeout=None):
+            return self._respond(urlpath, lambda: original(urlpath, data, headers, timeout))
+        client._query = query
+
+    def _install_bitfinex(self, client) -> None:
+        for version, rest in client.items():
+            def wrap(method: str, original, version=version, rest=rest):
+                async def call(endpoint, *args, **kwargs):
+                    return await self._async_respond(f"{method} {version}/{endpoint}",
+                                                     lambda: original(endpoint, *args, **kwargs),
+                                                     lambda text: json.loads(text, parse_float=rest.parse_float))
+                return call
+            rest.fetch = wrap("GET", rest.fetch)
+            rest.post = wrap("POST", rest.post)
+
+
+def poll_objects(exchange: str, client: TradeClient) -> tuple:
+    # a ticker, an open order below the market and the account, as a polling strategy uses them
+    api_factory = EXCHANGES[exchange]
+    product = api_factory.create_product(client, api_factory.create_currency("BTC"),
+                                         api_factory.create_currency("EUR"))
+    ticker = api_factory.create_ticker(client, product)
+    ticker.update()
+    order = api_factory.create_order(client, product, "buy", ticker.bid * 0.99, 0.001)
+    account = api_factory.create_account(client)
+    return ticker, order, account
+
+
+def record_fixtures() -> None:
+    context = Context()
+    try:
+        os.makedirs(FIXTURES, exist_ok=True)
+        for exchange in EXCHANGES:
+            client = context.trade_client(exchange)
+            transport = Transport(exchange, client)
+            ticker, order, account = poll_objects(exchange, client)
+            order.status()
+            account.update()
+            with open(os.path.join(FIXTURES, f"{exchange}.json"), "w") as file:
+                json.dump(transport.responses, file, indent=1, sort_keys=True)
+            client.close()
+            print(f"{exchange}: {len(transport.responses)} responses recorded")
+    finally:
+        context.close()
+
+
+def run_async(loop: asyncio.AbstractEventLoop, coroutine_function, operations: int):
+    return lambda: loop.run_until_complete(coroutine_function(operations))
+
+
+@case("monitor.notify", window=[60, 600, 3600, 36000])
+def monitor_notify(context: Context, window: int):
+    # one tick per second, so the window holds window ticks; the monitor's history is large enough to keep them all
+    operations = 20000
+    client = TradeClient()
+    ticker = Ticker(client, Product(client, Currency("BTC"), Currency("EUR")))
+    monitor = TickerMonitor(ticker, "BTC-EUR", window, max(65536, 2 * window))
+    clock = [datetime(2020, 1, 1)]
+    second = timedelta(seconds=1)
+    loop = asyncio.new_event_loop()
+
+    async def ticks(count: int) -> None:
+        timestamp = clock[0]
+        for i in range(count):
+            timestamp += second
+            ticker._set_quote(30000.0 + i % 97, 30001.0 + i % 97, 30000.5 + i % 89, timestamp)
+            await monitor.notify(ticker)
+        clock[0] = timestamp
+
+    loop.run_until_complete(ticks(window))
+    yield run_async(loop, ticks, operations), operations
+    loop.close()
+
+
+class CountingObserver(Observer):
+    def __init__(self, observable: Observable) -> None:
+        self.count = 0
+        super().__init__(observable)
+
+    async def notify(self, observable: Observable) -> None:
+        self.count += 1
+
+
+@case("observable.notify", observers=[1, 10, 100, 1000])
+def observable_notify(context: Context, observers: int):
+    # per event until every observer has seen it
+    operations = max(20, 20000 // observers)
+    loop = asyncio.new_event_loop()
+    observable = Observable()
+
+    async def subscribe() -> list:
+        return [CountingObserver(observable) for _ in range(observers)]
+    subscribers = loop.run_until_complete(subscribe())
+
+    async def events(count: int) -> None:
+        for _ in range(count):
+            await observable.notify()
+            await asyncio.sleep(0)
+        await observable.drain()
+
+    yield run_async(loop, events, operations), operations
+
+    async def unsubscribe() -> None:
+        # stops the consumer tasks of the subscriptions
+        for subscriber in subscribers:
+            observable.detach(subscriber)
+        await asyncio.sleep(0)
+    loop.run_until_complete(unsubscribe())
+    loop.close()
+
+
+def precision_product() -> Product:
+    client = TradeClient()
+    product = Product(client, Currency("BTC"), Currency("EUR"))
+    product._set_details({"min_order_amount": 0.0001, "min_order_price": 0.01, "min_order_value": 10.0,
+                          "order_price_precision": 0.01, "order_amount_precision": 1e-08})
+    return product
+
+
+@case("product", operation=["format_price", "format_amount", "valid"])
+def product_formatting(context: Context, operation: str):
+    product = precision_product()
+    numbers = [(1 + i * 7.31) % 100000 + 0.123456789 for i in range(10000)]
+    amounts = [(1 + i * 0.37) % 10 + 0.000123456789 for i in range(10000)]
+    if operation == "valid":
+        pairs = list(zip(amounts, numbers))
+
+        def run() -> None:
+            valid = product.valid
+            for amount, price in pairs:
+                valid(amount, price)
+    else:
+        def run(function=getattr(product, operation)) -> None:
+            for number in numbers:
+                function(number)
+    yield run, len(numbers)
+
+
+@case("symbols", lookup=["currency_from_exchange", "currency_to_exchange", "product_from_exchange",
+                         "product_to_exchange"])
+def symbol_mapping(context: Context, lookup: str):
+    # the Kraken maps are the largest ones
+    currencies = list(KrakenCurrency._currency_map.values()) + ["ADA", "DOT", "ZAUD"]
+    products = list(KrakenProduct._product_map.values())
+    if lookup == "currency_from_exchange":
+        symbols, function = currencies, KrakenCurrency.map_from_exchange_currency
+    elif lookup == "currency_to_exchange":
+        symbols = [KrakenCurrency(KrakenCurrency.map_from_exchange_currency(currency)) for currency in currencies]
+        function = KrakenCurrency.exchange_currency_id.fget
+    elif lookup == "product_from_exchange":
+        symbols, function = products, KrakenProduct.map_from_exchange_product
+    else:
+        client = TradeClient()
+        symbols = [Product(client, Currency(trading), Currency(buying))
+                   for trading, buying in [("BTC", "EUR"), ("ETH", "BTC"), ("ETC", "EUR"), ("ADA", "BTC")]]
+        for symbol in symbols:
+            # a Product bound to the Kraken index, without fetching the catalogue
+            symbol.__class__ = KrakenProduct
+        function = KrakenProduct.prod_id.fget
+
+    def run() -> None:
+        for _ in range(100):
+            for symbol in symbols:
+                function(symbol)
+    yield run, 100 * len(symbols)
+
+
+@case("consolidated.update", venues=[4, 16, 64])
+def consolidated_update(context: Context, venues: int):
+    # 40 products, prices around their own mid with now and then a venue off by 1%
+    consolidated = ConsolidatedQuote(threshold=0.002, max_age=5.0)
+    updates = []
+    for i in range(20000):
+        mid = 100.0 * (1 + i % 40) * (1 + (i * 7919 % 101 - 50) * 1e-5 + (0.01 if i % 997 == 0 else 0))
+        updates.append((f"P{i % 40}-EUR", f"venue{i * 31 % venues}", mid * 0.9999, mid * 1.0001, i * 0.01, 0.001))
+
+    def run() -> None:
+        update = consolidated.update
+        for quote in updates:
+            update(*quote)
+    yield run, len(updates)
+
+
+@case("orderbook", operation=["set", "vwap", "depth"])
+def order_book(context: Context, operation: str):
+    # one side of 4000 levels at 2 decimals, eg. BTC-EUR
+    side = BookSide(False, 2)
+    changes = [(30000 + (i * 7919 % 4001) * 0.1, 0.0 if i % 5 == 0 else (i % 97 + 1) * 0.01) for i in range(20000)]
+    for price, size in changes:
+        side.set(price, size)
+
+    def run() -> None:
+        if operation == "set":
+            for price, size in changes:
+                side.set(price, size)
+        elif operation == "vwap":
+            for i in range(2000):
+                side.vwap(i * 0.05 + 0.01)
+        else:
+            for i in range(2000):
+                side.depth(i + 1)
+    yield run, len(changes) if operation == "set" else 2000
+
+
+@case("candles.add", products=[1, 10, 100])
+def candles_add(context: Context, products: int):
+    # 20 ticks a second over all products, all five timeframes
+    aggregator = CandleAggregator(capacity=1000)
+    ticks = [(f"P{i % products}-EUR", i * 0.05, 100.0 * (1 + (i * 7919 % 101 - 50) * 1e-4), 0.01)
+             for i in range(20000)]
+    runs = [0]
+
+    def run() -> None:
+        # every run continues where the last one stopped
+        start = 1.6e9 + runs[0] * len(ticks) * 0.05
+        add = aggregator.add
+        for product, timestamp, price, volume in ticks:
+            add(product, start + timestamp, price, volume)
+        runs[0] += 1
+    yield run, len(ticks)
+
+
+@case("balances", operation=["append", "lookup"])
+def balance_history(context: Context, operation: str):
+    # 20 currencies, one of them changing on every other update
+    balance = {f"C{i}": float(i) for i in range(20)}
+    updates = []
+    for i in range(20000):
+        if i % 2 == 0:
+            balance[f"C{i * 7919 % 20}"] = float(i)
+        updates.append(dict(balance))
+    history = BalanceHistory(max_bytes=1 << 30)
+    for i, update in enumerate(updates):
+        history.append(i, update)
+    runs = [1]
+
+    def run() -> None:
+        if operation == "append":
+            # every run continues where the last one stopped
+            append, start = history.append, runs[0] * len(updates)
+            for i, update in enumerate(updates):
+                append(start + i, update)
+            runs[0] += 1
+        else:
+            lookup = history.balance
+            for i in range(2000):
+                lookup(i * 7919 % len(updates))
+    yield run, len(updates) if operation == "append" else 2000
+
+
+@case("metrics.record", outcome=["success", "error"])
+def metrics_record(context: Context, outcome: str):
+    # the instrumentation added to every exchange request
+    error = None if outcome == "success" else "ConnectionError"
+
+    def run() -> None:
+        for i in range(10000):
+            Metrics.record("bench", "ticker", i * 1e-5, error)
+    yield run, 10000
+    Metrics.reset()
+
+
+@case("parse", target=[f"{exchange}.{operation}" for exchange in EXCHANGES
+                       for operation in ["ticker", "order_status", "account"]])
+def response_parsing(context: Context, target: str):
+    # the update methods against recorded responses: JSON decoding, the SDK and the adapter, no HTTP
+    exchange, operation = target.split(".")
+    with open(os.path.join(FIXTURES, f"{exchange}.json")) as file:
+        fixtures = json.load(file)
+    client = context.trade_client(exchange)
+    Transport(exchange, client, fixtures)
+    ticker, order, account = poll_objects(exchange, client)
+    function = {"ticker": ticker.update, "order_status": order.status, "account": account.update}[operation]
+    operations = 1000
+
+    def run() -> None:
+        for _ in range(operations):
+            function()
+    yield run, operations
+    client.close()
+
+
+@case("poll", exchange=list(EXCHANGES))
+def poll_cycle(context: Context, exchange: str):
+    # ticker, order status and account over HTTP against the mock exchange server
+    client = context.trade_client(exchange)
+    ticker, order, account = poll_objects(exchange, client)
+    operations = 20
+
+    def run() -> None:
+        for _ in range(operations):
+            ticker.update()
+            order.status()
+            account.update()
+    yield run, operations
+    order.cancel()
+    client.close()
+
+
+def measure(function, repeat: int) -> dict:
+    setup = function()
+    run, operations = next(setup)
+    # warm up caches, connections and lazily created objects
+    run()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) / operations * 1e9)
+    next(setup, None)
+    return {"ns_per_op": statistics.median(timings),
+            "min_ns_per_op": min(timings),
+            "spread": (max(timings) - min(timings)) / statistics.median(timings),
+            "operations": operations,
+            "repeat": repeat}
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(FIXTURES)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(selection: list, repeat: int) -> dict:
+    context = Context()
+    results = {}
+    try:
+        for name, function, grid in CASES:
+            for parameter, values in grid.items():
+                for value in values:
+                    full_name = f"{name}[{parameter}={value}]"
+                    if selection and not any(part in full_name for part in selection):
+                        continue
+                    results[full_name] = measure(lambda: function(context, **{parameter: value}), repeat)
+                    print(f"{full_name:<45} {results[full_name]['ns_per_op']:14,.0f} ns/op "
+                          f"(spread {results[full_name]['spread']:.0%})", flush=True)
+    finally:
+        context.close()
+    return {"meta": {"time": datetime.now().isoformat(timespec="seconds"),
+                     "commit": commit(),
+                     "python": platform.python_version(),
+                     "implementation": platform.python_implementation(),
+                     "machine": platform.machine(),
+                     "system": platform.system(),
+                     "cpus": os.cpu_count()},
+            "results": results}
+
+
+def run_checks(selection: list) -> int:
+    # returns the number of failed checks
+    failures = 0
+    for name in CHECKS:
+        if selection and not any(part in name for part in selection):
+            continue
+        start = time.perf_counter()
+        try:
+            importlib.import_module(f"benchmarks.{name}").check()
+            print(f"{name:<45} ok ({time.perf_counter() - start:.1f}s)", flush=True)
+        except AssertionError:
+            failures += 1
+            print(f"{name:<45} FAILED\n{traceback.format_exc()}", flush=True)
+    return failures
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    # returns the number of regressions: cases at least threshold slower than the baseline; the fastest repeat is
+    # compared, it is the least affected by whatever else the machine is doing
+    regressions = 0
+    print(f"\n{'case':<45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before = baseline["results"].get(name, {}).get("min_ns_per_op")
+        after = current["results"].get(name, {}).get("min_ns_per_op")
+        if before is None or after is None:
+            before, after = [f"{value:12,.0f}" if value is not None else f"{'-':>12}" for value in [before, after]]
+            print(f"{name:<45} {before} {after} {'new' if before.strip() == '-' else 'gone':>8}")
+            continue
+        change = after / before - 1
+        mark = ""
+        if change >= threshold:
+            regressions += 1
+            mark = "  slower"
+        elif change <= -threshold:
+            mark = "  faster"
+        print(f"{name:<45} {before:12,.0f} {after:12,.0f} {change:+8.1%}{mark}")
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}, baseline {baseline['meta'].get('commit')} on "
+          f"{baseline['meta'].get('python')}, current {current['meta'].get('commit')} on "
+          f"{current['meta'].get('python')}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="cryptrade benchmark suite")
+    parser.add_argument("-k", dest="selection", action="append", default=[],
+                        help="only run cases containing this text (repeatable)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="measurements per case, the median is reported")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("-i", "--input", help="use the results in this JSON file instead of running the suite")
+    parser.add_argument("-c", "--compare", help="compare with the results in this JSON file")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1,
+                        help="relative slowdown counted as a regression (default 0.1)")
+    parser.add_argument("--record-fixtures", action="store_true",
+                        help="record the responses used by the parse cases from the mock exchange server")
+    parser.add_argument("--check", action="store_true",
+                        help="run the checks of the benchmark modules instead of the suite")
+    args = parser.parse_args()
+
+    if args.record_fixtures:
+        record_fixtures()
+        return
+
+    if args.check:
+        sys.exit(1 if run_checks(args.selection) > 0 else 0)
+
+    if args.input is not None:
+        with open(args.input) as file:
+            results = json.load(file)
+    else:
+        results = run_suite(args.selection, args.repeat)
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=1)
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        # a non-zero exit status fails the CI job
+        sys.exit(1 if compare(baseline, results, args.threshold) > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
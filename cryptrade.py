@@ -7,8 +7,10 @@ from cryptrade.coinbase import CBApiCreator
 from cryptrade.binance import BinApiCreator
 from cryptrade.kraken import KrakenApiCreator
 from cryptrade.bitfinex import BfxApiCreator
+from cryptrade.exchange_api import Order
+from cryptrade.observers import Observer
 
-import time
+import asyncio
 import json
 
 APIs = {
@@ -38,45 +40,76 @@ account = api_factory.create_account(client)
 buying = Transactions("buy", api_factory.maker_fee())
 selling = Transactions("sell", api_factory.maker_fee())
 
-while True:
-    ticker.update()
-    logger.log(DEBUG_DETAILED, f"{ticker}")
-
-    account.update()
-    logger.log(DEBUG_DETAILED, f"{account}")
-
-    # make buy order
-    buy_price = ticker.bid * (1 - parameters.delta)
-    buy_amount = parameters.basic_amount
-    buy_order = api_factory.create_order(client, product, "buy", buy_price, buy_amount)
-    logger.log(DEBUG_DETAILED, f"{buy_order}")
-
-    # make sales order
-    sell_price = ticker.ask * (1 + parameters.delta)
-    sell_amount = parameters.basic_amount
-    sell_order = api_factory.create_order(client, product, "sell", sell_price, sell_amount)
-    logger.log(DEBUG_DETAILED, f"{sell_order}")
-
-    check_orders = True
-    while check_orders:
-        time.sleep(60)
-
-        if sell_order.created:
-            if sell_order.status():
-                check_orders = False
-                selling.add(sell_order.filled_size, sell_order.executed_value)
-                logger.alert(DEBUG_BASIC, "SELL-ORDER FINISHED", f"{sell_order}")
-            elif sell_order.error:
-                logger.log(DEBUG_DETAILED, sell_order.message)
-
-        if buy_order.created:
-            if buy_order.status():
-                check_orders = False
-                buying.add(buy_order.filled_size, buy_order.executed_value)
-                logger.alert(DEBUG_BASIC, "BUY-ORDER FINISHED", f"{buy_order}")
-            elif buy_order.error:
-                logger.log(DEBUG_DETAILED, buy_order.message)
-
-    buy_order.cancel()
-    sell_order.cancel()
-    logger.log(DEBUG_DETAILED, f"{buying}\n{selling}\n")
+
+class OrderSettled(Observer):
+    def __init__(self, order: Order, settled: asyncio.Event) -> None:
+        super().__init__(order)
+        self._settled = settled
+
+    async def notify(self, observable: Order) -> None:
+        if observable.settled:
+            self._settled.set()
+
+
+async def trade() -> None:
+    order_manager = api_factory.create_order_manager(client)
+    executions = api_factory.create_execution_stream(client, order_manager, [product])
+
+    # fills arrive through the private execution stream, the REST reconciliation every 60 seconds only catches up
+    # on what the stream missed
+    stream = asyncio.ensure_future(executions.produce(60))
+
+    while True:
+        await client.run_in_executor(ticker.update)
+        logger.log(DEBUG_DETAILED, f"{ticker}")
+
+        await client.run_in_executor(account.update)
+        logger.log(DEBUG_DETAILED, f"{account}")
+
+        # make buy and sales order
+        buy_price = ticker.bid * (1 - parameters.delta)
+        sell_price = ticker.ask * (1 + parameters.delta)
+        buy_order, sell_order = await asyncio.gather(
+            client.run_in_executor(api_factory.create_order, client, product, "buy", buy_price,
+                                   parameters.basic_amount),
+            client.run_in_executor(api_factory.create_order, client, product, "sell", sell_price,
+                                   parameters.basic_amount))
+        logger.log(DEBUG_DETAILED, f"{buy_order}")
+        logger.log(DEBUG_DETAILED, f"{sell_order}")
+
+        settled = asyncio.Event()
+        for order in [buy_order, sell_order]:
+            if order.created:
+                OrderSettled(order, settled)
+                await executions.track(order)
+            elif order.error:
+                logger.log(DEBUG_DETAILED, order.message)
+
+        if not buy_order.created and not sell_order.created:
+            await asyncio.sleep(60)
+            continue
+
+        # the stream settles the orders, it is started again if it stops (eg. on a malformed update)
+        settling = asyncio.ensure_future(settled.wait())
+        while not settling.done():
+            await asyncio.wait({settling, stream}, return_when=asyncio.FIRST_COMPLETED)
+            if stream.done():
+                if not stream.cancelled() and stream.exception() is not None:
+                    logger.log(DEBUG_BASIC, f"execution stream stopped: {stream.exception()!r}")
+                await asyncio.sleep(1)
+                stream = asyncio.ensure_future(executions.produce(60))
+
+        if sell_order.created and sell_order.settled:
+            selling.add(sell_order.filled_size, sell_order.executed_value)
+            logger.alert(DEBUG_BASIC, "SELL-ORDER FINISHED", f"{sell_order}")
+
+        if buy_order.created and buy_order.settled:
+            buying.add(buy_order.filled_size, buy_order.executed_value)
+            logger.alert(DEBUG_BASIC, "BUY-ORDER FINISHED", f"{buy_order}")
+
+        for order in [buy_order, sell_order]:
+            executions.untrack(order)
+        await asyncio.gather(client.run_in_executor(buy_order.cancel), client.run_in_executor(sell_order.cancel))
+        logger.log(DEBUG_DETAILED, f"{buying}\n{selling}\n")
+
+asyncio.run(trade())
@@ -1,31 +1,100 @@
 from binance.client import Client as BinClient
+from binance.exceptions import BinanceAPIException
 
-from cryptrade.exceptions import AuthenticationError, ProductError
-from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, Order, Account, ApiCreator
+from cryptrade.exceptions import AuthenticationError, ProductError, SequenceError
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, MultiTicker, Order, Account, \
+    OrderManager, ApiCreator
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.streaming import StreamingTicker
+from cryptrade.executions import ExecutionStream
+from cryptrade.orderbook import OrderBook
+from cryptrade.scheduler import PRIORITY_TRADE, PRIORITY_ACCOUNT, PRIORITY_MARKET
 
 import sys
+import asyncio
+from collections import deque
 from datetime import datetime
 
 
 class BinTradeClient(TradeClient):
-    def __init__(self, credentials: dict) -> None:
-        super().__init__()
-
+    # request weight per minute, and orders per second
+    _rate_limits = {
+        "weight": (1200, 20),
+        "orders": (10, 10)}
+    _request_costs = {
+        "product": (PRIORITY_MARKET, {"weight": 10}),
+        "ticker": (PRIORITY_MARKET, {"weight": 1}),
+        "book_tickers": (PRIORITY_MARKET, {"weight": 2}),
+        "prices": (PRIORITY_MARKET, {"weight": 2}),
+        "book": (PRIORITY_MARKET, {"weight": 10}),
+        "order": (PRIORITY_TRADE, {"weight": 1, "orders": 1}),
+        "cancel": (PRIORITY_TRADE, {"weight": 1}),
+        "status": (PRIORITY_ACCOUNT, {"weight": 2}),
+        "open_orders": (PRIORITY_ACCOUNT, {"weight": 40}),
+        "closed_orders": (PRIORITY_ACCOUNT, {"weight": 10}),
+        "account": (PRIORITY_ACCOUNT, {"weight": 10}),
+        "listen_key": (PRIORITY_ACCOUNT, {"weight": 1})}
+
+    def __init__(self, credentials: dict, max_workers: int = None) -> None:
+        super().__init__(max_workers)
+
+        # a different host, eg. the testnet or a cryptrade.mockserver; the client pings while being constructed, so
+        # the URL has to be set on the class
+        client_class = BinClient
+        if "api_url" in credentials.get("binance", {}):
+            client_class = type("BinClient", (BinClient,), {"API_URL": credentials["binance"]["api_url"] + "/api"})
         if "binance" in credentials and \
                 "api_key" in credentials["binance"] and \
                 "api_secret" in credentials["binance"]:
             api_key = credentials["binance"]["api_key"]
             api_secret = credentials["binance"]["api_secret"]
             try:
-                self._client = BinClient(api_key, api_secret)
+                self._client = client_class(api_key, api_secret)
             except Exception:
                 raise AuthenticationError("invalid Binance API key and/or secret")
         else:
             try:
-                self._client = BinClient()
+                self._client = client_class()
             except Exception:
                 raise AuthenticationError("Could not create non-authenticated Client for Binance")
 
+        self._share_connections(self._client.session, self._client.API_URL)
+        self._catalogue = BinProductCatalogue(self)
+
+    def request(self, operation: str, function, *args, **kwargs):
+        try:
+            return super().request(operation, function, *args, **kwargs)
+        except BinanceAPIException as e:
+            # 429: rate limit exceeded, 418: IP banned for exceeding it repeatedly
+            if e.status_code in [418, 429]:
+                self._scheduler.penalize(operation)
+            raise
+
+
+class BinProductCatalogue(ProductCatalogue):
+    _exchange = "binance"
+
+    def fetch(self) -> dict:
+        products = {}
+        for symbol_info in self._auth_client.request("product", self._auth_client.client.get_exchange_info)["symbols"]:
+            details = {
+                "min_order_amount": 0.0,
+                "min_order_price": 0.0,
+                "min_order_value": 0.0,
+                "order_price_precision": None,
+                "order_amount_precision": None}
+            for f in symbol_info["filters"]:
+                if f["filterType"] == "MIN_NOTIONAL":
+                    details["min_order_value"] = float(f["minNotional"])
+                elif f["filterType"] == "PRICE_FILTER":
+                    details["min_order_price"] = float(f["minPrice"])
+                    details["order_price_precision"] = float(f["tickSize"])
+                elif f["filterType"] == "LOT_SIZE":
+                    details["min_order_amount"] = float(f["minQty"])
+                    details["order_amount_precision"] = float(f["stepSize"])
+            products[symbol_info["symbol"]] = details
+        return products
+
 
 class BinCurrency(Currency):
     _currency_map = {}
@@ -41,17 +110,7 @@ class BinProduct(Product):
                  buying_currency: BinCurrency) -> None:
         try:
             super().__init__(auth_client, trading_currency, buying_currency)
-
-            symbol_info = self._auth_client.client.get_symbol_info(self.prod_id)
-            for f in symbol_info["filters"]:
-                if f["filterType"] == "MIN_NOTIONAL":
-                    self._min_order_value = float(f["minNotional"])
-                elif f["filterType"] == "PRICE_FILTER":
-                    self._min_order_price = float(f["minPrice"])
-                    self._order_price_precision = float(f["tickSize"])
-                elif f["filterType"] == "LOT_SIZE":
-                    self._min_order_amount = float(f["minQty"])
-                    self._order_amount_precision = float(f["stepSize"])
+            self._set_details(self._auth_client.catalogue.get(self.prod_id))
 
         except Exception:
             raise ProductError(f"{trading_currency}/{buying_currency} not supported on Binance")
@@ -64,7 +123,8 @@ class BinTicker(Ticker):
 
     def update(self) -> None:
         try:
-            product_ticker = self._auth_client.client.get_ticker(symbol=self._product.prod_id)
+            product_ticker = self._auth_client.request("ticker", self._auth_client.client.get_ticker,
+                                                      symbol=self._product.prod_id)
             self._bid = float(product_ticker["bidPrice"])
             self._ask = float(product_ticker["askPrice"])
             self._price = float(product_ticker["lastPrice"])
@@ -75,25 +135,144 @@ class BinTicker(Ticker):
             pass
 
 
+class BinStreamingTicker(StreamingTicker, BinTicker):
+    _stream_url = "wss://stream.binance.com:9443"
+
+    def _endpoint(self) -> str:
+        # combined stream: best bid/ask plus trades for the last price
+        symbol = self._product.prod_id.lower()
+        return f"{self._stream_url}/stream?streams={symbol}@bookTicker/{symbol}@trade"
+
+    def _parse(self, message) -> bool:
+        data = message.get("data", message)
+        if "u" in data and "b" in data and "a" in data:
+            self._bid = float(data["b"])
+            self._ask = float(data["a"])
+            return True
+        elif data.get("e") == "trade":
+            self._price = float(data["p"])
+            self._volume += float(data["q"])
+            return True
+        return False
+
+
+class BinOrderBook(OrderBook):
+    _stream_url = "wss://stream.binance.com:9443"
+    # the depths of the REST snapshot, up to 1000 levels weigh 10
+    _limits = [5, 10, 20, 50, 100, 500, 1000]
+    # diffs kept while the snapshot is being fetched
+    _max_buffer = 1000
+
+    def __init__(self, auth_client: BinTradeClient, product: BinProduct, depth: int = 100) -> None:
+        super().__init__(auth_client, product, depth)
+        self._levels = next((limit for limit in self._limits if limit >= depth), self._limits[-1])
+        self._buffer = deque(maxlen=self._max_buffer)
+        self._pending = None
+
+    def _fetch(self) -> tuple:
+        book = self._auth_client.request("book", self._auth_client.client.get_order_book,
+                                         symbol=self._product.prod_id, limit=self._levels)
+        return book["bids"], book["asks"], book["lastUpdateId"]
+
+    def _endpoint(self) -> str:
+        return f"{self._stream_url}/ws/{self._product.prod_id.lower()}@depth@100ms"
+
+    def _subscriptions(self) -> list:
+        # the stream only has diffs, after (re)connecting the snapshot is fetched again
+        self._buffer.clear()
+        self._pending = None
+        return []
+
+    def _apply_event(self, event: dict) -> bool:
+        # U and u are the first and last update id of the event
+        if event["u"] <= self._sequence:
+            # already in the snapshot
+            return False
+        if event["U"] > self._sequence + 1:
+            raise SequenceError(f"{self._product.prod_id} update {event['U']} after {self._sequence}")
+        for price, size in event["b"]:
+            self._bids.set(float(price), float(size))
+        for price, size in event["a"]:
+            self._asks.set(float(price), float(size))
+        self._sequence = event["u"]
+        return True
+
+    def _catch_up(self, event: dict) -> bool:
+        # diffs are buffered until there is a snapshot they continue
+        self._buffer.append(event)
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._auth_client.run_in_executor(self._fetch))
+        if not self._pending.done():
+            return False
+        pending, self._pending = self._pending, None
+        try:
+            bids, asks, sequence = pending.result()
+        except Exception:
+            # the next event fetches it again
+            return False
+        if self._buffer[0]["U"] > sequence + 1:
+            # the snapshot is older than the first diff kept
+            return False
+        self._load(bids, asks, sequence)
+        events = list(self._buffer)
+        self._buffer.clear()
+        for buffered in events:
+            self._apply_event(buffered)
+        return True
+
+    def _apply(self, message) -> bool:
+        event = message.get("data", message)
+        if event.get("e") != "depthUpdate":
+            return False
+        if not self._synced:
+            return self._catch_up(event)
+        try:
+            return self._apply_event(event)
+        except SequenceError:
+            # a new snapshot, the connection itself is fine
+            self._resyncs += 1
+            self._synced = False
+            return self._catch_up(event)
+
+
+class BinMultiTicker(MultiTicker):
+    _ticker_class = BinTicker
+
+    def _fetch(self) -> dict:
+        # the best bids and asks plus the last prices of all symbols, a fraction of the weight of the 24hr tickers
+        book_tickers = self._auth_client.request("book_tickers", self._auth_client.client.get_orderbook_tickers)
+        prices = {product_price["symbol"]: float(product_price["price"])
+                  for product_price in self._auth_client.request("prices", self._auth_client.client.get_all_tickers)
+                  if product_price["symbol"] in self._tickers}
+        return {book_ticker["symbol"]: (float(book_ticker["bidPrice"]),
+                                        float(book_ticker["askPrice"]),
+                                        prices[book_ticker["symbol"]])
+                for book_ticker in book_tickers if book_ticker["symbol"] in prices}
+
+
 class BinOrder(Order):
     def __init__(self, auth_client: BinTradeClient, product: BinProduct, order_type: str,
                  price: float, amount: float) -> None:
         try:
             super().__init__(auth_client, product, order_type, price, amount)
 
-            if not self._product.valid(self._amount, self._price):
+            if not self._product.valid_steps(self._amount_lots, self._price_ticks):
                 raise AttributeError("Invalid amount/price for order")
 
             if self._order_type == "buy":
-                result = self._auth_client.client.order_limit_buy(
+                result = self._auth_client.request(
+                    "order",
+                    self._auth_client.client.order_limit_buy,
                     symbol=self._product.prod_id,
-                    quantity=self._amount,
-                    price=str(self._price))
+                    quantity=self.amount_string,
+                    price=self.price_string)
             elif self._order_type == "sell":
-                result = self._auth_client.client.order_limit_sell(
+                result = self._auth_client.request(
+                    "order",
+                    self._auth_client.client.order_limit_sell,
                     symbol=self._product.prod_id,
-                    quantity=self._amount,
-                    price=str(self._price))
+                    quantity=self.amount_string,
+                    price=self.price_string)
             else:
                 raise AttributeError(f"Invalid order-type: {self._order_type}")
 
@@ -116,16 +295,20 @@ class BinOrder(Order):
             self._settled = True
             self._message = f"Invalid order: {sys.exc_info()[1]}"
 
+    def _parse_update(self, order_update: dict) -> None:
+        self._status = order_update["status"]
+        self._filled_size = float(order_update["executedQty"])
+        self._executed_value = self._filled_size * self._price
+        if self._status in ["CANCELED", "FILLED", "EXPIRED", "REJECTED"]:
+            self._settled = True
+
     def status(self) -> bool:
         try:
-            order_update = self._auth_client.client.get_order(symbol=self._product.prod_id, orderId=self._order_id)
+            order_update = self._auth_client.request("status", self._auth_client.client.get_order,
+                                                     symbol=self._product.prod_id, orderId=self._order_id)
 
             if "orderId" in order_update:
-                self._status = order_update["status"]
-                self._filled_size = float(order_update["executedQty"])
-                self._executed_value = self._filled_size * self._price
-                if self._status in ["CANCELED", "FILLED", "EXPIRED", "REJECTED"]:
-                    self._settled = True
+                self._parse_update(order_update)
             else:
                 # order (most likely) not found, set settled flag
                 self._settled = True
@@ -144,7 +327,8 @@ class BinOrder(Order):
         if not self._settled:
             try:
                 super().cancel()
-                self._auth_client.client.cancel_order(symbol=self._product.prod_id, orderId=self._order_id)
+                self._auth_client.request("cancel", self._auth_client.client.cancel_order,
+                                          symbol=self._product.prod_id, orderId=self._order_id)
             except Exception:
                 self._message = "Cancellation failed"
 
@@ -156,7 +340,7 @@ class BinAccount(Account):
 
     def update(self) -> None:
         try:
-            account = self._auth_client.client.get_account()
+            account = self._auth_client.request("account", self._auth_client.client.get_account)
             self._balance.clear()
             if "balances" in account:
                 for balance in account["balances"]:
@@ -171,13 +355,70 @@ class BinAccount(Account):
             pass
 
 
+class BinOrderManager(OrderManager):
+    def _snapshot(self) -> dict:
+        open_orders = self._auth_client.request("open_orders", self._auth_client.client.get_open_orders)
+        updates = {order["orderId"]: order for order in open_orders}
+
+        # orders that left the open list, one query per symbol starting at the oldest of them
+        closed = {}
+        for order_id, order in list(self._orders.items()):
+            if order_id not in updates:
+                symbol = order.product.prod_id
+                closed[symbol] = min(closed.get(symbol, order_id), order_id)
+        for symbol, order_id in closed.items():
+            for order in self._auth_client.request("closed_orders", self._auth_client.client.get_all_orders,
+                                                   symbol=symbol, orderId=order_id):
+                updates.setdefault(order["orderId"], order)
+        return updates
+
+
+class BinExecutionStream(ExecutionStream):
+    _stream_url = "wss://stream.binance.com:9443/ws"
+    # a listen key expires 60 minutes after its last keepalive
+    _keepalive_interval = 30 * 60
+
+    def __init__(self, auth_client: BinTradeClient, order_manager: BinOrderManager, products: list = None) -> None:
+        super().__init__(auth_client, order_manager, products)
+        self._listen_key = None
+        if self._auth_client.client.API_KEY is None:
+            # the user data stream requires credentials, fall back to REST only
+            self._stream_url = None
+
+    async def _endpoint(self) -> str:
+        self._listen_key = await self._auth_client.run_in_executor(
+            self._auth_client.request, "listen_key", self._auth_client.client.stream_get_listen_key)
+        return f"{self._stream_url}/{self._listen_key}"
+
+    async def _keepalive(self) -> None:
+        while True:
+            await asyncio.sleep(self._keepalive_interval)
+            if self._listen_key is not None:
+                try:
+                    await self._auth_client.run_in_executor(
+                        self._auth_client.request, "listen_key", self._auth_client.client.stream_keepalive,
+                        self._listen_key)
+                except Exception:
+                    # ignore, a new listen key is requested when the stream reconnects
+                    pass
+
+    def _events(self, message) -> list:
+        if message.get("e") == "executionReport":
+            return [(message["i"], message)]
+        return []
+
+    def _order_update(self, order: BinOrder, event: dict) -> dict:
+        # X: current order status, z: cumulative filled quantity
+        return {"orderId": event["i"], "status": event["X"], "executedQty": event["z"]}
+
+
 class BinApiCreator(ApiCreator):
     _maker_fee = 0.001
     _taker_fee = 0.002
 
     @staticmethod
-    def create_trade_client(credentials: dict) -> BinTradeClient:
-        return BinTradeClient(credentials)
+    def create_trade_client(credentials: dict, max_workers: int = None) -> BinTradeClient:
+        return BinTradeClient(credentials, max_workers)
 
     @staticmethod
     def create_currency(currency_id: str) -> BinCurrency:
@@ -192,6 +433,18 @@ class BinApiCreator(ApiCreator):
     def create_ticker(auth_client: BinTradeClient, product: BinProduct) -> BinTicker:
         return BinTicker(auth_client, product)
 
+    @staticmethod
+    def create_streaming_ticker(auth_client: BinTradeClient, product: BinProduct) -> BinStreamingTicker:
+        return BinStreamingTicker(auth_client, product)
+
+    @staticmethod
+    def create_multi_ticker(auth_client: BinTradeClient, products: list) -> BinMultiTicker:
+        return BinMultiTicker(auth_client, products)
+
+    @staticmethod
+    def create_order_book(auth_client: BinTradeClient, product: BinProduct, depth: int = 100) -> BinOrderBook:
+        return BinOrderBook(auth_client, product, depth)
+
     @staticmethod
     def create_order(auth_client: BinTradeClient, product: BinProduct, order_type: str, price: float,
                      amount: float) -> BinOrder:
@@ -200,3 +453,12 @@ class BinApiCreator(ApiCreator):
     @staticmethod
     def create_account(auth_client: BinTradeClient) -> BinAccount:
         return BinAccount(auth_client)
+
+    @staticmethod
+    def create_order_manager(auth_client: BinTradeClient) -> BinOrderManager:
+        return BinOrderManager(auth_client)
+
+    @staticmethod
+    def create_execution_stream(auth_client: BinTradeClient, order_manager: BinOrderManager,
+                                products: list = None) -> BinExecutionStream:
+        return BinExecutionStream(auth_client, order_manager, products)
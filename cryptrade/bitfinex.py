@@ -1,19 +1,102 @@
+import aiohttp
 import bfxapi.client
 import bfxapi.models.notification
 from bfxapi.models.order import OrderType
-
-from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, Order, Account, ApiCreator
-from cryptrade.exceptions import AuthenticationError, ProductError
+from bfxapi.utils.auth import generate_auth_headers, generate_auth_payload
+
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, MultiTicker, Order, Account, \
+    OrderManager, ApiCreator
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.streaming import StreamingTicker
+from cryptrade.executions import ExecutionStream
+from cryptrade.orderbook import OrderBook
+from cryptrade.scheduler import PRIORITY_TRADE, PRIORITY_ACCOUNT, PRIORITY_MARKET
+from cryptrade.exceptions import AuthenticationError, ProductError, SequenceError
+from cryptrade.connections import ConnectionPool
 
 import sys
+import json
+import time
 from datetime import datetime
+from threading import Thread, current_thread
 import asyncio
 
 
-class BfxTradeClient(TradeClient):
-    def __init__(self, credentials: dict) -> None:
-        super().__init__()
+class BfxRest(bfxapi.client.BfxRest):
+    # bfxapi opens (and closes) a new HTTP session for every request, keep one session per event loop instead
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._sessions = {}
+
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed or session.connector.closed:
+            for other_loop in [other_loop for other_loop in self._sessions if other_loop.is_closed()]:
+                del self._sessions[other_loop]
+            # the connections are shared by all sessions on this loop, closing the session leaves them open
+            session = aiohttp.ClientSession(connector=ConnectionPool.connector(), connector_owner=False)
+            self._sessions[loop] = session
+        return session
+
+    async def prewarm(self, connections: int = 1) -> None:
+        async def connect() -> None:
+            try:
+                async with self._session().head(self.host):
+                    pass
+            except aiohttp.ClientError:
+                pass
+
+        await asyncio.gather(*[connect() for _ in range(connections)])
+
+    async def fetch(self, endpoint: str, params: str = ""):
+        url = f"{self.host}/{endpoint}{params}"
+        async with self._session().get(url) as resp:
+            text = await resp.text()
+            if resp.status != 200:
+                raise Exception(f"GET {url} failed with status {resp.status} - {text}")
+            return json.loads(text, parse_float=self.parse_float)
+
+    async def post(self, endpoint: str, data: dict = None, params: str = ""):
+        url = f"{self.host}/{endpoint}"
+        body = json.dumps(data if data is not None else {})
+        headers = generate_auth_headers(self.API_KEY, self.API_SECRET, endpoint, body)
+        headers["content-type"] = "application/json"
+        async with self._session().post(url + params, headers=headers, data=body) as resp:
+            text = await resp.text()
+            if resp.status < 200 or resp.status > 299:
+                raise Exception(f"POST {url} failed with status {resp.status} - {text}")
+            return json.loads(text, parse_float=self.parse_float)
+
+    async def close(self) -> None:
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
 
+
+class BfxTradeClient(TradeClient):
+    # requests per minute
+    _rate_limits = {
+        "public": (90, 1.5),
+        "private": (90, 1.5)}
+    _request_costs = {
+        "product": (PRIORITY_MARKET, {"public": 1}),
+        "ticker": (PRIORITY_MARKET, {"public": 1}),
+        "tickers": (PRIORITY_MARKET, {"public": 1}),
+        "book": (PRIORITY_MARKET, {"public": 1}),
+        "order": (PRIORITY_TRADE, {"private": 1}),
+        "cancel": (PRIORITY_TRADE, {"private": 1}),
+        "status": (PRIORITY_ACCOUNT, {"private": 1}),
+        "open_orders": (PRIORITY_ACCOUNT, {"private": 1}),
+        "closed_orders": (PRIORITY_ACCOUNT, {"private": 1}),
+        "account": (PRIORITY_ACCOUNT, {"private": 1})}
+
+    def __init__(self, credentials: dict, max_workers: int = None) -> None:
+        super().__init__(max_workers)
+
+        # a different host, eg. a cryptrade.mockserver
+        api_url = credentials.get("bitfinex", {}).get("api_url", "https://api.bitfinex.com")
+        self._api_url = api_url
         if "bitfinex" in credentials and \
                 "api_key" in credentials["bitfinex"] and \
                 "api_secret" in credentials["bitfinex"]:
@@ -22,19 +105,93 @@ class BfxTradeClient(TradeClient):
             try:
                 # for product information v1 of the API is required, the rest is done on v2
                 self._client = {
-                    "v1": bfxapi.client.BfxRest(api_key, api_secret, host="https://api.bitfinex.com/v1"),
-                    "v2": bfxapi.client.BfxRest(api_key, api_secret, host="https://api.bitfinex.com/v2")}
+                    "v1": BfxRest(api_key, api_secret, host=f"{api_url}/v1"),
+                    "v2": BfxRest(api_key, api_secret, host=f"{api_url}/v2")}
             except Exception:
                 raise AuthenticationError("invalid Bitfinex API key and/or secret")
         else:
             try:
                 # for product information v1 of the API is required, the rest is done on v2
                 self._client = {
-                    "v1": bfxapi.client.BfxRest(API_KEY=None, API_SECRET=None, host="https://api.bitfinex.com/v1"),
-                    "v2": bfxapi.client.BfxRest(API_KEY=None, API_SECRET=None, host="https://api.bitfinex.com/v2")}
+                    "v1": BfxRest(API_KEY=None, API_SECRET=None, host=f"{api_url}/v1"),
+                    "v2": BfxRest(API_KEY=None, API_SECRET=None, host=f"{api_url}/v2")}
             except Exception:
                 raise AuthenticationError("Could not create non-authenticated Client for Bitfinex")
 
+        self._catalogue = BfxProductCatalogue(self)
+
+        # one long-lived event loop for all synchronous calls
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, name="bitfinex", daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine):
+        # synchronous facade, thread-safe; from async code the coroutine runs on the caller's loop instead, the task
+        # is returned for the caller to await, eg. `await ticker.update()`
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+        return loop.create_task(coroutine)
+
+    def _wait(self, coroutine):
+        # blocks on the client's loop, also from async code: for what can't be awaited (the product catalogue) and
+        # for closing the client
+        if current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("BfxTradeClient cannot wait for its own event loop")
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _response_error(self, result) -> str:
+        # order submissions, updates and cancellations are answered with a notification
+        if isinstance(result, bfxapi.models.notification.Notification) and not result.is_success():
+            return "ErrorNotification"
+        return None
+
+    @property
+    def api_url(self) -> str:
+        return self._api_url
+
+    def prewarm(self, connections: int = 1):
+        return self.run(self._client["v2"].prewarm(connections))
+
+    async def _close(self) -> None:
+        # the sessions and connections of the running loop
+        for client in self._client.values():
+            await client.close()
+        await ConnectionPool.close_connector()
+
+    def close(self):
+        closing = None
+        if self._loop.is_running():
+            self._wait(self._close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            try:
+                # from async code, what was made on the caller's loop goes too: `await client.close()`
+                closing = asyncio.get_running_loop().create_task(self._close())
+            except RuntimeError:
+                pass
+        super().close()
+        return closing
+
+
+class BfxProductCatalogue(ProductCatalogue):
+    _exchange = "bitfinex"
+
+    def fetch(self) -> dict:
+        products = {}
+        for product in self._auth_client._wait(self._auth_client.async_request(
+                "product", self._auth_client.client["v1"].fetch, "symbols_details")):
+            products[product["pair"].upper()] = {
+                "min_order_amount": float(product["minimum_order_size"]),
+                "min_order_price": 0,
+                "min_order_value": 0,
+                "order_price_precision": None,
+                "order_amount_precision": None}
+        return products
+
 
 class BfxCurrency(Currency):
     _currency_map = {
@@ -50,27 +207,24 @@ class BfxProduct(Product):
                  buying_currency: BfxCurrency) -> None:
         try:
             super().__init__(auth_client, trading_currency, buying_currency)
-
-            product_list = asyncio.run(self._auth_client.client["v1"].fetch("symbols_details"))
-            product_found = False
-            for product in product_list:
-                if product["pair"] == self.prod_id.lower():
-                    self._min_order_amount = float(product["minimum_order_size"])
-                    self._min_order_price = 0
-                    self._min_order_value = 0
-                    self._order_price_precision = None
-                    self._order_amount_precision = None
-                    product_found = True
-                    break
-
-            if not product_found:
-                raise ProductError(f"{trading_currency}/{buying_currency} not supported on Bitfinex")
+            self._set_details(self._auth_client.catalogue.get(self.prod_id))
 
         except ProductError:
             raise
         except Exception:
             raise ProductError(f"{trading_currency}/{buying_currency} not supported on Bitfinex")
 
+    @classmethod
+    def _map_unknown_product(cls, prod_id: str) -> str:
+        # pairs are the concatenated currency ids, separated by a colon for ids longer than 3 characters
+        if ":" in prod_id:
+            trading, buying = prod_id.split(":", 1)
+        elif len(prod_id) == 6:
+            trading, buying = prod_id[:3], prod_id[3:]
+        else:
+            return prod_id
+        return BfxCurrency.map_from_exchange_currency(trading) + BfxCurrency.map_from_exchange_currency(buying)
+
     @property
     def prod_id(self) -> str:
         return self._trading_currency.exchange_currency_id + self._buying_currency.exchange_currency_id
@@ -83,7 +237,8 @@ class BfxTicker(Ticker):
 
     async def async_update(self) -> None:
         try:
-            product_ticker = await self._auth_client.client["v2"].get_public_ticker("t" + self._product.prod_id)
+            product_ticker = await self._auth_client.async_request(
+                "ticker", self._auth_client.client["v2"].get_public_ticker, "t" + self._product.prod_id)
             self._bid = product_ticker[0]
             self._ask = product_ticker[2]
             self._price = product_ticker[6]
@@ -93,8 +248,150 @@ class BfxTicker(Ticker):
             # ignore exceptions
             pass
 
-    def update(self) -> None:
-        asyncio.run(self.async_update())
+    def update(self):
+        return self._auth_client.run(self.async_update())
+
+    async def produce(self, interval: int) -> None:
+        while True:
+            await self.async_update()
+            await self.notify()
+            await asyncio.sleep(interval)
+
+
+class BfxStreamingTicker(StreamingTicker, BfxTicker):
+    _stream_url = "wss://api-pub.bitfinex.com/ws/2"
+
+    def __init__(self, auth_client: BfxTradeClient, product: BfxProduct) -> None:
+        super().__init__(auth_client, product)
+        self._channel = None
+        self._trades_channel = None
+
+    def _subscriptions(self) -> list:
+        self._channel = None
+        self._trades_channel = None
+        return [{"event": "subscribe", "channel": "ticker", "symbol": "t" + self._product.prod_id},
+                {"event": "subscribe", "channel": "trades", "symbol": "t" + self._product.prod_id}]
+
+    def _parse(self, message) -> bool:
+        if isinstance(message, dict):
+            if message.get("event") == "subscribed" and message.get("channel") == "ticker":
+                self._channel = message["chanId"]
+            elif message.get("event") == "subscribed" and message.get("channel") == "trades":
+                self._trades_channel = message["chanId"]
+        elif len(message) > 1 and message[0] == self._channel and isinstance(message[1], list):
+            # [BID, BID_SIZE, ASK, ASK_SIZE, DAILY_CHANGE, DAILY_CHANGE_RELATIVE, LAST_PRICE, ...], "hb" otherwise
+            self._bid = message[1][0]
+            self._ask = message[1][2]
+            self._price = message[1][6]
+            return True
+        elif len(message) > 2 and message[0] == self._trades_channel and message[1] == "te":
+            # [ID, MTS, AMOUNT, PRICE], the amount is negative for a sell; "tu" repeats the trade, the snapshot
+            # holds earlier trades
+            self._volume += abs(message[2][2])
+            self._price = message[2][3]
+            return True
+        return False
+
+    async def _poll(self) -> None:
+        await self.async_update()
+
+
+class BfxOrderBook(OrderBook):
+    _stream_url = "wss://api-pub.bitfinex.com/ws/2"
+    # the lengths of a book subscription
+    _lengths = [1, 25, 100, 250]
+    # configuration flag that adds a sequence number to every message
+    _seq_all = 65536
+
+    def __init__(self, auth_client: BfxTradeClient, product: BfxProduct, depth: int = 100) -> None:
+        super().__init__(auth_client, product, depth)
+        self._levels = next((length for length in self._lengths if length >= depth), self._lengths[-1])
+        self._channel = None
+
+    @staticmethod
+    def _sides(entries: list) -> tuple:
+        # [PRICE, COUNT, AMOUNT], a positive amount is a bid
+        return [(price, amount) for price, count, amount in entries if amount > 0], \
+               [(price, -amount) for price, count, amount in entries if amount < 0]
+
+    async def _async_fetch(self) -> tuple:
+        book = await self._auth_client.async_request("book", self._auth_client.client["v2"].get_public_books,
+                                                     "t" + self._product.prod_id, "P0", self._levels)
+        bids, asks = self._sides(book)
+        return bids, asks, None
+
+    def _fetch(self) -> tuple:
+        return self._auth_client._wait(self._async_fetch())
+
+    async def _poll(self) -> None:
+        try:
+            bids, asks, sequence = await self._async_fetch()
+            self._load(bids, asks, sequence)
+            self._timestamp = datetime.now()
+
+        except Exception:
+            # ignore exceptions
+            pass
+
+    def _subscriptions(self) -> list:
+        self._channel = None
+        self._sequence = None
+        return [{"event": "conf", "flags": self._seq_all},
+                {"event": "subscribe", "channel": "book", "symbol": "t" + self._product.prod_id, "prec": "P0",
+                 "freq": "F0", "len": str(self._levels)}]
+
+    def _apply(self, message) -> bool:
+        if isinstance(message, dict):
+            if message.get("event") == "subscribed" and message.get("channel") == "book":
+                self._channel = message["chanId"]
+            return False
+        if self._channel is None or len(message) < 3 or message[0] != self._channel:
+            return False
+
+        # [channel id, data, sequence], heartbeats included
+        sequence = message[-1]
+        if self._sequence is not None and sequence != self._sequence + 1:
+            raise SequenceError(f"t{self._product.prod_id} message {sequence} after {self._sequence}")
+        self._sequence = sequence
+        data = message[1]
+        if not isinstance(data, list):
+            # "hb"
+            return False
+        if len(data) > 0 and isinstance(data[0], list):
+            bids, asks = self._sides(data)
+            self._load(bids, asks, sequence)
+            return True
+        if not self._synced:
+            return False
+        price, count, amount = data
+        if count == 0:
+            # removed, the amount is 1 for a bid and -1 for an ask
+            (self._bids if amount > 0 else self._asks).set(price, 0)
+        elif amount > 0:
+            self._bids.set(price, amount)
+        else:
+            self._asks.set(price, -amount)
+        return True
+
+
+class BfxMultiTicker(MultiTicker):
+    _ticker_class = BfxTicker
+
+    async def async_update(self) -> None:
+        try:
+            symbols = ",".join("t" + prod_id for prod_id in self._tickers)
+            product_tickers = await self._auth_client.async_request(
+                "tickers", self._auth_client.client["v2"].fetch, f"tickers?symbols={symbols}")
+            # multi-symbol tickers are prefixed with their symbol
+            self._distribute({product_ticker[0][1:]: (product_ticker[1], product_ticker[3], product_ticker[7])
+                              for product_ticker in product_tickers})
+
+        except Exception:
+            # ignore exceptions
+            pass
+
+    def update(self):
+        return self._auth_client.run(self.async_update())
 
     async def produce(self, interval: int) -> None:
         while True:
@@ -109,18 +406,39 @@ class BfxOrder(Order):
         try:
             super().__init__(auth_client, product, order_type, price, amount)
 
-            if not self._product.valid(self._amount, self._price):
+            if not self._product.valid_steps(self._amount_lots, self._price_ticks):
                 raise AttributeError("Invalid amount/price for order")
-
-            if self._order_type == "buy":
-                order_result = asyncio.run(self._auth_client.client["v2"].submit_order(
-                    "t"+self._product.prod_id, self._price, self._amount, market_type=OrderType.EXCHANGE_LIMIT))
-            elif self._order_type == "sell":
-                order_result = asyncio.run(self._auth_client.client["v2"].submit_order(
-                    "t"+self._product.prod_id, self._price, -1 * self._amount, market_type=OrderType.EXCHANGE_LIMIT))
-            else:
+            if self._order_type not in ["buy", "sell"]:
                 raise AttributeError("invalid order-type (buy/sell)")
 
+        except Exception:
+            self._failed()
+            self._placement = None
+            return
+
+        # placed before returning, from async code in the background: `order = await BfxOrder(...)`
+        self._placement = self._auth_client.run(self._place())
+
+    def __await__(self):
+        if self._placement is not None:
+            yield from self._placement.__await__()
+        return self
+
+    def _failed(self) -> None:
+        self._order_id = ""
+        self._status = "error"
+        self._filled_size = 0.0
+        self._executed_value = 0.0
+        self._settled = True
+        self._message = f"Invalid order: {sys.exc_info()[1]}"
+
+    async def _place(self) -> None:
+        try:
+            amount = self._amount if self._order_type == "buy" else -1 * self._amount
+            order_result = await self._auth_client.async_request(
+                "order", self._auth_client.client["v2"].submit_order,
+                "t"+self._product.prod_id, self._price, amount, market_type=OrderType.EXCHANGE_LIMIT)
+
             if order_result.is_success():
                 self._created = True
                 self._order_id = order_result.notify_info[0].id
@@ -133,23 +451,22 @@ class BfxOrder(Order):
                 raise AttributeError("unknown error")
 
         except Exception:
-            self._order_id = ""
-            self._status = "error"
-            self._filled_size = 0.0
-            self._executed_value = 0.0
+            self._failed()
+
+    def _parse_update(self, order_update: "bfxapi.models.Order") -> None:
+        self._status = order_update.status
+        self._filled_size = abs(order_update.amount_filled)
+        self._executed_value = self._filled_size * self._price
+        if "CANCELED" in self._status or "EXECUTED" in self._status:
             self._settled = True
-            self._message = f"Invalid order: {sys.exc_info()[1]}"
 
-    def status(self) -> bool:
+    async def async_status(self) -> bool:
         try:
-            order_update = asyncio.run(self._auth_client.client["v2"].submit_update_order(self._order_id))
+            order_update = await self._auth_client.async_request(
+                "status", self._auth_client.client["v2"].submit_update_order, self._order_id)
 
             if order_update.is_success():
-                self._status = order_update.notify_info.status
-                self._filled_size = abs(order_update.notify_info.amount_filled)
-                self._executed_value = self._filled_size * self._price
-                if "CANCELED" in self._status or "EXECUTED" in self._status:
-                    self._settled = True
+                self._parse_update(order_update.notify_info)
             else:
                 self._settled = True
                 raise AttributeError("order update failed")
@@ -165,14 +482,27 @@ class BfxOrder(Order):
 
         return self._settled
 
-    def cancel(self) -> None:
+    def status(self):
+        return self._auth_client.run(self.async_status())
+
+    async def produce(self, interval: int) -> None:
+        while True:
+            if await self.async_status():
+                await self.notify()
+            await asyncio.sleep(interval)
+
+    async def async_cancel(self) -> None:
         if not self._settled:
             try:
                 super().cancel()
-                asyncio.run(self._auth_client.client["v2"].submit_cancel_order(self._order_id))
+                await self._auth_client.async_request(
+                    "cancel", self._auth_client.client["v2"].submit_cancel_order, self._order_id)
             except Exception:
                 self._message = "Cancellation failed"
 
+    def cancel(self):
+        return self._auth_client.run(self.async_cancel())
+
 
 class BfxAccount(Account):
     def __init__(self, auth_client: BfxTradeClient) -> None:
@@ -181,7 +511,7 @@ class BfxAccount(Account):
 
     async def async_update(self) -> None:
         try:
-            account_info = await self._auth_client.client["v2"].get_wallets()
+            account_info = await self._auth_client.async_request("account", self._auth_client.client["v2"].get_wallets)
             self._balance.clear()
             for wallet in account_info:
                 c = BfxCurrency.map_from_exchange_currency(wallet.currency.upper())
@@ -193,8 +523,8 @@ class BfxAccount(Account):
             # ignore
             pass
 
-    def update(self) -> None:
-        asyncio.run(self.async_update())
+    def update(self):
+        return self._auth_client.run(self.async_update())
 
     async def produce(self, interval: int) -> None:
         while True:
@@ -203,13 +533,82 @@ class BfxAccount(Account):
             await asyncio.sleep(interval)
 
 
+class BfxOrderManager(OrderManager):
+    # number of most recent closed orders retrieved per symbol
+    _history_size = 100
+
+    async def async_snapshot(self) -> dict:
+        client = self._auth_client.client["v2"]
+        updates = {}
+        for symbol in {"t" + order.product.prod_id for order in self._orders.values()}:
+            for order in await self._auth_client.async_request("open_orders", client.get_active_orders, symbol):
+                updates[order.id] = order
+
+        closed = {"t" + order.product.prod_id for order_id, order in self._orders.items() if order_id not in updates}
+        for symbol in closed:
+            for order in await self._auth_client.async_request("closed_orders", client.get_order_history,
+                                                               symbol, 0, int(time.time() * 1000), self._history_size):
+                updates.setdefault(order.id, order)
+        return updates
+
+    def _snapshot(self) -> dict:
+        return self._auth_client._wait(self.async_snapshot())
+
+    async def async_reconcile(self) -> list:
+        if len(self._orders) == 0:
+            return []
+        try:
+            updates = await self.async_snapshot()
+        except Exception:
+            # try again next cycle
+            return []
+        return self._reconcile(updates)
+
+    async def produce(self, interval: int) -> None:
+        while True:
+            for order in await self.async_reconcile():
+                await order.notify()
+            await asyncio.sleep(interval)
+
+
+class BfxExecutionStream(ExecutionStream):
+    _stream_url = "wss://api.bitfinex.com/ws/2"
+
+    def __init__(self, auth_client: BfxTradeClient, order_manager: BfxOrderManager, products: list = None) -> None:
+        super().__init__(auth_client, order_manager, products)
+        if self._auth_client.client["v2"].API_KEY is None:
+            # the account channel requires credentials, fall back to REST only
+            self._stream_url = None
+
+    async def _subscriptions(self) -> list:
+        client = self._auth_client.client["v2"]
+        # only order and trade events, the account channel would otherwise include wallets, positions, etc.
+        return [dict(generate_auth_payload(client.API_KEY, client.API_SECRET), filter=["trading"])]
+
+    def _events(self, message) -> list:
+        # account events arrive on channel 0: [0, "os", [order, ...]] or [0, "on"/"ou"/"oc", order]
+        if isinstance(message, list) and len(message) > 2 and message[0] == 0:
+            if message[1] == "os":
+                return [(raw_order[0], raw_order) for raw_order in message[2]]
+            elif message[1] in ["on", "ou", "oc"]:
+                return [(message[2][0], message[2])]
+        return []
+
+    def _order_update(self, order: BfxOrder, event: list) -> "bfxapi.models.Order":
+        return bfxapi.models.Order.from_raw_order(event)
+
+    async def reconcile(self) -> None:
+        for order in await self._order_manager.async_reconcile():
+            await order.notify()
+
+
 class BfxApiCreator(ApiCreator):
     _maker_fee = 0.001
     _taker_fee = 0.002
 
     @staticmethod
-    def create_trade_client(credentials: dict) -> BfxTradeClient:
-        return BfxTradeClient(credentials)
+    def create_trade_client(credentials: dict, max_workers: int = None) -> BfxTradeClient:
+        return BfxTradeClient(credentials, max_workers)
 
     @staticmethod
     def create_currency(currency_id: str) -> BfxCurrency:
@@ -224,6 +623,18 @@ class BfxApiCreator(ApiCreator):
     def create_ticker(auth_client: BfxTradeClient, product: BfxProduct) -> BfxTicker:
         return BfxTicker(auth_client, product)
 
+    @staticmethod
+    def create_streaming_ticker(auth_client: BfxTradeClient, product: BfxProduct) -> BfxStreamingTicker:
+        return BfxStreamingTicker(auth_client, product)
+
+    @staticmethod
+    def create_multi_ticker(auth_client: BfxTradeClient, products: list) -> BfxMultiTicker:
+        return BfxMultiTicker(auth_client, products)
+
+    @staticmethod
+    def create_order_book(auth_client: BfxTradeClient, product: BfxProduct, depth: int = 100) -> BfxOrderBook:
+        return BfxOrderBook(auth_client, product, depth)
+
     @staticmethod
     def create_order(auth_client: BfxTradeClient, product: BfxProduct, order_type: str, price: float,
                      amount: float) -> BfxOrder:
@@ -232,3 +643,12 @@ class BfxApiCreator(ApiCreator):
     @staticmethod
     def create_account(auth_client: BfxTradeClient) -> BfxAccount:
         return BfxAccount(auth_client)
+
+    @staticmethod
+    def create_order_manager(auth_client: BfxTradeClient) -> BfxOrderManager:
+        return BfxOrderManager(auth_client)
+
+    @staticmethod
+    def create_execution_stream(auth_client: BfxTradeClient, order_manager: BfxOrderManager,
+                                products: list = None) -> BfxExecutionStream:
+        return BfxExecutionStream(auth_client, order_manager, products)
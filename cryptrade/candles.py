@@ -0,0 +1,219 @@
+from cryptrade.observers import Observable, Observer
+from cryptrade.exchange_api import Ticker
+from cryptrade.history import ColumnHistory
+
+from collections import namedtuple
+
+# seconds, every timeframe a multiple of the one before
+TIMEFRAMES = (1, 60, 300, 3600, 86400)
+
+Candle = namedtuple("Candle", ["product", "timeframe", "time", "open", "high", "low", "close", "volume"])
+Candles = namedtuple("Candles", ["time", "open", "high", "low", "close", "volume"])
+
+# the fields of an open bar, kept in a list to be updated in place
+START, END, OPEN, HIGH, LOW, CLOSE, VOLUME = range(7)
+
+
+class CandleHistory(ColumnHistory):
+    # closed bars of one timeframe, timestamped with the start of the bar in seconds
+    _columns = ("time", "open", "high", "low", "close", "volume")
+    _types = ("q", "d", "d", "d", "d", "d")
+    _record = Candles
+
+    def append(self, timestamp: int, open_price: float, high: float, low: float, close: float,
+               volume: float) -> None:
+        index = self._next()
+        self._time[index] = timestamp
+        self._open[index] = open_price
+        self._high[index] = high
+        self._low[index] = low
+        self._close[index] = close
+        self._volume[index] = volume
+
+
+class CandleBuilder:
+    # the open bars of one product, one per timeframe; only the shortest timeframe sees the ticks, a bar that closes
+    # is merged into the open bar of the next timeframe
+    def __init__(self, product: str, timeframes: tuple = TIMEFRAMES, capacity: int = 1000) -> None:
+        for shorter, longer in zip(timeframes, timeframes[1:]):
+            if longer % shorter != 0:
+                raise ValueError(f"timeframe {longer} is not a multiple of {shorter}")
+        self._product = product
+        self._timeframes = timeframes
+        self._bars = [None] * len(timeframes)
+        # per timeframe the end of the last closed bar, data arriving later goes into the next bar
+        self._until = [0] * len(timeframes)
+        self._histories = {timeframe: CandleHistory(capacity) for timeframe in timeframes}
+        # bars closed since the last call to closed()
+        self._closed = []
+
+    @property
+    def product(self) -> str:
+        return self._product
+
+    def history(self, timeframe: int) -> CandleHistory:
+        return self._histories[timeframe]
+
+    def add(self, timestamp: float, price: float, volume: float = 0.0) -> bool:
+        # returns whether bars were closed
+        bar = self._bars[0]
+        if bar is not None and timestamp < bar[END]:
+            # late ticks count for the open bar, closed bars aren't changed anymore
+            if price > bar[HIGH]:
+                bar[HIGH] = price
+            elif price < bar[LOW]:
+                bar[LOW] = price
+            bar[CLOSE] = price
+            bar[VOLUME] += volume
+            return False
+
+        self.advance(timestamp)
+        timeframe = self._timeframes[0]
+        # eg. a tick for a bar that advance() already closed
+        start = max(int(timestamp // timeframe) * timeframe, self._until[0])
+        self._bars[0] = [start, start + timeframe, price, price, price, price, volume]
+        return len(self._closed) > 0
+
+    def advance(self, now: float) -> None:
+        # close the bars that ended before now, shorter timeframes first
+        for level in range(len(self._timeframes)):
+            bar = self._bars[level]
+            if bar is None:
+                # closed by an earlier call without a tick since
+                continue
+            if now < bar[END]:
+                return
+            self._close(level, bar)
+
+    def _close(self, level: int, bar: list) -> None:
+        self._bars[level] = None
+        self._until[level] = bar[END]
+        self._histories[self._timeframes[level]].append(bar[START], bar[OPEN], bar[HIGH], bar[LOW], bar[CLOSE],
+                                                        bar[VOLUME])
+        self._closed.append(Candle(self._product, self._timeframes[level], bar[START], bar[OPEN], bar[HIGH],
+                                   bar[LOW], bar[CLOSE], bar[VOLUME]))
+        if level + 1 < len(self._timeframes):
+            self._merge(level + 1, bar)
+
+    def _merge(self, level: int, child: list) -> None:
+        parent = self._bars[level]
+        if parent is not None and child[START] >= parent[END]:
+            self._close(level, parent)
+            parent = None
+        if parent is None:
+            timeframe = self._timeframes[level]
+            start = max(child[START] - child[START] % timeframe, self._until[level])
+            self._bars[level] = [start, start + timeframe, child[OPEN], child[HIGH], child[LOW], child[CLOSE],
+                                 child[VOLUME]]
+        else:
+            if child[HIGH] > parent[HIGH]:
+                parent[HIGH] = child[HIGH]
+            if child[LOW] < parent[LOW]:
+                parent[LOW] = child[LOW]
+            parent[CLOSE] = child[CLOSE]
+            parent[VOLUME] += child[VOLUME]
+
+    def current(self, timeframe: int) -> Candle:
+        # the open bar of a timeframe, including the open bars of the shorter timeframes that belong to it
+        level = self._timeframes.index(timeframe)
+        newest = next((bar for bar in self._bars[:level + 1] if bar is not None), None)
+        if newest is None:
+            return None
+        start = newest[START] - newest[START] % timeframe
+        bars = [bar for bar in reversed(self._bars[:level + 1])
+                if bar is not None and start <= bar[START] < start + timeframe]
+        return Candle(self._product, timeframe, start, bars[0][OPEN], max(bar[HIGH] for bar in bars),
+                      min(bar[LOW] for bar in bars), bars[-1][CLOSE], sum(bar[VOLUME] for bar in bars))
+
+    def closed(self) -> list:
+        closed, self._closed = self._closed, []
+        return closed
+
+
+class CandleFeed(Observer):
+    def __init__(self, aggregator: "CandleAggregator", ticker: Ticker) -> None:
+        self._aggregator = aggregator
+        # eg. BTC-EUR, the same on every exchange unlike the product id
+        self._product = str(ticker.product)
+        # the volume traded between two notifications, also when notifications are conflated
+        self._volume = ticker.volume
+        super().__init__(ticker)
+
+    @property
+    def ticker(self) -> Ticker:
+        return self._observable
+
+    async def notify(self, ticker: Ticker) -> None:
+        timestamp = ticker.timestamp
+        if timestamp is None or ticker.price <= 0:
+            return
+        volume, self._volume = max(ticker.volume - self._volume, 0.0), ticker.volume
+        if len(self._aggregator.add(self._product, timestamp.timestamp(), ticker.price, volume)) > 0:
+            await self._aggregator.notify()
+
+
+class CandleAggregator(Observable):
+    def __init__(self, timeframes: tuple = TIMEFRAMES, capacity: int = 1000) -> None:
+        # capacity: the number of closed bars kept per product and timeframe
+        super().__init__()
+        self._timeframes = tuple(timeframes)
+        self._capacity = capacity
+        self._builders = {}
+        self._feeds = []
+        # the bars closed by the last update
+        self._closed = []
+
+    @property
+    def timeframes(self) -> tuple:
+        return self._timeframes
+
+    @property
+    def products(self) -> list:
+        return list(self._builders)
+
+    def watch(self, ticker: Ticker) -> None:
+        self._feeds.append(CandleFeed(self, ticker))
+
+    def close(self) -> None:
+        for feed in self._feeds:
+            feed.ticker.detach(feed)
+        self._feeds = []
+
+    def _builder(self, product: str) -> CandleBuilder:
+        builder = self._builders.get(product)
+        if builder is None:
+            builder = self._builders[product] = CandleBuilder(product, self._timeframes, self._capacity)
+        return builder
+
+    def add(self, product: str, timestamp: float, price: float, volume: float = 0.0) -> list:
+        # a tick or trade, returns the bars it closed (usually none)
+        builder = self._builders.get(product)
+        if builder is None:
+            builder = self._builder(product)
+        if not builder.add(timestamp, price, volume):
+            return []
+        self._closed = builder.closed()
+        return self._closed
+
+    async def advance(self, now: float) -> list:
+        # close the bars of all products that ended before now, eg. from a timer when ticks are rare, and notify the
+        # observers like a closing tick does
+        closed = []
+        for builder in self._builders.values():
+            builder.advance(now)
+            closed += builder.closed()
+        if len(closed) > 0:
+            self._closed = closed
+            await self.notify()
+        return closed
+
+    @property
+    def closed(self) -> list:
+        return list(self._closed)
+
+    def history(self, product: str, timeframe: int) -> CandleHistory:
+        return self._builder(product).history(timeframe)
+
+    def current(self, product: str, timeframe: int) -> Candle:
+        builder = self._builders.get(product)
+        return builder.current(timeframe) if builder is not None else None
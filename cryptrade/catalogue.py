@@ -0,0 +1,106 @@
+from cryptrade.exceptions import ProductError
+
+import json
+import os
+import re
+import time
+from threading import Lock
+from urllib.parse import urlparse
+
+
+class ProductCatalogue:
+    _exchange = ""
+    _ttl = 24 * 60 * 60
+    _cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "cryptrade")
+
+    # in-memory cache shared by all catalogues in the process: key -> (load time, products)
+    _cache = {}
+    # one lock per key, so a slow exchange doesn't hold up the others; _lock only guards _locks
+    _locks = {}
+    _lock = Lock()
+
+    def __init__(self, auth_client: "TradeClient") -> None:
+        self._auth_client = auth_client
+        self._key = None
+
+    @classmethod
+    def configure(cls, cache_dir: str = None, ttl: int = None) -> None:
+        if cache_dir is not None:
+            ProductCatalogue._cache_dir = cache_dir
+        if ttl is not None:
+            ProductCatalogue._ttl = ttl
+
+    @property
+    def exchange(self) -> str:
+        return self._exchange
+
+    @property
+    def key(self) -> str:
+        # the exchange and the API host, a sandbox or a cryptrade.mockserver has products of its own
+        if self._key is None:
+            api_url = self._auth_client.api_url if self._auth_client is not None else None
+            if api_url is None:
+                self._key = self._exchange
+            else:
+                host = re.sub(r"[^A-Za-z0-9.-]", "_", urlparse(api_url).netloc)
+                self._key = f"{self._exchange}-{host}"
+        return self._key
+
+    @property
+    def cache_file(self) -> str:
+        return os.path.join(self._cache_dir, f"{self.key}.json")
+
+    def fetch(self) -> dict:
+        # load the complete symbol catalogue of the exchange in a single request, keyed by exchange product id
+        return {}
+
+    def _read_cache(self) -> tuple:
+        try:
+            with open(self.cache_file, "r") as fp:
+                cached = json.load(fp)
+            if time.time() - cached["time"] < self._ttl:
+                return cached["time"], cached["products"]
+        except Exception:
+            # missing or corrupt cache file, reload from exchange
+            pass
+        return None
+
+    def _write_cache(self, loaded: float, products: dict) -> None:
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, "w") as fp:
+                json.dump({"time": loaded, "products": products}, fp)
+            os.replace(temp_file, self.cache_file)
+        except Exception:
+            # the disk cache is an optimization only
+            pass
+
+    def _exchange_lock(self) -> Lock:
+        with ProductCatalogue._lock:
+            return ProductCatalogue._locks.setdefault(self.key, Lock())
+
+    def products(self) -> dict:
+        with self._exchange_lock():
+            entry = self._cache.get(self.key)
+            if entry is None or time.time() - entry[0] >= self._ttl:
+                entry = self._read_cache()
+                if entry is None:
+                    entry = (time.time(), self.fetch())
+                    self._write_cache(*entry)
+                self._cache[self.key] = entry
+            return entry[1]
+
+    def get(self, prod_id: str) -> dict:
+        products = self.products()
+        if prod_id not in products:
+            raise ProductError(f"{prod_id} not supported on {self._exchange}")
+        return products[prod_id]
+
+    def invalidate(self) -> None:
+        with self._exchange_lock():
+            self._cache.pop(self.key, None)
+            try:
+                os.remove(self.cache_file)
+            except OSError:
+                pass
@@ -1,16 +1,41 @@
 import cbpro
+from cbpro.cbpro_auth import get_auth_headers
 
 from cryptrade.exceptions import AuthenticationError, ProductError
-from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, Order, Account, ApiCreator
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, MultiTicker, Order, Account, \
+    OrderManager, ApiCreator
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.streaming import StreamingTicker
+from cryptrade.executions import ExecutionStream
+from cryptrade.orderbook import OrderBook
+from cryptrade.scheduler import PRIORITY_TRADE, PRIORITY_ACCOUNT, PRIORITY_MARKET
 
 import sys
+import time
 from datetime import datetime
+from itertools import islice
 
 
 class CBTradeClient(TradeClient):
-    def __init__(self, credentials: dict) -> None:
-        super().__init__()
-
+    _rate_limits = {
+        "public": (6, 3),
+        "private": (10, 5)}
+    _request_costs = {
+        "product": (PRIORITY_MARKET, {"public": 1}),
+        "ticker": (PRIORITY_MARKET, {"public": 1}),
+        "book": (PRIORITY_MARKET, {"public": 1}),
+        "order": (PRIORITY_TRADE, {"private": 1}),
+        "cancel": (PRIORITY_TRADE, {"private": 1}),
+        "status": (PRIORITY_ACCOUNT, {"private": 1}),
+        "open_orders": (PRIORITY_ACCOUNT, {"private": 1}),
+        "closed_orders": (PRIORITY_ACCOUNT, {"private": 1}),
+        "account": (PRIORITY_ACCOUNT, {"private": 1})}
+
+    def __init__(self, credentials: dict, max_workers: int = None) -> None:
+        super().__init__(max_workers)
+
+        # a different host, eg. the sandbox or a cryptrade.mockserver
+        api_url = credentials.get("coinbase", {}).get("api_url", "https://api.pro.coinbase.com")
         if "coinbase" in credentials and \
                 "api_key" in credentials["coinbase"] and \
                 "api_secret" in credentials["coinbase"] and \
@@ -19,16 +44,40 @@ class CBTradeClient(TradeClient):
             api_secret = credentials["coinbase"]["api_secret"]
             api_pass = credentials["coinbase"]["api_pass"]
             try:
-                self._client = cbpro.AuthenticatedClient(api_key, api_secret, api_pass)
+                self._client = cbpro.AuthenticatedClient(api_key, api_secret, api_pass, api_url=api_url)
             except Exception:
                 raise AuthenticationError("invalid Coinbase API key, secret, and/or password")
 
         else:
             try:
-                self._client = cbpro.PublicClient()
+                self._client = cbpro.PublicClient(api_url=api_url)
             except:
                 raise AuthenticationError("Could not create non-authenticated Client for Coinbase Pro")
 
+        self._share_connections(self._client.session, self._client.url)
+        self._catalogue = CBProductCatalogue(self)
+
+    def _response_error(self, result) -> str:
+        # cbpro doesn't raise, errors come back as {"message": ...}
+        if isinstance(result, dict) and "message" in result:
+            return "ErrorResponse"
+        return None
+
+
+class CBProductCatalogue(ProductCatalogue):
+    _exchange = "coinbase"
+
+    def fetch(self) -> dict:
+        products = {}
+        for product in self._auth_client.request("product", self._auth_client.client.get_products):
+            products[product["id"]] = {
+                "min_order_amount": float(product["base_min_size"]),
+                "min_order_price": float(product["quote_increment"]),
+                "min_order_value": float(product["quote_increment"]),
+                "order_price_precision": float(product["quote_increment"]),
+                "order_amount_precision": float(product["base_increment"])}
+        return products
+
 
 class CBCurrency(Currency):
     _currency_map = {}
@@ -41,17 +90,7 @@ class CBProduct(Product):
     def __init__(self, auth_client: CBTradeClient, trading_currency: CBCurrency, buying_currency: CBCurrency) -> None:
         try:
             super().__init__(auth_client, trading_currency, buying_currency)
-
-            products = self._auth_client.client.get_products()
-            for product in products:
-                if product["id"] == self.prod_id:
-                    self._min_order_amount = float(product["base_min_size"])
-                    self._min_order_price = float(product["quote_increment"])
-                    self._order_price_precision = float(product["quote_increment"])
-                    self._order_amount_precision = float(product["base_increment"])
-                    self._min_order_value = self._min_order_amount * self._min_order_price
-                    break
-            self._min_order_value = self._min_order_price
+            self._set_details(self._auth_client.catalogue.get(self.prod_id))
 
         except Exception:
             raise ProductError(f"{trading_currency}/{buying_currency} not supported on Coinbase Pro")
@@ -68,7 +107,8 @@ class CBTicker(Ticker):
 
     def update(self) -> None:
         try:
-            product_ticker = self._auth_client.client.get_product_ticker(self._product.prod_id)
+            product_ticker = self._auth_client.request("ticker", self._auth_client.client.get_product_ticker,
+                                                      self._product.prod_id)
 
             if "trade_id" in product_ticker:
                 self._bid = float(product_ticker["bid"])
@@ -81,20 +121,76 @@ class CBTicker(Ticker):
             pass
 
 
+class CBStreamingTicker(StreamingTicker, CBTicker):
+    _stream_url = "wss://ws-feed.pro.coinbase.com"
+
+    def _subscriptions(self) -> list:
+        return [{"type": "subscribe", "product_ids": [self._product.prod_id], "channels": ["ticker"]}]
+
+    def _parse(self, message) -> bool:
+        if message.get("type") == "ticker" and message.get("product_id") == self._product.prod_id:
+            self._bid = float(message["best_bid"])
+            self._ask = float(message["best_ask"])
+            self._price = float(message["price"])
+            # every trade is a ticker message
+            self._volume += float(message.get("last_size", 0.0))
+            return True
+        return False
+
+
+class CBOrderBook(OrderBook):
+    # the level2 channel has no sequence numbers, the book is only replaced by the snapshot after (re)connecting
+    _stream_url = "wss://ws-feed.pro.coinbase.com"
+
+    def _fetch(self) -> tuple:
+        # level 2 is the best 50 levels, aggregated per price
+        book = self._auth_client.request("book", self._auth_client.client.get_product_order_book,
+                                         self._product.prod_id, level=2)
+        if "bids" not in book:
+            raise AttributeError(book.get("message"))
+        return [level[:2] for level in book["bids"]], [level[:2] for level in book["asks"]], book["sequence"]
+
+    def _subscriptions(self) -> list:
+        return [{"type": "subscribe", "product_ids": [self._product.prod_id], "channels": ["level2"]}]
+
+    def _apply(self, message) -> bool:
+        if message.get("product_id") != self._product.prod_id:
+            return False
+        if message.get("type") == "snapshot":
+            self._load(message["bids"], message["asks"])
+            return True
+        elif message.get("type") == "l2update" and self._synced:
+            for side, price, size in message["changes"]:
+                (self._bids if side == "buy" else self._asks).set(float(price), float(size))
+            return True
+        return False
+
+
+class CBMultiTicker(MultiTicker):
+    _ticker_class = CBTicker
+
+    # Coinbase Pro has no endpoint for multiple tickers, every product is still fetched separately
+    def update(self) -> None:
+        for ticker in self._tickers.values():
+            ticker.update()
+
+
 class CBOrder(Order):
     def __init__(self, auth_client: CBTradeClient, product: CBProduct, order_type: str,
                  price: float, amount: float) -> None:
         try:
             super().__init__(auth_client, product, order_type, price, amount)
 
-            if not self._product.valid(self._amount, self._price):
+            if not self._product.valid_steps(self._amount_lots, self._price_ticks):
                 raise AttributeError("Invalid amount/price for order")
 
-            result = self._auth_client.client.place_limit_order(
+            result = self._auth_client.request(
+                "order",
+                self._auth_client.client.place_limit_order,
                 self._product.prod_id,
                 self._order_type,
-                self._price,
-                self._amount,
+                self.price_string,
+                self.amount_string,
                 time_in_force="GTC")
 
             if "id" in result:
@@ -119,15 +215,19 @@ class CBOrder(Order):
             self._settled = True
             self._message = f"Invalid order: {sys.exc_info()[1]}"
 
+    def _parse_update(self, order_update: dict) -> None:
+        self._status = order_update["status"]
+        self._filled_size = float(order_update["filled_size"])
+        self._executed_value = float(order_update["executed_value"])
+        # an older result doesn't undo the settlement
+        self._settled = self._settled or bool(order_update["settled"])
+
     def status(self) -> bool:
         try:
-            order_update = self._auth_client.client.get_order(self._order_id)
+            order_update = self._auth_client.request("status", self._auth_client.client.get_order, self._order_id)
 
             if "message" not in order_update:
-                self._status = order_update["status"]
-                self._filled_size = float(order_update["filled_size"])
-                self._executed_value = float(order_update["executed_value"])
-                self._settled = bool(order_update["settled"])
+                self._parse_update(order_update)
             else:
                 # order not found, set settled flag
                 self._settled = True
@@ -146,7 +246,7 @@ class CBOrder(Order):
         if not self._settled:
             try:
                 super().cancel()
-                self._auth_client.client.cancel_order(self.order_id)
+                self._auth_client.request("cancel", self._auth_client.client.cancel_order, self.order_id)
             except Exception:
                 self._message = "Cancellation failed"
 
@@ -159,7 +259,7 @@ class CBAccount(Account):
     def update(self) -> None:
         try:
             self._balance.clear()
-            for sub_account in self._auth_client.client.get_accounts():
+            for sub_account in self._auth_client.request("account", self._auth_client.client.get_accounts):
                 c = CBCurrency.map_from_exchange_currency(sub_account["currency"].upper())
                 if float(sub_account["balance"]) > 0:
                     self._balance[c] = float(sub_account["balance"])
@@ -170,13 +270,118 @@ class CBAccount(Account):
             pass
 
 
+class CBOrderManager(OrderManager):
+    # number of most recent done orders retrieved in one request (one page)
+    _history_size = 100
+
+    def _snapshot(self) -> dict:
+        client = self._auth_client.client
+        open_orders = self._auth_client.request("open_orders", lambda: list(client.get_orders()))
+        updates = {order["id"]: order for order in open_orders}
+
+        tracked = list(self._orders)
+        if any(order_id not in updates for order_id in tracked):
+            # the orders that left the open list, newest first; only the first page, the generator would page
+            # through the whole history
+            done_orders = self._auth_client.request("closed_orders", lambda: list(
+                islice(client.get_orders(status="done", limit=self._history_size), self._history_size)))
+            for order in done_orders:
+                if isinstance(order, dict) and order.get("id") in self._orders:
+                    updates.setdefault(order["id"], order)
+
+        # older done orders, and canceled ones which Coinbase Pro drops from its lists, are queried individually
+        for order_id in tracked:
+            if order_id not in updates:
+                order_update = self._auth_client.request("status", self._auth_client.client.get_order, order_id)
+                if "message" not in order_update:
+                    updates[order_id] = order_update
+        return updates
+
+
+class CBExecutionStream(ExecutionStream):
+    _stream_url = "wss://ws-feed.pro.coinbase.com"
+
+    def __init__(self, auth_client: CBTradeClient, order_manager: CBOrderManager, products: list = None) -> None:
+        super().__init__(auth_client, order_manager, products)
+        if not isinstance(self._auth_client.client, cbpro.AuthenticatedClient):
+            # the user channel requires credentials, fall back to REST only
+            self._stream_url = None
+        # order id -> trade id -> (size, price) of the matches seen
+        self._trades = {}
+
+    async def _subscriptions(self) -> list:
+        # the user channel is the full channel limited to our own orders, subscribing requires a signature
+        auth = self._auth_client.client.auth
+        timestamp = str(time.time())
+        headers = get_auth_headers(timestamp, timestamp + "GET/users/self/verify",
+                                   auth.api_key, auth.secret_key, auth.passphrase)
+        return [{"type": "subscribe",
+                 "product_ids": [product.prod_id for product in self._products],
+                 "channels": ["user"],
+                 "signature": headers["CB-ACCESS-SIGN"],
+                 "key": headers["CB-ACCESS-KEY"],
+                 "passphrase": headers["CB-ACCESS-PASSPHRASE"],
+                 "timestamp": headers["CB-ACCESS-TIMESTAMP"]}]
+
+    def _events(self, message) -> list:
+        if message.get("type") == "match":
+            # we're either the maker or the taker of the trade
+            return [(message["maker_order_id"], message), (message["taker_order_id"], message)]
+        elif message.get("type") == "done":
+            return [(message["order_id"], message)]
+        return []
+
+    def _fills(self, order_id: str, event: dict) -> dict:
+        if order_id not in self._trades and len(self._trades) >= self._max_pending:
+            del self._trades[next(iter(self._trades))]
+        trades = self._trades.setdefault(order_id, {})
+        trades[event["trade_id"]] = (float(event["size"]), float(event["price"]))
+        return trades
+
+    def _order_update(self, order: CBOrder, event: dict) -> dict:
+        if event["type"] == "match":
+            # REST may have counted some of the matches already (eg. those buffered while reconciling after a
+            # reconnect), so the matches only count once they add up to more than what the order has
+            trades = self._fills(order.order_id, event)
+            filled_size = sum(size for size, _ in trades.values())
+            if filled_size <= order.filled_size:
+                return None
+            return {"status": "open",
+                    "filled_size": filled_size,
+                    "executed_value": sum(size * price for size, price in trades.values()),
+                    "settled": False}
+        else:
+            # the order left the book, either filled or canceled; the final fills come from REST (see _apply)
+            final = event.get("order", {})
+            return {"status": "done",
+                    "filled_size": final.get("filled_size", order.filled_size),
+                    "executed_value": final.get("executed_value", order.executed_value),
+                    "settled": True}
+
+    def _final(self, order: CBOrder) -> dict:
+        order_update = self._auth_client.request("status", self._auth_client.client.get_order, order.order_id)
+        return order_update if "message" not in order_update else {}
+
+    async def _apply(self, order: CBOrder, event: dict) -> bool:
+        if event["type"] == "done":
+            try:
+                event = dict(event, order=await self._auth_client.run_in_executor(self._final, order))
+            except Exception:
+                # settle with the fills seen so far
+                pass
+        changed = await super()._apply(order, event)
+        if order.settled:
+            self._trades.pop(order.order_id, None)
+        return changed
+
+
 class CBApiCreator(ApiCreator):
     _maker_fee = 0.005
     _taker_fee = 0.005
 
     @staticmethod
-    def create_trade_client(credentials: dict) -> CBTradeClient:
-        return CBTradeClient(credentials)
+    def create_trade_client(credentials: dict, max_workers: int = None) -> CBTradeClient:
+        return CBTradeClient(credentials, max_workers)
 
     @staticmethod
     def create_currency(currency_id: str) -> CBCurrency:
@@ -191,6 +396,18 @@ class CBApiCreator(ApiCreator):
     def create_ticker(auth_client: CBTradeClient, product: CBProduct) -> CBTicker:
         return CBTicker(auth_client, product)
 
+    @staticmethod
+    def create_streaming_ticker(auth_client: CBTradeClient, product: CBProduct) -> CBStreamingTicker:
+        return CBStreamingTicker(auth_client, product)
+
+    @staticmethod
+    def create_multi_ticker(auth_client: CBTradeClient, products: list) -> CBMultiTicker:
+        return CBMultiTicker(auth_client, products)
+
+    @staticmethod
+    def create_order_book(auth_client: CBTradeClient, product: CBProduct, depth: int = 100) -> CBOrderBook:
+        return CBOrderBook(auth_client, product, depth)
+
     @staticmethod
     def create_order(auth_client: CBTradeClient, product: CBProduct, order_type: str, price: float,
                      amount: float) -> CBOrder:
@@ -199,3 +416,12 @@ class CBApiCreator(ApiCreator):
     @staticmethod
     def create_account(auth_client: CBTradeClient) -> CBAccount:
         return CBAccount(auth_client)
+
+    @staticmethod
+    def create_order_manager(auth_client: CBTradeClient) -> CBOrderManager:
+        return CBOrderManager(auth_client)
+
+    @staticmethod
+    def create_execution_stream(auth_client: CBTradeClient, order_manager: CBOrderManager,
+                                products: list = None) -> CBExecutionStream:
+        return CBExecutionStream(auth_client, order_manager, products)
@@ -0,0 +1,101 @@
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from urllib.parse import urlsplit
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, pool_size: int) -> None:
+        super().__init__(pool_connections=1, pool_maxsize=pool_size)
+        self.last_used = time.monotonic()
+
+    def send(self, request, **kwargs):
+        self.last_used = time.monotonic()
+        ConnectionPool.evict_idle()
+        return super().send(request, **kwargs)
+
+
+class ConnectionPool:
+    _pool_size = 10
+    _keep_alive = 60
+
+    # shared by all clients in the process: host -> adapter holding the (keep-alive) connections
+    _adapters = {}
+    # aiohttp connectors are bound to an event loop: loop -> connector
+    _connectors = {}
+    _lock = Lock()
+
+    @classmethod
+    def configure(cls, pool_size: int = None, keep_alive: int = None) -> None:
+        if pool_size is not None:
+            ConnectionPool._pool_size = pool_size
+        if keep_alive is not None:
+            ConnectionPool._keep_alive = keep_alive
+
+    @staticmethod
+    def _host(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    @classmethod
+    def adapter(cls, url: str) -> PooledAdapter:
+        host = cls._host(url)
+        with cls._lock:
+            if host not in cls._adapters:
+                cls._adapters[host] = PooledAdapter(cls._pool_size)
+            return cls._adapters[host]
+
+    @classmethod
+    def mount(cls, session: requests.Session, url: str) -> requests.Session:
+        # the session keeps its own headers and authentication, only the connections are shared
+        session.mount(cls._host(url) + "/", cls.adapter(url))
+        return session
+
+    @classmethod
+    def prewarm(cls, url: str, connections: int = 1) -> None:
+        # open connections (TCP and TLS handshakes) before the first real request
+        session = cls.mount(requests.Session(), url)
+
+        def connect(_) -> None:
+            try:
+                session.head(cls._host(url), timeout=10)
+            except requests.RequestException:
+                pass
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(connect, range(connections)))
+
+    @classmethod
+    def evict_idle(cls) -> None:
+        now = time.monotonic()
+        with cls._lock:
+            for adapter in cls._adapters.values():
+                if now - adapter.last_used > cls._keep_alive:
+                    # drops the idle connections, the adapter reconnects on its next request
+                    adapter.close()
+                    adapter.last_used = now
+
+    @classmethod
+    def connector(cls) -> aiohttp.TCPConnector:
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            for other_loop in [other_loop for other_loop in cls._connectors if other_loop.is_closed()]:
+                del cls._connectors[other_loop]
+            connector = cls._connectors.get(loop)
+            if connector is None or connector.closed:
+                connector = aiohttp.TCPConnector(limit_per_host=cls._pool_size, keepalive_timeout=cls._keep_alive)
+                cls._connectors[loop] = connector
+            return connector
+
+    @classmethod
+    async def close_connector(cls) -> None:
+        # closes the connections of the running loop, call it before the loop is stopped
+        with cls._lock:
+            connector = cls._connectors.pop(asyncio.get_running_loop(), None)
+        if connector is not None:
+            await connector.close()
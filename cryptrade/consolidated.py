@@ -0,0 +1,172 @@
+from sortedcontainers import SortedList
+
+from cryptrade.observers import Observable, Observer
+from cryptrade.exchange_api import Ticker
+
+from collections import deque, namedtuple
+
+# prices after fees: what a sell at the bid yields and a buy at the ask costs
+VenueQuote = namedtuple("VenueQuote", ["venue", "bid", "ask", "effective_bid", "effective_ask", "time"])
+Opportunity = namedtuple("Opportunity", ["product", "buy_venue", "buy_price", "sell_venue", "sell_price", "edge",
+                                         "time"])
+
+
+class ProductQuotes:
+    # the quotes of one product on all venues, ordered by their price after fees
+    def __init__(self, max_age: float) -> None:
+        self._max_age = max_age
+        self._quotes = {}
+        # (-effective bid, venue) and (effective ask, venue), the best one first
+        self._bids = SortedList()
+        self._asks = SortedList()
+        # time of the newest quote, quotes older than max_age before it are stale
+        self.time = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def update(self, quote: VenueQuote) -> None:
+        self.remove(quote.venue)
+        self._quotes[quote.venue] = quote
+        self._bids.add((-quote.effective_bid, quote.venue))
+        self._asks.add((quote.effective_ask, quote.venue))
+        if quote.time > self.time:
+            self.time = quote.time
+
+    def remove(self, venue: str) -> None:
+        quote = self._quotes.pop(venue, None)
+        if quote is not None:
+            self._bids.remove((-quote.effective_bid, venue))
+            self._asks.remove((quote.effective_ask, venue))
+
+    def _best(self, side: SortedList, skip: str = None) -> VenueQuote:
+        # stale quotes are dropped once they come up, the venue is back with its next quote
+        index = 0
+        while index < len(side):
+            venue = side[index][1]
+            quote = self._quotes[venue]
+            if self.time - quote.time > self._max_age:
+                self.remove(venue)
+            elif venue == skip:
+                index += 1
+            else:
+                return quote
+        return None
+
+    def best_bid(self, skip: str = None) -> VenueQuote:
+        return self._best(self._bids, skip)
+
+    def best_ask(self, skip: str = None) -> VenueQuote:
+        return self._best(self._asks, skip)
+
+    def crossing(self) -> tuple:
+        # the (buy, sell) quotes with the largest difference after fees on two different venues
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None, None
+        if bid.venue != ask.venue:
+            return ask, bid
+        # the best bid and ask are on the same venue, the best pair uses the next best on one of the sides
+        other_bid, other_ask = self.best_bid(bid.venue), self.best_ask(ask.venue)
+        candidates = [(ask, other_bid), (other_ask, bid)]
+        candidates = [(buy, sell) for buy, sell in candidates if buy is not None and sell is not None]
+        if len(candidates) == 0:
+            return None, None
+        return max(candidates, key=lambda pair: pair[1].effective_bid - pair[0].effective_ask)
+
+
+class VenueFeed(Observer):
+    def __init__(self, consolidated: "ConsolidatedQuote", venue: str, ticker: Ticker, fee: float) -> None:
+        self._consolidated = consolidated
+        self._venue = venue
+        # eg. BTC-EUR, the same on every exchange unlike the product id
+        self._product = str(ticker.product)
+        self._fee = fee
+        super().__init__(ticker)
+
+    @property
+    def ticker(self) -> Ticker:
+        return self._observable
+
+    async def notify(self, ticker: Ticker) -> None:
+        timestamp = ticker.timestamp
+        if timestamp is None or ticker.bid <= 0 or ticker.ask <= 0:
+            return
+        if self._consolidated.update(self._product, self._venue, ticker.bid, ticker.ask, timestamp.timestamp(),
+                                     self._fee) is not None:
+            await self._consolidated.notify()
+
+
+class ConsolidatedQuote(Observable):
+    def __init__(self, threshold: float = 0.0, max_age: float = 30.0, history: int = 1000) -> None:
+        # threshold: the relative edge after fees that counts as an opportunity; max_age: seconds a quote stays
+        # valid after a newer quote of the same product on any venue
+        super().__init__()
+        self._threshold = threshold
+        self._max_age = max_age
+        self._products = {}
+        self._feeds = []
+        # product -> (buy venue, sell venue) of the opportunity that is open
+        self._open = {}
+        self._opportunity = None
+        self._opportunities = deque(maxlen=history)
+
+    def watch(self, venue: str, ticker: Ticker, fee: float) -> None:
+        # fee: the venue's taker fee, eg. ApiCreator.taker_fee()
+        self._feeds.append(VenueFeed(self, venue, ticker, fee))
+
+    def close(self) -> None:
+        for feed in self._feeds:
+            feed.ticker.detach(feed)
+        self._feeds = []
+
+    def update(self, product: str, venue: str, bid: float, ask: float, timestamp: float,
+               fee: float = 0.0) -> Opportunity:
+        # returns the opportunity when this quote opens one (or a different pair of venues), otherwise None
+        quotes = self._products.get(product)
+        if quotes is None:
+            quotes = self._products[product] = ProductQuotes(self._max_age)
+        quotes.update(VenueQuote(venue, bid, ask, bid * (1 - fee), ask * (1 + fee), timestamp))
+
+        buy, sell = quotes.crossing()
+        if buy is None or sell.effective_bid - buy.effective_ask < self._threshold * buy.effective_ask:
+            self._open.pop(product, None)
+            return None
+        if self._open.get(product) == (buy.venue, sell.venue):
+            # still the same opportunity
+            return None
+        self._open[product] = (buy.venue, sell.venue)
+        opportunity = Opportunity(product, buy.venue, buy.ask, sell.venue, sell.bid,
+                                  (sell.effective_bid - buy.effective_ask) / buy.effective_ask, quotes.time)
+        self._opportunity = opportunity
+        self._opportunities.append(opportunity)
+        return opportunity
+
+    @property
+    def products(self) -> list:
+        return list(self._products)
+
+    def best_bid(self, product: str) -> VenueQuote:
+        quotes = self._products.get(product)
+        return quotes.best_bid() if quotes is not None else None
+
+    def best_ask(self, product: str) -> VenueQuote:
+        quotes = self._products.get(product)
+        return quotes.best_ask() if quotes is not None else None
+
+    @property
+    def opportunity(self) -> Opportunity:
+        return self._opportunity
+
+    @property
+    def opportunities(self) -> list:
+        return list(self._opportunities)
+
+    def __str__(self) -> str:
+        lines = []
+        for product in sorted(self._products):
+            bid, ask = self.best_bid(product), self.best_ask(product)
+            if bid is not None and ask is not None:
+                lines.append(f"{product}: bid {bid.bid} ({bid.venue}), ask {ask.ask} ({ask.venue}), after fees "
+                             f"{bid.effective_bid:.8g} / {ask.effective_ask:.8g}")
+        return "\n".join(lines)
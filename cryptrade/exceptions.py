@@ -25,3 +25,11 @@ class ParameterError(CryptradeError):
 
     def __str__(self) -> str:
         return __name__ + ": Invalid parameter(s), " + self._message
+
+
+class SequenceError(CryptradeError):
+    def __init__(self, message: str) -> None:
+        self._message = message
+
+    def __str__(self) -> str:
+        return __name__ + ": Out of sequence update, " + self._message
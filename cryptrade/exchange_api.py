@@ -1,28 +1,130 @@
 import asyncio
+import sys
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from math import trunc
+from decimal import Decimal
+from functools import lru_cache
+from math import trunc, floor, ceil
 from cryptrade.observers import Observable
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.symbols import SymbolIndex
+from cryptrade.scheduler import RequestScheduler
+from cryptrade.connections import ConnectionPool
+from cryptrade.executions import ExecutionStream
+from cryptrade.orderbook import OrderBook
+from cryptrade.metrics import Metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class TradeClient:
-    def __init__(self) -> None:
+    _max_workers = 4
+    # name -> (capacity, decay per second)
+    _rate_limits = {}
+    # operation -> (priority, {rate limit name: weight})
+    _request_costs = {}
+
+    def __init__(self, max_workers: int = None) -> None:
         self._client = None
+        self._catalogue = ProductCatalogue(self)
+        self._scheduler = RequestScheduler(type(self)._rate_limits, type(self)._request_costs)
+        # bounded pool for running the blocking SDK calls outside of the event loop
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or type(self)._max_workers,
+                                            thread_name_prefix=type(self).__name__)
+        self._hosts = []
+
+    def request(self, operation: str, function, *args, **kwargs):
+        # every exchange call goes through here, so it can be scheduled within the exchange's rate limits and
+        # measured
+        self._scheduler.acquire(operation)
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            Metrics.record(self.exchange, operation, time.perf_counter() - start, type(e).__name__)
+            raise
+        Metrics.record(self.exchange, operation, time.perf_counter() - start, self._response_error(result))
+        return result
+
+    async def async_request(self, operation: str, function, *args, **kwargs):
+        await self._scheduler.async_acquire(operation)
+        start = time.perf_counter()
+        try:
+            result = await function(*args, **kwargs)
+        except Exception as e:
+            Metrics.record(self.exchange, operation, time.perf_counter() - start, type(e).__name__)
+            raise
+        Metrics.record(self.exchange, operation, time.perf_counter() - start, self._response_error(result))
+        return result
+
+    def _response_error(self, result) -> str:
+        # the error in a response that didn't raise, for exchanges reporting errors in the body
+        return None
+
+    @property
+    def exchange(self) -> str:
+        return self._catalogue.exchange
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        return self._scheduler
+
+    def remaining_budget(self) -> dict:
+        return self._scheduler.remaining()
+
+    async def run_in_executor(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _share_connections(self, session, url: str) -> None:
+        # let the SDK's session use the process wide connections to the exchange host
+        ConnectionPool.mount(session, url)
+        self._hosts.append(url)
+
+    @property
+    def api_url(self) -> str:
+        # the REST API the client talks to, eg. the exchange, its sandbox or a cryptrade.mockserver
+        return self._hosts[0] if len(self._hosts) > 0 else None
+
+    def prewarm(self, connections: int = 1) -> None:
+        for url in self._hosts:
+            ConnectionPool.prewarm(url, connections)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
 
     @property
     def client(self):
         return self._client
 
+    @property
+    def catalogue(self) -> ProductCatalogue:
+        return self._catalogue
+
 
 class Currency:
     _currency_map = {}
+    _currency_index = SymbolIndex(_currency_map)
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._currency_index = SymbolIndex(cls._currency_map)
 
     def __init__(self, currency_id: str) -> None:
         self._currency_id = currency_id
 
     @classmethod
     def map_from_exchange_currency(cls, currency: str) -> str:
-        results = [key for key, value in cls._currency_map.items() if value == currency]
-        return results[0] if results else currency
+        result = cls._currency_index.from_exchange(currency)
+        return result if result is not None else cls._map_unknown_currency(currency)
+
+    @classmethod
+    def _map_unknown_currency(cls, currency: str) -> str:
+        return currency
 
     @property
     def currency_id(self) -> str:
@@ -30,7 +132,7 @@ class Currency:
 
     @property
     def exchange_currency_id(self) -> str:
-        return type(self)._currency_map.get(self._currency_id, self._currency_id)
+        return type(self)._currency_index.to_exchange(self._currency_id)
 
     def __str__(self) -> str:
         return self._currency_id
@@ -41,6 +143,13 @@ class Currency:
 
 class Product:
     _product_map = {}
+    _product_index = SymbolIndex(_product_map)
+    # resolution for prices and amounts without a known precision
+    _default_decimals = 8
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._product_index = SymbolIndex(cls._product_map)
 
     def __init__(self, auth_client: TradeClient, trading_currency: Currency, buying_currency: Currency) -> None:
         self._auth_client = auth_client
@@ -51,10 +160,75 @@ class Product:
         self._min_order_price = 0.0
         self._order_price_precision = None
         self._order_amount_precision = None
+        # prices and amounts are integer multiples of a tick / lot, which are in turn integer multiples of
+        # 10 ** -decimals
+        self._price_decimals, self._price_tick = self._default_decimals, 1
+        self._amount_decimals, self._amount_lot = self._default_decimals, 1
+        self._price_scale = self._amount_scale = 10 ** self._default_decimals
+        self._min_ticks = 0
+        self._min_lots = 0
+        self._min_value_units = 0
+        self._value_step = 1
 
         if self._buying_currency == self._trading_currency:
             raise AttributeError("Trading and buying currency cannot be the same")
 
+    def _set_details(self, details: dict) -> None:
+        self._min_order_value = details["min_order_value"]
+        self._min_order_amount = details["min_order_amount"]
+        self._min_order_price = details["min_order_price"]
+        self._order_price_precision = details["order_price_precision"]
+        self._order_amount_precision = details["order_amount_precision"]
+
+        if self._order_price_precision is not None and self._order_price_precision > 0:
+            self._price_decimals, self._price_tick = Product.decimal_step(self._order_price_precision)
+            self._price_scale = 10 ** self._price_decimals
+        if self._order_amount_precision is not None and self._order_amount_precision > 0:
+            self._amount_decimals, self._amount_lot = Product.decimal_step(self._order_amount_precision)
+            self._amount_scale = 10 ** self._amount_decimals
+
+        # the minimums in ticks, lots, and units of 10 ** -(price decimals + amount decimals) for the value
+        self._min_ticks = Product._min_steps(self._min_order_price, self._price_decimals, self._price_tick)
+        self._min_lots = Product._min_steps(self._min_order_amount, self._amount_decimals, self._amount_lot)
+        self._min_value_units = Product._min_steps(self._min_order_value,
+                                                   self._price_decimals + self._amount_decimals, 1)
+        self._value_step = self._amount_lot * self._price_tick
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def decimal_step(step: float) -> tuple:
+        # (decimals, units) such that step == units * 10 ** -decimals, eg. 0.005 -> (3, 5) and 1e-05 -> (5, 1)
+        exponent = Decimal(repr(step)).normalize().as_tuple().exponent
+        decimals = max(-exponent, 0)
+        return decimals, int(Decimal(repr(step)).scaleb(decimals))
+
+    @staticmethod
+    def _min_steps(number: float, decimals: int, step: int) -> int:
+        return ceil(Decimal(repr(number)).scaleb(decimals) / step)
+
+    @staticmethod
+    def to_steps(number: float, scale: int, step: int) -> int:
+        # truncates to a multiple of step / scale, taking number as the decimal it represents: 0.29 * 100 is
+        # 28.999999999999996 but 29 / 100 is the float 0.29, so 0.29 is 29 units
+        units = floor(number * scale)
+        if (units + 1) / scale <= number:
+            units += 1
+        elif units / scale > number:
+            units -= 1
+        return units // step
+
+    @staticmethod
+    def from_steps(steps: int, scale: int, step: int) -> float:
+        # true division of integers is correctly rounded, so 29 / 100 is exactly the float 0.29
+        return steps * step / scale
+
+    @staticmethod
+    def steps_string(steps: int, decimals: int, step: int) -> str:
+        units = steps * step
+        if decimals == 0:
+            return str(units)
+        return f"{units // 10 ** decimals}.{units % 10 ** decimals:0{decimals}d}"
+
     @staticmethod
     def trunc_dec(number: float, digits: int) -> float:
         stepper = 10 ** digits
@@ -62,16 +236,21 @@ class Product:
 
     @staticmethod
     def apply_precision(number: float, precision: float) -> float:
-        return Product.trunc_dec(number // precision * precision, len(str(precision)) - 2)
+        decimals, step = Product.decimal_step(precision)
+        return Product.from_steps(Product.to_steps(number, 10 ** decimals, step), 10 ** decimals, step)
 
     @classmethod
     def map_from_exchange_product(cls, prod_id: str) -> str:
-        return next(key for key, value in cls._product_map.items() if value == prod_id)
+        result = cls._product_index.from_exchange(prod_id)
+        return result if result is not None else cls._map_unknown_product(prod_id)
+
+    @classmethod
+    def _map_unknown_product(cls, prod_id: str) -> str:
+        return prod_id
 
     @property
     def prod_id(self) -> str:
-        prod = str(self._trading_currency) + str(self._buying_currency)
-        return type(self)._product_map.get(prod, prod)
+        return type(self)._product_index.to_exchange(str(self._trading_currency) + str(self._buying_currency))
 
     @property
     def buying_currency(self) -> Currency:
@@ -93,22 +272,72 @@ class Product:
     def min_order_price(self) -> float:
         return self._min_order_price
 
+    @property
+    def price_decimals(self) -> int:
+        return self._price_decimals
+
+    def price_ticks(self, price: float) -> int:
+        return Product.to_steps(price, self._price_scale, self._price_tick)
+
+    def amount_lots(self, amount: float) -> int:
+        return Product.to_steps(amount, self._amount_scale, self._amount_lot)
+
+    def tick_price(self, ticks: int) -> float:
+        return Product.from_steps(ticks, self._price_scale, self._price_tick)
+
+    def lot_amount(self, lots: int) -> float:
+        return Product.from_steps(lots, self._amount_scale, self._amount_lot)
+
+    def price_string(self, ticks: int) -> str:
+        return Product.steps_string(ticks, self._price_decimals, self._price_tick)
+
+    def amount_string(self, lots: int) -> str:
+        return Product.steps_string(lots, self._amount_decimals, self._amount_lot)
+
+    def valid_steps(self, lots: int, ticks: int) -> bool:
+        return lots >= self._min_lots and \
+               ticks >= self._min_ticks and \
+               lots * ticks * self._value_step >= self._min_value_units
+
     def valid(self, amount: float, price: float) -> bool:
-        return amount >= self._min_order_amount and \
-               price >= self._min_order_price and \
-               amount * price >= self._min_order_value
+        return self.valid_steps(self.amount_lots(amount), self.price_ticks(price))
 
     def format_price(self, price: float) -> float:
-        if self._order_price_precision is not None and self._order_price_precision > 0:
-            return type(self).apply_precision(price, self._order_price_precision)
-        else:
-            return price
+        return self.tick_price(self.price_ticks(price))
 
     def format_amount(self, amount: float) -> float:
-        if self._order_amount_precision is not None and self._order_amount_precision > 0:
-            return type(self).apply_precision(amount, self._order_amount_precision)
-        else:
-            return amount
+        return self.lot_amount(self.amount_lots(amount))
+
+    @staticmethod
+    def to_steps_batch(numbers, scale: int, step: int):
+        # vectorized to_steps()
+        units = np.floor(numbers * scale).astype(np.int64)
+        units += (units + 1) / scale <= numbers
+        units -= units / scale > numbers
+        return units // step
+
+    def batch_steps(self, prices, amounts) -> tuple:
+        # ticks, lots and validity mask for a whole ladder of prices and amounts
+        if np is None:
+            ticks = array("q", [self.price_ticks(price) for price in prices])
+            lots = array("q", [self.amount_lots(amount) for amount in amounts])
+            return ticks, lots, [self.valid_steps(lot, tick) for lot, tick in zip(lots, ticks)]
+
+        ticks = Product.to_steps_batch(np.asarray(prices, dtype=np.float64), self._price_scale, self._price_tick)
+        lots = Product.to_steps_batch(np.asarray(amounts, dtype=np.float64), self._amount_scale, self._amount_lot)
+        # the minimum value as a minimum number of lots at each price, which can't overflow like lots * ticks
+        tick_values = ticks * self._value_step
+        min_value_lots = -(-self._min_value_units // np.maximum(tick_values, 1))
+        valid = (lots >= self._min_lots) & (ticks >= self._min_ticks) & \
+                ((lots >= min_value_lots) & (tick_values > 0) | (self._min_value_units == 0))
+        return ticks, lots, valid
+
+    def format_batch(self, prices, amounts) -> tuple:
+        ticks, lots, valid = self.batch_steps(prices, amounts)
+        if np is None:
+            return array("d", [self.tick_price(tick) for tick in ticks]), \
+                   array("d", [self.lot_amount(lot) for lot in lots]), valid
+        return ticks * self._price_tick / self._price_scale, lots * self._amount_lot / self._amount_scale, valid
 
     def __str__(self) -> str:
         return f"{self._trading_currency}-{self._buying_currency}"
@@ -122,12 +351,20 @@ class Ticker(Observable):
         self._ask = 0.0
         self._bid = 0.0
         self._price = 0.0
+        # total size of the trades seen, only the streaming tickers see trades
+        self._volume = 0.0
         self._timestamp = None
         self._name = ""
 
     def update(self) -> None:
         self._timestamp = datetime.now()
 
+    def _set_quote(self, bid: float, ask: float, price: float, timestamp: datetime) -> None:
+        self._bid = bid
+        self._ask = ask
+        self._price = price
+        self._timestamp = timestamp
+
     def generate(self) -> None:
         while True:
             self.update()
@@ -135,10 +372,14 @@ class Ticker(Observable):
 
     async def produce(self, interval: int) -> None:
         while True:
-            self.update()
+            await self._auth_client.run_in_executor(self.update)
             await self.notify()
             await asyncio.sleep(interval)
 
+    @property
+    def product(self) -> Product:
+        return self._product
+
     @property
     def bid(self) -> float:
         return self._bid
@@ -151,6 +392,10 @@ class Ticker(Observable):
     def price(self) -> float:
         return self._price
 
+    @property
+    def volume(self) -> float:
+        return self._volume
+
     @property
     def timestamp(self) -> datetime:
         return self._timestamp
@@ -164,6 +409,47 @@ class Ticker(Observable):
                 f"Spread: {self._ask-self._bid:8.4f}\n")
 
 
+class MultiTicker:
+    _ticker_class = Ticker
+
+    def __init__(self, auth_client: TradeClient, products: list) -> None:
+        self._auth_client = auth_client
+        self._tickers = {product.prod_id: type(self)._ticker_class(auth_client, product) for product in products}
+
+    def _fetch(self) -> dict:
+        # quotes for all products in as few requests as possible: prod_id -> (bid, ask, price)
+        return {}
+
+    def _distribute(self, quotes: dict) -> None:
+        timestamp = datetime.now().replace(microsecond=0)
+        for prod_id, (bid, ask, price) in quotes.items():
+            if prod_id in self._tickers:
+                self._tickers[prod_id]._set_quote(bid, ask, price, timestamp)
+
+    def update(self) -> None:
+        try:
+            self._distribute(self._fetch())
+        except Exception:
+            # ignore exceptions
+            pass
+
+    async def notify(self) -> None:
+        await asyncio.gather(*[ticker.notify() for ticker in self._tickers.values()])
+
+    async def produce(self, interval: int) -> None:
+        while True:
+            await self._auth_client.run_in_executor(self.update)
+            await self.notify()
+            await asyncio.sleep(interval)
+
+    def ticker(self, product: Product) -> Ticker:
+        return self._tickers[product.prod_id]
+
+    @property
+    def tickers(self) -> list:
+        return list(self._tickers.values())
+
+
 class Order(Observable):
     def __init__(self, auth_client: TradeClient, product: Product, order_type: str, price: float,
                  amount: float) -> None:
@@ -171,8 +457,11 @@ class Order(Observable):
         self._auth_client = auth_client
         self._product = product
         self._order_type = order_type
-        self._price = self._product.format_price(price)
-        self._amount = self._product.format_amount(amount)
+        # the order is kept in whole ticks and lots, the floats are derived from those
+        self._price_ticks = self._product.price_ticks(price)
+        self._amount_lots = self._product.amount_lots(amount)
+        self._price = self._product.tick_price(self._price_ticks)
+        self._amount = self._product.lot_amount(self._amount_lots)
         self._created = False
         self._order_id = None
         self._status = "open"
@@ -185,10 +474,65 @@ class Order(Observable):
     def status(self) -> bool:
         return self._settled
 
+    def _parse_update(self, order_update) -> None:
+        pass
+
+    def _apply_update(self, order_update) -> bool:
+        # apply an order update obtained elsewhere (eg. a batched query), returns whether the order changed
+        previous = (self._status, self._filled_size, self._executed_value, self._settled)
+        try:
+            self._parse_update(order_update)
+        except Exception:
+            self._status = "error"
+            self._message = f"order update exception: {sys.exc_info()[1]}"
+
+        if self._filled_size < previous[1]:
+            # a REST snapshot from before the latest stream events, fills don't go away
+            self._status, self._filled_size, self._executed_value = previous[:3]
+        # neither does settlement
+        self._settled = self._settled or previous[3]
+
+        if self._settled:
+            self._timestamp = datetime.now().replace(microsecond=0)
+
+        return previous != (self._status, self._filled_size, self._executed_value, self._settled)
+
     @property
     def order_id(self) -> str:
         return self._order_id
 
+    @property
+    def product(self) -> Product:
+        return self._product
+
+    @property
+    def price(self) -> float:
+        return self._price
+
+    @property
+    def amount(self) -> float:
+        return self._amount
+
+    @property
+    def price_ticks(self) -> int:
+        return self._price_ticks
+
+    @property
+    def amount_lots(self) -> int:
+        return self._amount_lots
+
+    @property
+    def price_string(self) -> str:
+        return self._product.price_string(self._price_ticks)
+
+    @property
+    def amount_string(self) -> str:
+        return self._product.amount_string(self._amount_lots)
+
+    @property
+    def settled(self) -> bool:
+        return self._settled
+
     @property
     def order_type(self) -> str:
         return self._order_type
@@ -219,7 +563,7 @@ class Order(Observable):
 
     async def produce(self, interval: int) -> None:
         while True:
-            if self.status():
+            if await self._auth_client.run_in_executor(self.status):
                 await self.notify()
             await asyncio.sleep(interval)
 
@@ -258,6 +602,11 @@ class Account(Observable):
     def balance(self) -> dict:
         return self._balance
 
+    def _event(self) -> "Account":
+        event = super()._event()
+        event._balance = dict(self._balance)
+        return event
+
     def balance_string(self) -> str:
         s = ""
         for currency, balance in self._balance.items():
@@ -274,7 +623,7 @@ class Account(Observable):
 
     async def produce(self, interval: int) -> None:
         while True:
-            self.update()
+            await self._auth_client.run_in_executor(self.update)
             await self.notify()
             await asyncio.sleep(interval)
 
@@ -290,13 +639,65 @@ class Account(Observable):
                 f"{self.balance_string()}")
 
 
+class OrderManager:
+    def __init__(self, auth_client: TradeClient) -> None:
+        self._auth_client = auth_client
+        self._orders = {}
+
+    def track(self, order: Order) -> None:
+        if order.created and not order.settled:
+            self._orders[order.order_id] = order
+
+    def untrack(self, order: Order) -> None:
+        self._orders.pop(order.order_id, None)
+
+    def order(self, order_id) -> Order:
+        return self._orders.get(order_id)
+
+    @property
+    def orders(self) -> list:
+        return list(self._orders.values())
+
+    def _snapshot(self) -> dict:
+        # order updates for (at least) all tracked orders, keyed by order id
+        return {}
+
+    def _reconcile(self, updates: dict) -> list:
+        changed = []
+        for order_id, order in list(self._orders.items()):
+            if order_id in updates and order._apply_update(updates[order_id]):
+                changed.append(order)
+            if order.settled:
+                # may run next to an execution stream that untracked the order already
+                self._orders.pop(order_id, None)
+        return changed
+
+    def snapshot(self) -> dict:
+        if len(self._orders) == 0:
+            return {}
+        try:
+            return self._snapshot()
+        except Exception:
+            # try again next cycle
+            return {}
+
+    def reconcile(self) -> list:
+        return self._reconcile(self.snapshot())
+
+    async def produce(self, interval: int) -> None:
+        while True:
+            for order in await self._auth_client.run_in_executor(self.reconcile):
+                await order.notify()
+            await asyncio.sleep(interval)
+
+
 class ApiCreator:
     _maker_fee = 0
     _taker_fee = 0
 
     @staticmethod
-    def create_trade_client(credentials: dict) -> TradeClient:
-        return TradeClient()
+    def create_trade_client(credentials: dict, max_workers: int = None) -> TradeClient:
+        return TradeClient(max_workers)
 
     @staticmethod
     def create_currency(currency_id: str) -> Currency:
@@ -310,14 +711,44 @@ class ApiCreator:
     def create_ticker(auth_client: TradeClient, product: Product) -> Ticker:
         return Ticker(auth_client, product)
 
+    @staticmethod
+    def create_streaming_ticker(auth_client: TradeClient, product: Product) -> Ticker:
+        # without a streaming API the ticker is polled
+        return Ticker(auth_client, product)
+
+    @staticmethod
+    def create_multi_ticker(auth_client: TradeClient, products: list) -> MultiTicker:
+        return MultiTicker(auth_client, products)
+
+    @staticmethod
+    def create_order_book(auth_client: TradeClient, product: Product, depth: int = 100) -> OrderBook:
+        return OrderBook(auth_client, product, depth)
+
     @staticmethod
     def create_order(auth_client: TradeClient, product: Product, order_type: str, price: float, amount: float) -> Order:
         return Order(auth_client, product, order_type, price, amount)
 
+    @classmethod
+    def create_orders(cls, auth_client: TradeClient, product: Product, order_type: str, prices, amounts) -> list:
+        # one order per valid level, None for the levels that don't meet the product's minimums
+        prices, amounts, valid = product.format_batch(prices, amounts)
+        return [cls.create_order(auth_client, product, order_type, float(price), float(amount)) if ok else None
+                for price, amount, ok in zip(prices, amounts, valid)]
+
     @staticmethod
     def create_account(auth_client: TradeClient) -> Account:
         return Account(auth_client)
 
+    @staticmethod
+    def create_order_manager(auth_client: TradeClient) -> OrderManager:
+        return OrderManager(auth_client)
+
+    @staticmethod
+    def create_execution_stream(auth_client: TradeClient, order_manager: OrderManager,
+                                products: list = None) -> ExecutionStream:
+        # without a private stream the order manager's REST reconciliation is all there is
+        return ExecutionStream(auth_client, order_manager, products)
+
     @classmethod
     def maker_fee(cls) -> float:
         return cls._maker_fee
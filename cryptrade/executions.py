@@ -0,0 +1,149 @@
+import websockets
+
+import asyncio
+import json
+
+
+class ExecutionStream:
+    _stream_url = None
+    _reconnect_delay = 1
+    _max_reconnect_delay = 60
+    # reconciliation interval while the stream is down
+    _fallback_interval = 5
+    # maximum number of orders with buffered events, eg. a fill that arrives before the order placement returned
+    _max_pending = 1000
+
+    def __init__(self, auth_client: "TradeClient", order_manager: "OrderManager", products: list = None) -> None:
+        self._auth_client = auth_client
+        self._order_manager = order_manager
+        # some exchanges stream per product, others stream all executions of the account
+        self._products = products or []
+        self._stream_url = type(self)._stream_url
+        self._connected = False
+        self._pending = {}
+
+    @property
+    def stream_url(self) -> str:
+        return self._stream_url
+
+    @stream_url.setter
+    def stream_url(self, url: str) -> None:
+        self._stream_url = url
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    @property
+    def order_manager(self) -> "OrderManager":
+        return self._order_manager
+
+    async def _endpoint(self) -> str:
+        return self._stream_url
+
+    async def _subscriptions(self) -> list:
+        # messages to send after (re)connecting
+        return []
+
+    def _events(self, message) -> list:
+        # (order id, event) pairs from a decoded message
+        return []
+
+    def _order_update(self, order: "Order", event):
+        # convert an event into the order update format of the exchange's Order._parse_update(), None to ignore it
+        return event
+
+    async def _keepalive(self) -> None:
+        pass
+
+    async def _apply(self, order: "Order", event) -> bool:
+        order_update = self._order_update(order, event)
+        if order_update is None:
+            return False
+        changed = order._apply_update(order_update)
+        if order.settled:
+            self._order_manager.untrack(order)
+        return changed
+
+    def _buffer(self, order_id, event) -> None:
+        if order_id not in self._pending and len(self._pending) >= self._max_pending:
+            del self._pending[next(iter(self._pending))]
+        self._pending.setdefault(order_id, []).append(event)
+
+    async def _dispatch(self, message) -> None:
+        changed = []
+        for order_id, event in self._events(message):
+            order = self._order_manager.order(order_id)
+            if order is None:
+                self._buffer(order_id, event)
+            elif await self._apply(order, event) and order not in changed:
+                changed.append(order)
+        for order in changed:
+            await order.notify()
+
+    async def track(self, order: "Order") -> None:
+        self._order_manager.track(order)
+        changed = False
+        for event in self._pending.pop(order.order_id, []):
+            changed = await self._apply(order, event) or changed
+        if changed:
+            await order.notify()
+
+    def untrack(self, order: "Order") -> None:
+        self._order_manager.untrack(order)
+
+    async def reconcile(self) -> None:
+        # only the requests run in the executor, the updates are applied on the loop in between the stream events
+        updates = await self._auth_client.run_in_executor(self._order_manager.snapshot)
+        for order in self._order_manager._reconcile(updates):
+            await order.notify()
+
+    async def _stream(self) -> None:
+        delay = self._reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(await self._endpoint()) as websocket:
+                    for subscription in await self._subscriptions():
+                        await websocket.send(json.dumps(subscription))
+                    self._connected = True
+                    delay = self._reconnect_delay
+
+                    # catch up on whatever happened while disconnected
+                    await self.reconcile()
+
+                    async for message in websocket:
+                        await self._dispatch(json.loads(message))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # connection lost or refused, reconnect after a while
+                pass
+            finally:
+                self._connected = False
+
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, self._max_reconnect_delay)
+
+    async def _fallback(self, interval: int) -> None:
+        # REST reconciliation, slow while the stream is up and faster while it is down
+        elapsed = 0
+        while True:
+            if elapsed >= interval or (not self._connected and elapsed >= self._fallback_interval):
+                await self.reconcile()
+                elapsed = 0
+            await asyncio.sleep(1)
+            elapsed += 1
+
+    async def produce(self, interval: int) -> None:
+        if self._stream_url is None:
+            await self._order_manager.produce(interval)
+        else:
+            tasks = [asyncio.ensure_future(coroutine)
+                     for coroutine in [self._stream(), self._fallback(interval), self._keepalive()]]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # one failing doesn't stop the others
+                for task in tasks:
+                    task.cancel()
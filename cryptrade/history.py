@@ -0,0 +1,322 @@
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from math import floor, isnan
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# the volume is the size traded since the previous tick, None for recordings without it
+Ticks = namedtuple("Ticks", ["time", "ask", "bid", "price", "volume"], defaults=[None])
+
+
+class ColumnHistory:
+    # a fixed-capacity ring of records stored per column, the first column holds the timestamps
+    _columns = ()
+    _types = ()
+    _record = None
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity should be positive")
+
+        self._capacity = capacity
+        self._start = 0
+        self._size = 0
+
+        for column, typecode in zip(self._columns, self._types):
+            if np is not None:
+                setattr(self, "_" + column, np.zeros(capacity, dtype=np.int64 if typecode == "q" else np.float64))
+            else:
+                setattr(self, "_" + column, array(typecode, [0]) * capacity)
+        # element access through a memoryview gives Python numbers, several times faster than NumPy scalars
+        self._data = tuple(memoryview(getattr(self, "_" + column)) if np is not None else getattr(self, "_" + column)
+                           for column in self._columns)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def nbytes(self) -> int:
+        if np is not None:
+            return sum(getattr(self, "_" + column).nbytes for column in self._columns)
+        else:
+            return sum(getattr(self, "_" + column).itemsize * self._capacity for column in self._columns)
+
+    @property
+    def oldest(self) -> int:
+        return self._data[0][self._start] if self._size > 0 else None
+
+    @property
+    def newest(self) -> int:
+        return self._data[0][(self._start + self._size - 1) % self._capacity] if self._size > 0 else None
+
+    def _next(self) -> int:
+        # the index to write the next record to, the oldest one is overwritten once the ring is full
+        start, size, capacity = self._start, self._size, self._capacity
+        if size < capacity:
+            self._size = size + 1
+            index = start + size
+            return index if index < capacity else index - capacity
+        self._start = start + 1 if start + 1 < capacity else 0
+        return start
+
+    def __getitem__(self, position: int) -> tuple:
+        # the record at a chronological position, 0 being the oldest
+        if not -self._size <= position < self._size:
+            raise IndexError("history index out of range")
+        index = (self._start + position % self._size) % self._capacity
+        return self._record(*(column[index] for column in self._data))
+
+    @property
+    def columns(self) -> tuple:
+        # the columns in ring order (see index()), for reading and writing single elements
+        return self._data
+
+    def index(self, position: int) -> int:
+        # the index into the columns of a chronological position, 0 being the oldest
+        return (self._start + position) % self._capacity
+
+    def drop(self, count: int) -> None:
+        # drop the oldest count entries
+        if count > self._size:
+            count = self._size
+        self._start = (self._start + count) % self._capacity
+        self._size -= count
+
+    def evict(self, timestamp: int) -> None:
+        # drop all entries older than timestamp
+        self.drop(self._search(timestamp))
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+    def _search(self, timestamp: int) -> int:
+        # binary search on the logical (chronological) positions of the ring
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._data[0][(self._start + middle) % self._capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _range(self, t0: int = None, t1: int = None) -> tuple:
+        first = 0 if t0 is None else self._search(t0)
+        last = self._size if t1 is None else self._search(t1)
+        return first, max(first, last)
+
+    def _column(self, column, first: int, last: int):
+        begin = (self._start + first) % self._capacity
+        end = begin + (last - first)
+        if end <= self._capacity:
+            return column[begin:end]
+        elif np is not None:
+            return np.concatenate((column[begin:], column[:end - self._capacity]))
+        else:
+            return column[begin:] + column[:end - self._capacity]
+
+    def slice(self, t0: int = None, t1: int = None):
+        # all records with t0 <= time < t1; with NumPy the columns are views whenever the range doesn't wrap
+        first, last = self._range(t0, t1)
+        return self._record(*(self._column(getattr(self, "_" + column), first, last) for column in self._columns))
+
+
+class TickHistory(ColumnHistory):
+    _columns = ("time", "ask", "bid", "price", "volume")
+    _types = ("q", "d", "d", "d", "d")
+    _record = Ticks
+
+    def append(self, timestamp: int, ask: float, bid: float, price: float, volume: float = 0.0) -> None:
+        index = self._next()
+        data = self._data
+        data[0][index] = timestamp
+        data[1][index] = ask
+        data[2][index] = bid
+        data[3][index] = price
+        data[4][index] = volume
+
+    def resample(self, interval: int, t0: int = None, t1: int = None) -> Ticks:
+        # last tick of every interval, timestamped with the start of its interval, with the volume of the interval
+        ticks = self.slice(t0, t1)
+        if len(ticks.time) == 0:
+            return ticks
+
+        if np is not None:
+            buckets = ticks.time // interval
+            last = np.append(np.flatnonzero(buckets[1:] != buckets[:-1]), len(buckets) - 1)
+            first = np.append(0, last[:-1] + 1)
+            return Ticks(buckets[last] * interval, ticks.ask[last], ticks.bid[last], ticks.price[last],
+                         np.add.reduceat(ticks.volume, first))
+        else:
+            last = [i for i in range(len(ticks.time) - 1)
+                    if ticks.time[i] // interval != ticks.time[i + 1] // interval]
+            last.append(len(ticks.time) - 1)
+            first = [0] + [i + 1 for i in last[:-1]]
+            return Ticks(array("q", (ticks.time[i] // interval * interval for i in last)),
+                         array("d", (ticks.ask[i] for i in last)),
+                         array("d", (ticks.bid[i] for i in last)),
+                         array("d", (ticks.price[i] for i in last)),
+                         array("d", (sum(ticks.volume[i:j + 1]) for i, j in zip(first, last))))
+
+    def percentile(self, q: float, column: str = "price", t0: int = None, t1: int = None) -> float:
+        if column not in self._columns:
+            raise ValueError(f"unknown column {column}")
+
+        values = getattr(self.slice(t0, t1), column)
+        if len(values) == 0:
+            return None
+
+        if np is not None:
+            return float(np.percentile(values, q))
+        else:
+            # linear interpolation between the closest ranks, same as NumPy's default
+            values = sorted(values)
+            rank = (len(values) - 1) * q / 100
+            lower = floor(rank)
+            upper = min(lower + 1, len(values) - 1)
+            return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+    def returns(self, t0: int = None, t1: int = None):
+        prices = self.slice(t0, t1).price
+        if np is not None:
+            return np.diff(prices) / prices[:-1] if len(prices) > 1 else np.zeros(0)
+        else:
+            return array("d", (prices[i + 1] / prices[i] - 1 for i in range(len(prices) - 1)))
+
+
+class BalanceBlock:
+    # a full balance followed by the changes to it, every record after the first holds only the currencies that changed
+    def __init__(self, timestamp: int, codes: list, values: list) -> None:
+        self.times = array("q", [timestamp])
+        # end of the changes of every record in codes / values
+        self.ends = array("L", [len(codes)])
+        self.codes = array("H", codes)
+        self.values = array("d", values)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in (self.times, self.ends, self.codes, self.values))
+
+    def add(self, timestamp: int, codes: list, values: list) -> None:
+        self.times.append(timestamp)
+        self.codes.extend(codes)
+        self.values.extend(values)
+        self.ends.append(len(self.codes))
+
+    def snapshot(self) -> dict:
+        # code -> value of the first record
+        return dict(zip(self.codes[:self.ends[0]], self.values[:self.ends[0]]))
+
+
+class BalanceHistory:
+    # balances over time, stored as the currencies that changed with a full balance every snapshot_interval
+    # records; retention (seconds) and max_bytes drop the oldest blocks, timestamps are in nanoseconds
+    def __init__(self, retention: int = None, max_bytes: int = 1 << 20, snapshot_interval: int = 64) -> None:
+        if snapshot_interval <= 0:
+            raise ValueError("snapshot interval should be positive")
+
+        self._retention = retention
+        self._max_bytes = max_bytes
+        self._interval = snapshot_interval
+        self._blocks = []
+        # the first timestamp of every block, for the lookups
+        self._starts = []
+        self._currencies = []
+        self._codes = {}
+        # the latest balance, to find the changes
+        self._balance = {}
+        self._newest = None
+        self._nbytes = 0
+
+    def __len__(self) -> int:
+        return sum(len(block) for block in self._blocks)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    @property
+    def oldest(self) -> int:
+        return self._starts[0] if len(self._starts) > 0 else None
+
+    @property
+    def newest(self) -> int:
+        # the last update, also when nothing changed
+        return self._newest
+
+    def _code(self, currency: str) -> int:
+        code = self._codes.get(currency)
+        if code is None:
+            code = self._codes[currency] = len(self._currencies)
+            self._currencies.append(currency)
+        return code
+
+    def append(self, timestamp: int, balance: dict) -> bool:
+        # returns whether the balance changed, an unchanged balance isn't stored
+        previous = self._balance
+        changes = [(currency, value) for currency, value in balance.items() if previous.get(currency) != value]
+        changes += [(currency, float("nan")) for currency in previous if currency not in balance]
+        self._newest = timestamp
+        if len(changes) == 0 and len(self._blocks) > 0:
+            return False
+        self._balance = dict(balance)
+
+        if len(self._blocks) == 0 or len(self._blocks[-1]) >= self._interval:
+            block = BalanceBlock(timestamp, [self._code(currency) for currency in balance],
+                                 [float(value) for value in balance.values()])
+            self._blocks.append(block)
+            self._starts.append(timestamp)
+            self._nbytes += block.nbytes
+        else:
+            block = self._blocks[-1]
+            nbytes = block.nbytes
+            block.add(timestamp, [self._code(currency) for currency, _ in changes],
+                      [float(value) for _, value in changes])
+            self._nbytes += block.nbytes - nbytes
+
+        if self._retention is not None:
+            self.evict(timestamp - self._retention * 1000000000)
+        while self._nbytes > self._max_bytes and len(self._blocks) > 1:
+            self._drop(1)
+        return True
+
+    def _drop(self, blocks: int) -> None:
+        self._nbytes -= sum(block.nbytes for block in self._blocks[:blocks])
+        del self._blocks[:blocks]
+        del self._starts[:blocks]
+
+    def evict(self, timestamp: int) -> None:
+        # drop the blocks that are not needed for the balance as of timestamp or later
+        self._drop(max(bisect_right(self._starts, timestamp) - 1, 0))
+
+    def clear(self) -> None:
+        self._drop(len(self._blocks))
+        self._balance = {}
+        self._newest = None
+
+    def balance(self, timestamp: int = None) -> dict:
+        # the balance as of timestamp, the latest without one; None before the oldest record
+        if timestamp is None:
+            return dict(self._balance)
+        index = bisect_right(self._starts, timestamp) - 1
+        if index < 0:
+            return None
+        block = self._blocks[index]
+        balance = block.snapshot()
+        record = bisect_right(block.times, timestamp) - 1
+        for position in range(block.ends[0], block.ends[record]):
+            balance[block.codes[position]] = block.values[position]
+        return {self._currencies[code]: value for code, value in balance.items() if not isnan(value)}
@@ -1,15 +1,41 @@
 import krakenex
 
-from cryptrade.exceptions import AuthenticationError, ProductError
-from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, Order, Account, ApiCreator
+from cryptrade.exceptions import AuthenticationError, ProductError, SequenceError
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, MultiTicker, Order, Account, \
+    OrderManager, ApiCreator
+from cryptrade.catalogue import ProductCatalogue
+from cryptrade.streaming import StreamingTicker
+from cryptrade.executions import ExecutionStream
+from cryptrade.orderbook import OrderBook
+from cryptrade.scheduler import PRIORITY_TRADE, PRIORITY_ACCOUNT, PRIORITY_MARKET
 
 import sys
+import zlib
 from datetime import datetime
 
 
 class KrakenTradeClient(TradeClient):
-    def __init__(self, credentials: dict) -> None:
-        super().__init__()
+    # the private API counter holds 15 and decays by 0.33 per second (starter tier), order placement and
+    # cancellation are limited by the trading engine instead
+    _rate_limits = {
+        "public": (1, 1),
+        "private": (15, 0.33),
+        "trading": (60, 1)}
+    _request_costs = {
+        "product": (PRIORITY_MARKET, {"public": 1}),
+        "ticker": (PRIORITY_MARKET, {"public": 1}),
+        "tickers": (PRIORITY_MARKET, {"public": 1}),
+        "book": (PRIORITY_MARKET, {"public": 1}),
+        "order": (PRIORITY_TRADE, {"trading": 1}),
+        "cancel": (PRIORITY_TRADE, {"trading": 1}),
+        "status": (PRIORITY_ACCOUNT, {"private": 1}),
+        "open_orders": (PRIORITY_ACCOUNT, {"private": 1}),
+        "closed_orders": (PRIORITY_ACCOUNT, {"private": 1}),
+        "account": (PRIORITY_ACCOUNT, {"private": 1}),
+        "token": (PRIORITY_ACCOUNT, {"private": 1})}
+
+    def __init__(self, credentials: dict, max_workers: int = None) -> None:
+        super().__init__(max_workers)
 
         if "kraken" in credentials and \
                 "api_key" in credentials["kraken"] and \
@@ -26,6 +52,47 @@ class KrakenTradeClient(TradeClient):
             except Exception:
                 raise AuthenticationError("Could not create non-authenticated Client for Kraken")
 
+        if "api_url" in credentials.get("kraken", {}):
+            # a different host, eg. a cryptrade.mockserver
+            self._client.uri = credentials["kraken"]["api_url"]
+        self._share_connections(self._client.session, self._client.uri)
+        self._catalogue = KrakenProductCatalogue(self)
+
+    def request(self, operation: str, function, *args, **kwargs):
+        result = super().request(operation, function, *args, **kwargs)
+        if any(error.startswith("EAPI:Rate limit") for error in result.get("error", [])):
+            self._scheduler.penalize(operation)
+        return result
+
+    def _response_error(self, result) -> str:
+        # eg. "EAPI:Rate limit exceeded", without any details following the message
+        if isinstance(result, dict) and len(result.get("error", [])) > 0:
+            return ":".join(result["error"][0].split(":")[:2])
+        return None
+
+
+class KrakenProductCatalogue(ProductCatalogue):
+    _exchange = "kraken"
+
+    def fetch(self) -> dict:
+        asset_pairs = self._auth_client.request("product", self._auth_client.client.query_public, "AssetPairs")
+        if "result" not in asset_pairs:
+            raise ProductError(asset_pairs["error"][0])
+
+        products = {}
+        for pair, v in asset_pairs["result"].items():
+            details = {
+                "min_order_amount": 1 / 10 ** v["lot_decimals"],
+                "min_order_price": 1 / 10 ** v["pair_decimals"],
+                "min_order_value": 1 / 10 ** v["lot_decimals"] / 10 ** v["pair_decimals"],
+                "order_price_precision": 1 / 10 ** v["pair_decimals"],
+                "order_amount_precision": 1 / 10 ** v["lot_decimals"],
+                "wsname": v.get("wsname")}
+            products[pair] = details
+            # pairs can be queried by their alternative name as well
+            products.setdefault(v.get("altname", pair), details)
+        return products
+
 
 class KrakenCurrency(Currency):
     _currency_map = {
@@ -52,9 +119,30 @@ class KrakenCurrency(Currency):
         "ICN": "XICN",
         "DAO": "XDAO"}
 
+    _currency_aliases = {"XBT": "BTC"}
+
+    # the assets listed before Kraken stopped prefixing its codes with X (crypto) or Z (fiat); newer assets keep
+    # their own codes, 4 letter ones starting with X or Z included
+    _legacy_assets = frozenset(["XDAO", "XETC", "XETH", "XICN", "XLTC", "XMLN", "XNMC", "XREP", "XXBT", "XXDG",
+                                "XXLM", "XXMR", "XXRP", "XXTZ", "XXVN", "XZEC",
+                                "ZAUD", "ZCAD", "ZEUR", "ZGBP", "ZJPY", "ZKRW", "ZUSD"])
+
     def __init__(self, currency_id: str) -> None:
         super().__init__(currency_id)
 
+    @classmethod
+    def _map_unknown_currency(cls, currency: str) -> str:
+        base, dot, suffix = currency.partition(".")
+        if dot:
+            # staking or margin variant, eg. XXBT.M or DOT.S
+            return cls.map_from_exchange_currency(base) + dot + suffix
+        elif currency in cls._currency_aliases:
+            return cls._currency_aliases[currency]
+        elif currency in cls._legacy_assets:
+            return cls.map_from_exchange_currency(currency[1:])
+        else:
+            return currency
+
 
 class KrakenProduct(Product):
     _product_map = {
@@ -138,22 +226,26 @@ class KrakenProduct(Product):
         "USDCAD": "ZUSDZCAD",
         "USDJPY": "ZUSDZJPY"}
 
+    @classmethod
+    def _map_unknown_product(cls, prod_id: str) -> str:
+        base, dot, suffix = prod_id.partition(".")
+        if dot:
+            # dark pool variant, eg. XXBTZEUR.d
+            return cls.map_from_exchange_product(base) + dot + suffix
+        elif prod_id[:4] in KrakenCurrency._legacy_assets and prod_id[4:] in KrakenCurrency._legacy_assets:
+            return (KrakenCurrency.map_from_exchange_currency(prod_id[:4]) +
+                    KrakenCurrency.map_from_exchange_currency(prod_id[4:]))
+        elif prod_id.startswith("XBT"):
+            return "BTC" + prod_id[3:]
+        elif prod_id.endswith("XBT"):
+            return prod_id[:-3] + "BTC"
+        else:
+            return prod_id
+
     def __init__(self, auth_client: KrakenTradeClient, trading_currency: Currency, buying_currency: Currency) -> None:
         try:
             super().__init__(auth_client, trading_currency, buying_currency)
-
-            product_data = {"pair": f"{self.prod_id}"}
-            product = self._auth_client.client.query_public("AssetPairs", product_data)
-
-            if "result" in product:
-                for k, v in product["result"].items():
-                    self._min_order_amount = 1 / 10 ** v["lot_decimals"]
-                    self._min_order_price = 1 / 10 ** v["pair_decimals"]
-                    self._min_order_value = self._min_order_amount * self._min_order_price
-                    self._order_price_precision = 1 / 10 ** v["pair_decimals"]
-                    self._order_amount_precision = 1 / 10 ** v["lot_decimals"]
-            else:
-                raise ProductError(product["error"][0])
+            self._set_details(self._auth_client.catalogue.get(self.prod_id))
 
         except ProductError:
             raise
@@ -168,7 +260,8 @@ class KrakenTicker(Ticker):
 
     def update(self) -> None:
         try:
-            product_ticker = self._auth_client.client.query_public("Ticker", {"pair": f"{self._product.prod_id}"})
+            product_ticker = self._auth_client.request("ticker", self._auth_client.client.query_public,
+                                                      "Ticker", {"pair": f"{self._product.prod_id}"})
             if "result" in product_ticker:
                 for k, v in product_ticker["result"].items():
                     self._bid = float(v["b"][0])
@@ -181,22 +274,136 @@ class KrakenTicker(Ticker):
             pass
 
 
+class KrakenStreamingTicker(StreamingTicker, KrakenTicker):
+    _stream_url = "wss://ws.kraken.com"
+
+    def __init__(self, auth_client: KrakenTradeClient, product: KrakenProduct) -> None:
+        super().__init__(auth_client, product)
+        # the websocket API uses its own pair names, eg. XBT/EUR
+        self._wsname = self._auth_client.catalogue.get(self._product.prod_id)["wsname"]
+
+    def _subscriptions(self) -> list:
+        return [{"event": "subscribe", "pair": [self._wsname], "subscription": {"name": "ticker"}},
+                {"event": "subscribe", "pair": [self._wsname], "subscription": {"name": "trade"}}]
+
+    def _parse(self, message) -> bool:
+        if isinstance(message, list) and len(message) >= 4 and message[-1] == self._wsname:
+            if message[-2] == "ticker":
+                self._bid = float(message[1]["b"][0])
+                self._ask = float(message[1]["a"][0])
+                self._price = float(message[1]["c"][0])
+                return True
+            elif message[-2] == "trade":
+                # [[price, volume, time, side, order type, misc], ...]
+                for trade in message[1]:
+                    self._volume += float(trade[1])
+                self._price = float(message[1][-1][0])
+                return True
+        return False
+
+
+class KrakenOrderBook(OrderBook):
+    _stream_url = "wss://ws.kraken.com"
+    # the depths of a book subscription
+    _depths = [10, 25, 100, 500, 1000]
+
+    def __init__(self, auth_client: KrakenTradeClient, product: KrakenProduct, depth: int = 100) -> None:
+        super().__init__(auth_client, product, depth)
+        self._levels = next((levels for levels in self._depths if levels >= depth), self._depths[-1])
+        self._wsname = self._auth_client.catalogue.get(self._product.prod_id)["wsname"]
+        # price -> (price, volume) as received, the checksum is calculated over the strings
+        self._text = {"a": {}, "b": {}}
+
+    def _fetch(self) -> tuple:
+        book = self._auth_client.request("book", self._auth_client.client.query_public,
+                                         "Depth", {"pair": self._product.prod_id, "count": self._levels})
+        if "result" not in book:
+            raise AttributeError(book["error"][0])
+        for pair, v in book["result"].items():
+            return [level[:2] for level in v["bids"]], [level[:2] for level in v["asks"]], None
+        return [], [], None
+
+    def _load(self, bids: list, asks: list, sequence: int = None) -> None:
+        super()._load(bids, asks, sequence)
+        self._text = {"a": {float(price): (price, volume) for price, volume in asks},
+                      "b": {float(price): (price, volume) for price, volume in bids}}
+
+    def _subscriptions(self) -> list:
+        return [{"event": "subscribe", "pair": [self._wsname], "subscription": {"name": "book", "depth": self._levels}}]
+
+    def _checksum(self) -> int:
+        # CRC32 of the best 10 asks and then the best 10 bids, price and volume without the decimal point and
+        # leading zeros
+        parts = []
+        for key, side in [("a", self._asks), ("b", self._bids)]:
+            text = self._text[key]
+            for price, _ in side.levels(10):
+                price_text, volume_text = text[price]
+                parts.append(price_text.replace(".", "").lstrip("0"))
+                parts.append(volume_text.replace(".", "").lstrip("0"))
+        return zlib.crc32("".join(parts).encode())
+
+    def _apply(self, message) -> bool:
+        # [channel id, {"a": ...}, ({"b": ..., "c": checksum},) "book-<depth>", pair]
+        if not isinstance(message, list) or len(message) < 4 or message[-1] != self._wsname or \
+                not str(message[-2]).startswith("book"):
+            return False
+        checksum = None
+        for data in message[1:-2]:
+            if "as" in data or "bs" in data:
+                self._load([level[:2] for level in data.get("bs", [])], [level[:2] for level in data.get("as", [])])
+                return True
+            if not self._synced:
+                return False
+            for key, side in [("a", self._asks), ("b", self._bids)]:
+                text = self._text[key]
+                for level in data.get(key, []):
+                    price, volume = float(level[0]), float(level[1])
+                    side.set(price, volume)
+                    if volume > 0:
+                        text[price] = (level[0], level[1])
+                    else:
+                        text.pop(price, None)
+            checksum = data.get("c", checksum)
+
+        # levels beyond the subscribed depth are not deleted by the updates
+        for key, side in [("a", self._asks), ("b", self._bids)]:
+            for price in side.truncate(self._levels):
+                self._text[key].pop(price, None)
+        if checksum is not None and self._checksum() != int(checksum):
+            raise SequenceError(f"{self._wsname} checksum mismatch")
+        return True
+
+
+class KrakenMultiTicker(MultiTicker):
+    _ticker_class = KrakenTicker
+
+    def _fetch(self) -> dict:
+        product_tickers = self._auth_client.request("tickers", self._auth_client.client.query_public,
+                                                    "Ticker", {"pair": ",".join(self._tickers)})
+        if "result" not in product_tickers:
+            raise AttributeError(product_tickers["error"][0])
+        return {pair: (float(v["b"][0]), float(v["a"][0]), float(v["c"][0]))
+                for pair, v in product_tickers["result"].items()}
+
+
 class KrakenOrder(Order):
     def __init__(self, auth_client: KrakenTradeClient, product: KrakenProduct, order_type: str,
                  price: float, amount: float) -> None:
         try:
             super().__init__(auth_client, product, order_type, price, amount)
 
-            if not self._product.valid(self._amount, self._price):
+            if not self._product.valid_steps(self._amount_lots, self._price_ticks):
                 raise AttributeError("Invalid amount/price for order")
 
             order_data = {"pair": self._product.prod_id,
                           "type": self._order_type,
                           "ordertype": "limit",
-                          "price": str(self._price),
-                          "volume": str(self._amount)}
+                          "price": self.price_string,
+                          "volume": self.amount_string}
 
-            order_result = self._auth_client.client.query_private("AddOrder", order_data)
+            order_result = self._auth_client.request("order", self._auth_client.client.query_private,
+                                                     "AddOrder", order_data)
 
             if "result" in order_result and "txid" in order_result["result"]:
                 self._created = True
@@ -220,17 +427,21 @@ class KrakenOrder(Order):
             self._settled = True
             self._message = f"Invalid order: {sys.exc_info()[1]}"
 
+    def _parse_update(self, order_update: dict) -> None:
+        self._status = order_update["status"]
+        self._filled_size = float(order_update["vol_exec"])
+        self._executed_value = self._filled_size * float(order_update["price"])
+        if self._status in ["closed", "canceled", "expired"]:
+            self._settled = True
+
     def status(self) -> bool:
         try:
             order_data = {"txid": self._order_id}
-            order_update = self._auth_client.client.query_private("QueryOrders", order_data)
+            order_update = self._auth_client.request("status", self._auth_client.client.query_private,
+                                                     "QueryOrders", order_data)
 
             if "result" in order_update:
-                self._status = order_update["result"][self._order_id]["status"]
-                self._filled_size = float(order_update["result"][self._order_id]["vol_exec"])
-                self._executed_value = self._filled_size * float(order_update["result"][self._order_id]["price"])
-                if self._status in ["closed", "canceled", "expired"]:
-                    self._settled = True
+                self._parse_update(order_update["result"][self._order_id])
             else:
                 self._settled = True
                 raise AttributeError(order_update["error"][0])
@@ -248,7 +459,8 @@ class KrakenOrder(Order):
         if not self._settled:
             try:
                 super().cancel()
-                self._auth_client.client.query_private("CancelOrder", {"txid": self.order_id})
+                self._auth_client.request("cancel", self._auth_client.client.query_private,
+                                          "CancelOrder", {"txid": self.order_id})
             except Exception:
                 self._message = "Cancellation failed"
 
@@ -260,7 +472,7 @@ class KrakenAccount(Account):
 
     def update(self) -> None:
         try:
-            account_info = self._auth_client.client.query_private("Balance")
+            account_info = self._auth_client.request("account", self._auth_client.client.query_private, "Balance")
 
             if "result" in account_info:
                 self._balance.clear()
@@ -275,13 +487,65 @@ class KrakenAccount(Account):
             pass
 
 
+class KrakenOrderManager(OrderManager):
+    # maximum number of transaction ids per QueryOrders call
+    _batch_size = 50
+
+    def _snapshot(self) -> dict:
+        open_orders = self._auth_client.request("open_orders", self._auth_client.client.query_private, "OpenOrders")
+        if "result" not in open_orders:
+            raise AttributeError(open_orders["error"][0])
+        updates = dict(open_orders["result"]["open"])
+
+        closed = [order_id for order_id in list(self._orders) if order_id not in updates]
+        for i in range(0, len(closed), self._batch_size):
+            order_data = {"txid": ",".join(closed[i:i + self._batch_size])}
+            closed_orders = self._auth_client.request("closed_orders", self._auth_client.client.query_private,
+                                                      "QueryOrders", order_data)
+            if "result" in closed_orders:
+                updates.update(closed_orders["result"])
+        return updates
+
+
+class KrakenExecutionStream(ExecutionStream):
+    _stream_url = "wss://ws-auth.kraken.com"
+
+    def __init__(self, auth_client: KrakenTradeClient, order_manager: KrakenOrderManager,
+                 products: list = None) -> None:
+        super().__init__(auth_client, order_manager, products)
+        if not self._auth_client.client.key:
+            # private feeds require credentials, fall back to REST only
+            self._stream_url = None
+
+    async def _subscriptions(self) -> list:
+        token = await self._auth_client.run_in_executor(
+            self._auth_client.request, "token", self._auth_client.client.query_private, "GetWebSocketsToken")
+        if "result" not in token:
+            raise AttributeError(token["error"][0])
+        return [{"event": "subscribe", "subscription": {"name": "openOrders", "token": token["result"]["token"]}}]
+
+    def _events(self, message) -> list:
+        # [[{txid: {changed fields}}, ...], "openOrders", {"sequence": n}]
+        if isinstance(message, list) and len(message) >= 2 and message[1] == "openOrders":
+            return [(order_id, fields) for entry in message[0] for order_id, fields in entry.items()]
+        return []
+
+    def _order_update(self, order: KrakenOrder, event: dict) -> dict:
+        # updates only hold the fields that changed
+        filled_size = float(event.get("vol_exec", order.filled_size))
+        price = float(event.get("avg_price", 0))
+        if price == 0 and order.filled_size > 0:
+            price = order.executed_value / order.filled_size
+        return {"status": event.get("status", "open"), "vol_exec": filled_size, "price": price}
+
+
 class KrakenApiCreator(ApiCreator):
     _maker_fee = 0.0016
     _taker_fee = 0.0026
 
     @staticmethod
-    def create_trade_client(credentials: dict) -> KrakenTradeClient:
-        return KrakenTradeClient(credentials)
+    def create_trade_client(credentials: dict, max_workers: int = None) -> KrakenTradeClient:
+        return KrakenTradeClient(credentials, max_workers)
 
     @staticmethod
     def create_currency(currency_id: str) -> KrakenCurrency:
@@ -296,6 +560,18 @@ class KrakenApiCreator(ApiCreator):
     def create_ticker(auth_client: KrakenTradeClient, product: KrakenProduct) -> KrakenTicker:
         return KrakenTicker(auth_client, product)
 
+    @staticmethod
+    def create_streaming_ticker(auth_client: KrakenTradeClient, product: KrakenProduct) -> KrakenStreamingTicker:
+        return KrakenStreamingTicker(auth_client, product)
+
+    @staticmethod
+    def create_multi_ticker(auth_client: KrakenTradeClient, products: list) -> KrakenMultiTicker:
+        return KrakenMultiTicker(auth_client, products)
+
+    @staticmethod
+    def create_order_book(auth_client: KrakenTradeClient, product: KrakenProduct, depth: int = 100) -> KrakenOrderBook:
+        return KrakenOrderBook(auth_client, product, depth)
+
     @staticmethod
     def create_order(auth_client: KrakenTradeClient, product: KrakenProduct, order_type: str,
                      price: float, amount: float) -> KrakenOrder:
@@ -304,3 +580,12 @@ class KrakenApiCreator(ApiCreator):
     @staticmethod
     def create_account(auth_client: KrakenTradeClient) -> KrakenAccount:
         return KrakenAccount(auth_client)
+
+    @staticmethod
+    def create_order_manager(auth_client: KrakenTradeClient) -> KrakenOrderManager:
+        return KrakenOrderManager(auth_client)
+
+    @staticmethod
+    def create_execution_stream(auth_client: KrakenTradeClient, order_manager: KrakenOrderManager,
+                                products: list = None) -> KrakenExecutionStream:
+        return KrakenExecutionStream(auth_client, order_manager, products)
@@ -0,0 +1,133 @@
+from cryptrade.exchange_api import TradeClient, Product, Order, ApiCreator
+from cryptrade.executions import ExecutionStream
+from cryptrade.observers import Observer
+
+import asyncio
+import time
+from collections import namedtuple
+
+Leg = namedtuple("Leg", ["order_type", "price", "amount", "latency", "order"])
+
+
+def fixed_amount(amount: float):
+    return lambda price, level: amount
+
+
+def fixed_value(value: float):
+    return lambda price, level: value / price
+
+
+class LadderLeg(Observer):
+    def __init__(self, ladder: "Ladder", order: Order) -> None:
+        super().__init__(order)
+        self._ladder = ladder
+
+    async def notify(self, observable: Order) -> None:
+        # the event is a copy, the ladder knows the order itself
+        if observable.settled:
+            await self._ladder.settled(self._observable)
+
+
+class Ladder:
+    def __init__(self, api_factory: ApiCreator, auth_client: TradeClient, product: Product,
+                 executions: ExecutionStream, center: float, step: float, levels: int, sizing) -> None:
+        # sizing(price, level) returns the amount for a level, level 1 being closest to the center
+        self._api_factory = api_factory
+        self._auth_client = auth_client
+        self._product = product
+        self._executions = executions
+        self._center = center
+        self._step = step
+        self._levels = levels
+        self._sizing = sizing
+        # live orders by price in ticks, a refill can end up at the price of an order that is still open
+        self._live = {}
+        self._legs = []
+        self._active = False
+
+    @property
+    def center(self) -> float:
+        return self._center
+
+    @property
+    def step(self) -> float:
+        return self._step
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @property
+    def live(self) -> list:
+        return [order for ticks in sorted(self._live) for order in self._live[ticks]]
+
+    @property
+    def legs(self) -> list:
+        return list(self._legs)
+
+    def level(self, price: float) -> list:
+        return list(self._live.get(self._product.price_ticks(price), []))
+
+    def latencies(self, order_type: str = None) -> dict:
+        latencies = sorted(leg.latency for leg in self._legs if order_type is None or leg.order_type == order_type)
+        if len(latencies) == 0:
+            return {"count": 0, "p50": None, "p99": None, "max": None}
+        return {"count": len(latencies),
+                "p50": latencies[len(latencies) // 2],
+                "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+                "max": latencies[-1]}
+
+    async def _submit(self, order_type: str, price: float, amount: float) -> Order:
+        # the executor bounds the number of requests in flight, the client's scheduler keeps them within the rate
+        # limits with orders going ahead of market data
+        start = time.perf_counter()
+        order = await self._auth_client.run_in_executor(self._api_factory.create_order, self._auth_client,
+                                                        self._product, order_type, price, amount)
+        self._legs.append(Leg(order_type, order.price, order.amount, time.perf_counter() - start, order))
+
+        if order.created and not order.settled:
+            self._live.setdefault(order.price_ticks, []).append(order)
+            LadderLeg(self, order)
+            await self._executions.track(order)
+        return order
+
+    async def _place_side(self, order_type: str, prices: list) -> list:
+        amounts = [self._sizing(price, level + 1) for level, price in enumerate(prices)]
+        prices, amounts, valid = self._product.format_batch(prices, amounts)
+        return await asyncio.gather(*[self._submit(order_type, float(price), float(amount))
+                                      for price, amount, ok in zip(prices, amounts, valid) if ok])
+
+    async def place(self) -> list:
+        self._active = True
+        buy_prices = [self._center - level * self._step for level in range(1, self._levels + 1)]
+        sell_prices = [self._center + level * self._step for level in range(1, self._levels + 1)]
+        buy_orders, sell_orders = await asyncio.gather(self._place_side("buy", buy_prices),
+                                                       self._place_side("sell", sell_prices))
+        return buy_orders + sell_orders
+
+    async def settled(self, order: Order) -> None:
+        # both the stream and the REST reconciliation may report the same order
+        orders = self._live.get(order.price_ticks, [])
+        if order not in orders:
+            return
+        orders.remove(order)
+        if len(orders) == 0:
+            del self._live[order.price_ticks]
+        self._executions.untrack(order)
+
+        if not self._active or order.error or order.filled_size == 0:
+            return
+
+        # refill: the filled amount goes back in on the other side, one step away
+        if order.order_type == "buy":
+            await self._submit("sell", order.price + self._step, order.filled_size)
+        else:
+            await self._submit("buy", order.price - self._step, order.filled_size)
+
+    async def cancel(self) -> None:
+        self._active = False
+        orders = self.live
+        self._live.clear()
+        for order in orders:
+            self._executions.untrack(order)
+        await asyncio.gather(*[self._auth_client.run_in_executor(order.cancel) for order in orders])
@@ -0,0 +1,178 @@
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+# upper bounds in seconds, the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = BUCKETS) -> None:
+        self._bounds = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # a value on a bound belongs to that bucket, like Prometheus' le
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def buckets(self) -> list:
+        # (upper bound, cumulative count), the way Prometheus exposes them
+        result = []
+        total = 0
+        for bound, count in zip(self._bounds + (float("inf"),), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        # linear interpolation within the bucket, like Prometheus' histogram_quantile
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        lower = 0.0
+        total = 0
+        for bound, count in zip(self._bounds, self._counts):
+            if count > 0 and total + count >= rank:
+                return lower + (bound - lower) * (rank - total) / count
+            total += count
+            lower = bound
+        # in the +Inf bucket, the highest bound is all that is known
+        return self._bounds[-1]
+
+
+class OperationMetrics:
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        # error (exception type) -> count
+        self.errors = {}
+        self.last_success = None
+        self.last_error = None
+        self.last_error_type = None
+
+    def record(self, seconds: float, error: str = None) -> None:
+        self.latency.observe(seconds)
+        if error is None:
+            self.last_success = time.time()
+        else:
+            self.errors[error] = self.errors.get(error, 0) + 1
+            self.last_error = time.time()
+            self.last_error_type = error
+
+    def snapshot(self) -> dict:
+        return {"count": self.latency.count,
+                "sum": self.latency.sum,
+                "buckets": self.latency.buckets,
+                "p50": self.latency.quantile(0.5),
+                "p99": self.latency.quantile(0.99),
+                "errors": dict(self.errors),
+                "last_success": self.last_success,
+                "last_error": self.last_error,
+                "last_error_type": self.last_error_type}
+
+
+class Metrics:
+    _enabled = True
+
+    # shared by all clients in the process: (exchange, operation) -> OperationMetrics
+    _operations = {}
+    _lock = Lock()
+
+    @classmethod
+    def configure(cls, enabled: bool = None) -> None:
+        if enabled is not None:
+            Metrics._enabled = enabled
+
+    @staticmethod
+    def record(exchange: str, operation: str, seconds: float, error: str = None) -> None:
+        if not Metrics._enabled:
+            return
+        with Metrics._lock:
+            metrics = Metrics._operations.get((exchange, operation))
+            if metrics is None:
+                metrics = Metrics._operations[(exchange, operation)] = OperationMetrics()
+            metrics.record(seconds, error)
+
+    @staticmethod
+    def snapshot() -> dict:
+        # exchange -> operation -> counters, a copy that is safe to keep
+        with Metrics._lock:
+            result = {}
+            for (exchange, operation), metrics in Metrics._operations.items():
+                result.setdefault(exchange, {})[operation] = metrics.snapshot()
+            return result
+
+    @staticmethod
+    def reset() -> None:
+        with Metrics._lock:
+            Metrics._operations.clear()
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        escaped = {name: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                   for name, value in labels.items()}
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped.items()) + "}"
+
+    @staticmethod
+    def prometheus() -> str:
+        # text exposition format 0.0.4
+        snapshot = Metrics.snapshot()
+        operations = [(exchange, operation, metrics) for exchange, exchange_metrics in sorted(snapshot.items())
+                      for operation, metrics in sorted(exchange_metrics.items())]
+        lines = ["# HELP cryptrade_request_duration_seconds Duration of exchange requests, rate limit waits excluded.",
+                 "# TYPE cryptrade_request_duration_seconds histogram"]
+        for exchange, operation, metrics in operations:
+            for bound, count in metrics["buckets"]:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"cryptrade_request_duration_seconds_bucket"
+                             f"{Metrics._labels(exchange=exchange, operation=operation, le=le)} {count}")
+            labels = Metrics._labels(exchange=exchange, operation=operation)
+            lines.append(f"cryptrade_request_duration_seconds_sum{labels} {metrics['sum']!r}")
+            lines.append(f"cryptrade_request_duration_seconds_count{labels} {metrics['count']}")
+
+        lines += ["# HELP cryptrade_request_errors_total Failed exchange requests by error.",
+                  "# TYPE cryptrade_request_errors_total counter"]
+        for exchange, operation, metrics in operations:
+            for error, count in sorted(metrics["errors"].items()):
+                lines.append(f"cryptrade_request_errors_total"
+                             f"{Metrics._labels(exchange=exchange, operation=operation, error=error)} {count}")
+
+        for name, description in [("last_success", "Time of the last successful request."),
+                                  ("last_error", "Time of the last failed request.")]:
+            lines += [f"# HELP cryptrade_request_{name}_timestamp_seconds {description}",
+                      f"# TYPE cryptrade_request_{name}_timestamp_seconds gauge"]
+            for exchange, operation, metrics in operations:
+                if metrics[name] is not None:
+                    lines.append(f"cryptrade_request_{name}_timestamp_seconds"
+                                 f"{Metrics._labels(exchange=exchange, operation=operation)} {metrics[name]!r}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def serve(port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        # GET /metrics for Prometheus in a daemon thread; shutdown() on the returned server stops it
+        # local only by default, pass host="0.0.0.0" (or an interface address) for a remote scraper
+        server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        server.daemon_threads = True
+        Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ["/metrics", "/"]:
+            self.send_error(404)
+            return
+        body = Metrics.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
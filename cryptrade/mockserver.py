@@ -0,0 +1,981 @@
+import websockets
+
+import asyncio
+import base64
+import itertools
+import json
+import math
+import random
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import urlsplit, parse_qsl
+
+MockProduct = namedtuple("MockProduct", ["trading", "buying", "price", "price_decimals", "amount_decimals",
+                                         "min_amount"])
+
+DEFAULT_PRODUCTS = [
+    MockProduct("BTC", "EUR", 30000.0, 2, 8, 0.0001),
+    MockProduct("ETH", "EUR", 2000.0, 2, 8, 0.001),
+    MockProduct("BTC", "USD", 32000.0, 2, 8, 0.0001),
+    MockProduct("ETH", "BTC", 0.066, 5, 8, 0.001)]
+
+DEFAULT_BALANCES = {"BTC": 10.0, "ETH": 100.0, "EUR": 1000000.0, "USD": 1000000.0}
+
+_FIAT = {"EUR", "USD", "GBP", "JPY", "CAD", "CHF"}
+
+
+class MockError(Exception):
+    # kind is one of "symbol", "order", "funds" or "invalid", each dialect maps it onto its own error response
+    def __init__(self, kind: str, message: str) -> None:
+        super().__init__(message)
+        self.kind = kind
+
+
+class MockOrder:
+    def __init__(self, order_id, product: MockProduct, side: str, price: float, amount: float) -> None:
+        self.order_id = order_id
+        self.product = product
+        self.side = side
+        self.price = price
+        self.amount = amount
+        self.filled = 0.0
+        self.value = 0.0
+        self.status = "open"
+        self.created = time.time()
+        self.updated = self.created
+
+    @property
+    def open(self) -> bool:
+        return self.status == "open"
+
+    @property
+    def average_price(self) -> float:
+        return self.value / self.filled if self.filled > 0 else 0.0
+
+
+class MockMarket:
+    # the quote of one product, a random walk moved one step by every ticker request and order placement
+    def __init__(self, product: MockProduct, volatility: float, spread: float, rng: random.Random) -> None:
+        self.product = product
+        self._volatility = volatility
+        self._spread = spread
+        self._rng = rng
+        self.mid = product.price
+        self.last = product.price
+        self.volume = 0.0
+        self.orders = []
+        self.trade_id = 0
+
+    def _round(self, price: float) -> float:
+        return round(price, self.product.price_decimals)
+
+    @property
+    def bid(self) -> float:
+        return self._round(self.mid * (1 - self._spread / 2))
+
+    @property
+    def ask(self) -> float:
+        return self._round(self.mid * (1 + self._spread / 2))
+
+    def step(self) -> None:
+        self.mid *= math.exp(self._rng.gauss(0.0, self._volatility))
+        self.last = self._round(self.mid)
+        self.trade_id += 1
+
+    def book(self, levels: int) -> tuple:
+        # (price, size) bids and asks one tick apart from the quote on, the sizes only depend on the level
+        tick = 10 ** -self.product.price_decimals
+        sizes = [round(0.05 * (1 + level * 7 % 10), self.product.amount_decimals) for level in range(levels)]
+        return [(self._round(self.bid - level * tick), size) for level, size in enumerate(sizes)], \
+               [(self._round(self.ask + level * tick), size) for level, size in enumerate(sizes)]
+
+
+class MockExchange:
+    # the in-memory state of one exchange: markets, orders and balances
+    def __init__(self, products: list, balances: dict, seed: int, volatility: float = 0.0005,
+                 spread: float = 0.0002) -> None:
+        self._lock = Lock()
+        self._rng = random.Random(seed)
+        self._markets = {(product.trading, product.buying): MockMarket(product, volatility, spread, self._rng)
+                         for product in products}
+        self._balances = dict(balances)
+        self._holds = {}
+        self._orders = {}
+        self._order_ids = itertools.count(1)
+
+    @property
+    def lock(self) -> Lock:
+        return self._lock
+
+    @property
+    def markets(self) -> list:
+        return list(self._markets.values())
+
+    def market(self, trading: str, buying: str) -> MockMarket:
+        market = self._markets.get((trading, buying))
+        if market is None:
+            raise MockError("symbol", f"unknown product {trading}/{buying}")
+        return market
+
+    def next_id(self) -> int:
+        return next(self._order_ids)
+
+    def balances(self) -> dict:
+        return {currency: (balance, self._holds.get(currency, 0.0)) for currency, balance in self._balances.items()}
+
+    def _hold(self, order: MockOrder, amount: float) -> None:
+        if order.side == "buy":
+            currency, held = order.product.buying, amount * order.price
+        else:
+            currency, held = order.product.trading, amount
+        self._holds[currency] = self._holds.get(currency, 0.0) + held
+
+    def _fill(self, market: MockMarket, order: MockOrder, price: float) -> None:
+        amount = order.amount - order.filled
+        self._hold(order, -amount)
+        value = amount * price
+        trading, buying = order.product.trading, order.product.buying
+        if order.side == "buy":
+            self._balances[trading] = self._balances.get(trading, 0.0) + amount
+            self._balances[buying] = self._balances.get(buying, 0.0) - value
+        else:
+            self._balances[trading] = self._balances.get(trading, 0.0) - amount
+            self._balances[buying] = self._balances.get(buying, 0.0) + value
+        order.filled = order.amount
+        order.value += value
+        order.status = "filled"
+        order.updated = time.time()
+        market.volume += amount
+        market.last = price
+
+    def _match(self, market: MockMarket) -> None:
+        for order in [order for order in market.orders if
+                      (order.side == "buy" and market.ask <= order.price) or
+                      (order.side == "sell" and market.bid >= order.price)]:
+            # resting orders fill at their own price
+            self._fill(market, order, order.price)
+            market.orders.remove(order)
+
+    def step(self, market: MockMarket) -> None:
+        market.step()
+        self._match(market)
+
+    def place(self, order_id, trading: str, buying: str, side: str, price: float, amount: float) -> MockOrder:
+        market = self.market(trading, buying)
+        if side not in ["buy", "sell"] or price <= 0 or amount < market.product.min_amount:
+            raise MockError("invalid", "invalid order parameters")
+
+        available_currency = buying if side == "buy" else trading
+        required = price * amount if side == "buy" else amount
+        available = self._balances.get(available_currency, 0.0) - self._holds.get(available_currency, 0.0)
+        if required > available + 1e-12:
+            raise MockError("funds", "insufficient funds")
+
+        order = MockOrder(order_id, market.product, side, price, amount)
+        self._orders[order_id] = order
+        self._hold(order, amount)
+        self.step(market)
+        if (side == "buy" and market.ask <= price) or (side == "sell" and market.bid >= price):
+            # crosses the book, taken at the quote
+            self._fill(market, order, market.ask if side == "buy" else market.bid)
+        else:
+            market.orders.append(order)
+        return order
+
+    def order(self, order_id) -> MockOrder:
+        order = self._orders.get(order_id)
+        if order is None:
+            raise MockError("order", "unknown order")
+        return order
+
+    def cancel(self, order_id) -> MockOrder:
+        order = self.order(order_id)
+        if not order.open:
+            raise MockError("order", "order not open")
+        self._hold(order, -(order.amount - order.filled))
+        order.status = "canceled"
+        order.updated = time.time()
+        self._markets[(order.product.trading, order.product.buying)].orders.remove(order)
+        return order
+
+    def orders(self, trading: str = None, buying: str = None, open_only: bool = False) -> list:
+        return [order for order in self._orders.values()
+                if (trading is None or (order.product.trading, order.product.buying) == (trading, buying)) and
+                (not open_only or order.open)]
+
+
+def _number(value: float, decimals: int) -> str:
+    return f"{value:.{decimals}f}"
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class Dialect:
+    # the REST API of one exchange on top of a MockExchange; routes return (status, payload)
+    json_body = True
+
+    def __init__(self, exchange: MockExchange) -> None:
+        self._exchange = exchange
+        self._symbols = {self.symbol(market.product): market for market in exchange.markets}
+
+    def symbol(self, product: MockProduct) -> str:
+        return product.trading + product.buying
+
+    def market(self, symbol: str) -> MockMarket:
+        market = self._symbols.get(symbol)
+        if market is None:
+            raise MockError("symbol", f"unknown symbol {symbol}")
+        return market
+
+    def route(self, method: str, path: str, params: dict) -> tuple:
+        return 404, {"message": "not found"}
+
+    def error(self, error: MockError) -> tuple:
+        return 400, {"message": str(error)}
+
+    def rate_limited(self) -> tuple:
+        return 429, {"message": "rate limit exceeded"}
+
+    def failure(self) -> tuple:
+        return 500, {"message": "internal server error"}
+
+    def handle(self, method: str, path: str, params: dict) -> tuple:
+        with self._exchange.lock:
+            try:
+                return self.route(method, path, params)
+            except MockError as e:
+                return self.error(e)
+            except (KeyError, ValueError) as e:
+                return self.error(MockError("invalid", f"invalid request: {e}"))
+
+
+class CoinbaseDialect(Dialect):
+    def symbol(self, product: MockProduct) -> str:
+        return product.trading + "-" + product.buying
+
+    def error(self, error: MockError) -> tuple:
+        status = 404 if error.kind in ["order", "symbol"] else 400
+        messages = {"order": "NotFound", "symbol": "NotFound", "funds": "Insufficient funds"}
+        return status, {"message": messages.get(error.kind, str(error))}
+
+    def rate_limited(self) -> tuple:
+        return 429, {"message": "Rate limit exceeded"}
+
+    def failure(self) -> tuple:
+        return 500, {"message": "Internal server error"}
+
+    def _order(self, order: MockOrder) -> dict:
+        product = order.product
+        done = not order.open
+        result = {"id": order.order_id,
+                  "price": _number(order.price, product.price_decimals),
+                  "size": _number(order.amount, product.amount_decimals),
+                  "product_id": self.symbol(product),
+                  "side": order.side,
+                  "type": "limit",
+                  "time_in_force": "GTC",
+                  "post_only": False,
+                  "created_at": _iso(order.created),
+                  "fill_fees": "0.0000000000000000",
+                  "filled_size": _number(order.filled, product.amount_decimals),
+                  "executed_value": _number(order.value, 16),
+                  "status": "done" if done else "open",
+                  "settled": done}
+        if done:
+            result["done_at"] = _iso(order.updated)
+            result["done_reason"] = "filled" if order.status == "filled" else "canceled"
+        return result
+
+    def route(self, method: str, path: str, params: dict) -> tuple:
+        parts = path.strip("/").split("/")
+        if method == "GET" and parts == ["products"]:
+            return 200, [{"id": symbol,
+                          "base_currency": market.product.trading,
+                          "quote_currency": market.product.buying,
+                          "base_min_size": _number(market.product.min_amount, market.product.amount_decimals),
+                          "base_increment": _number(10 ** -market.product.amount_decimals,
+                                                    market.product.amount_decimals),
+                          "quote_increment": _number(10 ** -market.product.price_decimals,
+                                                     market.product.price_decimals),
+                          "status": "online"} for symbol, market in self._symbols.items()]
+        elif method == "GET" and len(parts) == 3 and parts[0] == "products" and parts[2] == "ticker":
+            market = self.market(parts[1])
+            self._exchange.step(market)
+            decimals = market.product.price_decimals
+            return 200, {"trade_id": market.trade_id,
+                         "price": _number(market.last, decimals),
+                         "size": "0.01000000",
+                         "bid": _number(market.bid, decimals),
+                         "ask": _number(market.ask, decimals),
+                         "volume": _number(market.volume, market.product.amount_decimals),
+                         "time": _iso(time.time())}
+        elif method == "GET" and len(parts) == 3 and parts[0] == "products" and parts[2] == "book":
+            market = self.market(parts[1])
+            self._exchange.step(market)
+            product = market.product
+            bids, asks = market.book(1 if params.get("level", "1") == "1" else 50)
+            return 200, {"sequence": market.trade_id,
+                         "bids": [[_number(price, product.price_decimals), _number(size, product.amount_decimals), 1]
+                                  for price, size in bids],
+                         "asks": [[_number(price, product.price_decimals), _number(size, product.amount_decimals), 1]
+                                  for price, size in asks]}
+        elif method == "POST" and parts == ["orders"]:
+            market = self.market(params["product_id"])
+            order = self._exchange.place(str(uuid.uuid4()), market.product.trading, market.product.buying,
+                                         params["side"], float(params["price"]), float(params["size"]))
+            return 200, self._order(order)
+        elif method == "GET" and parts == ["orders"]:
+            # newest first, canceled orders are gone from Coinbase Pro
+            status = params.get("status", "open")
+            orders = [order for order in reversed(self._exchange.orders()) if order.status != "canceled" and
+                      (status == "all" or (status == "done") != order.open)]
+            return 200, [self._order(order) for order in orders[:int(params.get("limit", 100))]]
+        elif method == "GET" and len(parts) == 2 and parts[0] == "orders":
+            order = self._exchange.order(parts[1])
+            if order.status == "canceled":
+                # canceled orders are gone from Coinbase Pro
+                raise MockError("order", "unknown order")
+            return 200, self._order(order)
+        elif method == "DELETE" and len(parts) == 2 and parts[0] == "orders":
+            self._exchange.cancel(parts[1])
+            return 200, [parts[1]]
+        elif method == "GET" and parts[0] == "accounts":
+            return 200, [{"id": str(uuid.uuid5(uuid.NAMESPACE_OID, currency)),
+                          "currency": currency,
+                          "balance": _number(balance, 16),
+                          "available": _number(balance - hold, 16),
+                          "hold": _number(hold, 16),
+                          "profile_id": "mock"} for currency, (balance, hold) in self._exchange.balances().items()]
+        return super().route(method, path, params)
+
+
+class BinanceDialect(Dialect):
+    json_body = False
+    _statuses = {"open": "NEW", "filled": "FILLED", "canceled": "CANCELED"}
+
+    def error(self, error: MockError) -> tuple:
+        errors = {"symbol": (-1121, "Invalid symbol."),
+                  "order": (-2013, "Order does not exist."),
+                  "funds": (-2010, "Account has insufficient balance for requested action.")}
+        code, message = errors.get(error.kind, (-1102, str(error)))
+        return 400, {"code": code, "msg": message}
+
+    def rate_limited(self) -> tuple:
+        return 429, {"code": -1003, "msg": "Too much request weight used; please use the websocket for live updates "
+                                           "to avoid polling the API."}
+
+    def failure(self) -> tuple:
+        return 500, {"code": -1001, "msg": "Internal error; unable to process your request. Please try again."}
+
+    def _order(self, order: MockOrder) -> dict:
+        product = order.product
+        return {"symbol": self.symbol(product),
+                "orderId": order.order_id,
+                "orderListId": -1,
+                "clientOrderId": f"mock{order.order_id}",
+                "price": _number(order.price, product.price_decimals),
+                "origQty": _number(order.amount, product.amount_decimals),
+                "executedQty": _number(order.filled, product.amount_decimals),
+                "cummulativeQuoteQty": _number(order.value, product.price_decimals),
+                "status": self._statuses[order.status],
+                "timeInForce": "GTC",
+                "type": "LIMIT",
+                "side": order.side.upper(),
+                "time": int(order.created * 1000),
+                "updateTime": int(order.updated * 1000),
+                "isWorking": True}
+
+    def _ticker(self, symbol: str, market: MockMarket) -> dict:
+        decimals = market.product.price_decimals
+        return {"symbol": symbol,
+                "bidPrice": _number(market.bid, decimals),
+                "askPrice": _number(market.ask, decimals),
+                "lastPrice": _number(market.last, decimals),
+                "volume": _number(market.volume, market.product.amount_decimals),
+                "closeTime": int(time.time() * 1000)}
+
+    def route(self, method: str, path: str, params: dict) -> tuple:
+        if method == "GET" and path == "/api/v1/ping":
+            return 200, {}
+        elif method == "GET" and path == "/api/v1/exchangeInfo":
+            return 200, {"timezone": "UTC",
+                         "serverTime": int(time.time() * 1000),
+                         "rateLimits": [],
+                         "exchangeFilters": [],
+                         "symbols": [{"symbol": symbol,
+                                      "status": "TRADING",
+                                      "baseAsset": market.product.trading,
+                                      "quoteAsset": market.product.buying,
+                                      "filters": [
+                                          {"filterType": "PRICE_FILTER",
+                                           "minPrice": _number(10 ** -market.product.price_decimals, 8),
+                                           "maxPrice": "1000000.00000000",
+                                           "tickSize": _number(10 ** -market.product.price_decimals, 8)},
+                                          {"filterType": "LOT_SIZE",
+                                           "minQty": _number(market.product.min_amount, 8),
+                                           "maxQty": "9000.00000000",
+                                           "stepSize": _number(10 ** -market.product.amount_decimals, 8)},
+                                          {"filterType": "MIN_NOTIONAL",
+                                           "minNotional": _number(10 ** -market.product.price_decimals, 8)}]}
+                                     for symbol, market in self._symbols.items()]}
+        elif method == "GET" and path == "/api/v1/ticker/24hr":
+            if "symbol" in params:
+                market = self.market(params["symbol"])
+                self._exchange.step(market)
+                return 200, self._ticker(params["symbol"], market)
+            return 200, [self._ticker(symbol, market) for symbol, market in self._symbols.items()]
+        elif method == "GET" and path == "/api/v1/ticker/allBookTickers":
+            return 200, [{"symbol": symbol,
+                          "bidPrice": _number(market.bid, market.product.price_decimals),
+                          "bidQty": "1.00000000",
+                          "askPrice": _number(market.ask, market.product.price_decimals),
+                          "askQty": "1.00000000"} for symbol, market in self._symbols.items()]
+        elif method == "GET" and path == "/api/v1/ticker/allPrices":
+            return 200, [{"symbol": symbol, "price": _number(market.last, market.product.price_decimals)}
+                         for symbol, market in self._symbols.items()]
+        elif method == "GET" and path == "/api/v1/depth":
+            market = self.market(params["symbol"])
+            self._exchange.step(market)
+            bids, asks = market.book(int(params.get("limit", 100)))
+            return 200, {"lastUpdateId": market.trade_id,
+                         "bids": [[_number(price, 8), _number(size, 8)] for price, size in bids],
+                         "asks": [[_number(price, 8), _number(size, 8)] for price, size in asks]}
+        elif path == "/api/v3/order":
+            if method == "POST":
+                market = self.market(params["symbol"])
+                order = self._exchange.place(self._exchange.next_id(), market.product.trading,
+                                             market.product.buying, params["side"].lower(), float(params["price"]),
+                                             float(params["quantity"]))
+                return 200, dict(self._order(order), transactTime=int(order.created * 1000), fills=[])
+            order = self._exchange.order(int(params["orderId"]))
+            if self.symbol(order.product) != params.get("symbol"):
+                raise MockError("order", "unknown order")
+            if method == "DELETE":
+                self._exchange.cancel(order.order_id)
+            return 200, self._order(order)
+        elif method == "GET" and path == "/api/v3/openOrders":
+            return 200, [self._order(order) for order in self._exchange.orders(open_only=True)
+                         if "symbol" not in params or self.symbol(order.product) == params["symbol"]]
+        elif method == "GET" and path == "/api/v3/allOrders":
+            market = self.market(params["symbol"])
+            first = int(params.get("orderId", 0))
+            return 200, [self._order(order) for order in
+                         self._exchange.orders(market.product.trading, market.product.buying)
+                         if order.order_id >= first]
+        elif method == "GET" and path == "/api/v3/account":
+            return 200, {"makerCommission": 10,
+                         "takerCommission": 10,
+                         "canTrade": True,
+                         "updateTime": int(time.time() * 1000),
+                         "balances": [{"asset": currency,
+                                       "free": _number(balance - hold, 8),
+                                       "locked": _number(hold, 8)}
+                                      for currency, (balance, hold) in self._exchange.balances().items()]}
+        elif path == "/api/v1/userDataStream":
+            if method == "POST":
+                return 200, {"listenKey": uuid.uuid4().hex}
+            return 200, {}
+        return super().route(method, path, params)
+
+
+class KrakenDialect(Dialect):
+    json_body = False
+    _statuses = {"open": "open", "filled": "closed", "canceled": "canceled"}
+
+    @staticmethod
+    def asset(currency: str) -> str:
+        if currency == "BTC":
+            return "XXBT"
+        elif len(currency) == 3:
+            return ("Z" if currency in _FIAT else "X") + currency
+        return currency
+
+    @staticmethod
+    def altname(currency: str) -> str:
+        return "XBT" if currency == "BTC" else currency
+
+    def __init__(self, exchange: MockExchange) -> None:
+        super().__init__(exchange)
+        # pairs can be addressed by their alternative name as well
+        self._symbols.update({self.altname(market.product.trading) + self.altname(market.product.buying): market
+                              for market in exchange.markets})
+
+    def symbol(self, product: MockProduct) -> str:
+        return self.asset(product.trading) + self.asset(product.buying)
+
+    def error(self, error: MockError) -> tuple:
+        errors = {"symbol": "EQuery:Unknown asset pair",
+                  "order": "EOrder:Unknown order",
+                  "funds": "EOrder:Insufficient funds"}
+        return 200, {"error": [errors.get(error.kind, "EGeneral:Invalid arguments")]}
+
+    def rate_limited(self) -> tuple:
+        # Kraken reports exceeding its limits in the body
+        return 200, {"error": ["EAPI:Rate limit exceeded"]}
+
+    def failure(self) -> tuple:
+        return 200, {"error": ["EService:Unavailable"]}
+
+    def _order(self, order: MockOrder) -> dict:
+        product = order.product
+        pair = self.altname(product.trading) + self.altname(product.buying)
+        price = _number(order.price, product.price_decimals)
+        amount = _number(order.amount, product.amount_decimals)
+        result = {"refid": None,
+                  "userref": 0,
+                  "status": self._statuses[order.status],
+                  "opentm": order.created,
+                  "starttm": 0,
+                  "expiretm": 0,
+                  "descr": {"pair": pair,
+                            "type": order.side,
+                            "ordertype": "limit",
+                            "price": price,
+                            "price2": "0",
+                            "leverage": "none",
+                            "order": f"{order.side} {amount} {pair} @ limit {price}",
+                            "close": ""},
+                  "vol": amount,
+                  "vol_exec": _number(order.filled, product.amount_decimals),
+                  "cost": _number(order.value, product.price_decimals),
+                  "fee": "0.00000",
+                  "price": _number(order.average_price, product.price_decimals),
+                  "misc": "",
+                  "oflags": "fciq"}
+        if not order.open:
+            result["closetm"] = order.updated
+        return result
+
+    def _txid(self, order_id: int) -> str:
+        return f"O{order_id:05d}-MOCKX-{order_id:06d}"
+
+    def route(self, method: str, path: str, params: dict) -> tuple:
+        if method == "GET" and path == "/0/public/AssetPairs":
+            return 200, {"error": [], "result": {
+                self.symbol(market.product): {"altname": self.altname(market.product.trading) +
+                                                         self.altname(market.product.buying),
+                                              "wsname": self.altname(market.product.trading) + "/" +
+                                                        self.altname(market.product.buying),
+                                              "base": self.asset(market.product.trading),
+                                              "quote": self.asset(market.product.buying),
+                                              "pair_decimals": market.product.price_decimals,
+                                              "lot_decimals": market.product.amount_decimals,
+                                              "ordermin": _number(market.product.min_amount, 8)}
+                for market in self._exchange.markets}}
+        elif method == "GET" and path == "/0/public/Ticker":
+            result = {}
+            for pair in params["pair"].split(","):
+                market = self.market(pair)
+                self._exchange.step(market)
+                decimals = market.product.price_decimals
+                result[self.symbol(market.product)] = {
+                    "a": [_number(market.ask, decimals), "1", "1.000"],
+                    "b": [_number(market.bid, decimals), "1", "1.000"],
+                    "c": [_number(market.last, decimals), "0.01000000"],
+                    "v": [_number(market.volume, 8), _number(market.volume, 8)]}
+            return 200, {"error": [], "result": result}
+        elif method == "GET" and path == "/0/public/Depth":
+            market = self.market(params["pair"])
+            self._exchange.step(market)
+            bids, asks = market.book(int(params.get("count", 100)))
+            decimals = market.product.price_decimals
+            timestamp = f"{time.time():.3f}"
+            return 200, {"error": [], "result": {self.symbol(market.product): {
+                "asks": [[_number(price, decimals), _number(size, 8), timestamp] for price, size in asks],
+                "bids": [[_number(price, decimals), _number(size, 8), timestamp] for price, size in bids]}}}
+        elif method == "POST" and path == "/0/private/AddOrder":
+            market = self.market(params["pair"])
+            order_id = self._exchange.next_id()
+            order = self._exchange.place(self._txid(order_id), market.product.trading, market.product.buying,
+                                         params["type"], float(params["price"]), float(params["volume"]))
+            return 200, {"error": [], "result": {"descr": {"order": self._order(order)["descr"]["order"]},
+                                                 "txid": [order.order_id]}}
+        elif method == "POST" and path == "/0/private/QueryOrders":
+            return 200, {"error": [], "result": {txid: self._order(self._exchange.order(txid))
+                                                 for txid in params["txid"].split(",")}}
+        elif method == "POST" and path == "/0/private/CancelOrder":
+            self._exchange.cancel(params["txid"])
+            return 200, {"error": [], "result": {"count": 1}}
+        elif method == "POST" and path == "/0/private/OpenOrders":
+            return 200, {"error": [], "result": {"open": {order.order_id: self._order(order)
+                                                          for order in self._exchange.orders(open_only=True)}}}
+        elif method == "POST" and path == "/0/private/Balance":
+            return 200, {"error": [], "result": {self.asset(currency): _number(balance, 10)
+                                                 for currency, (balance, hold) in self._exchange.balances().items()}}
+        elif method == "POST" and path == "/0/private/GetWebSocketsToken":
+            return 200, {"error": [], "result": {"token": uuid.uuid4().hex, "expires": 900}}
+        return 200, {"error": ["EGeneral:Unknown method"]}
+
+
+class BitfinexDialect(Dialect):
+    def error(self, error: MockError) -> tuple:
+        if error.kind == "symbol":
+            return 500, ["error", 10020, "symbol: invalid"]
+        return 500, ["error", 10001, str(error)]
+
+    def rate_limited(self) -> tuple:
+        return 429, ["error", 11010, "ratelimit: error"]
+
+    def failure(self) -> tuple:
+        return 500, ["error", 10000, "Internal error"]
+
+    def _order(self, order: MockOrder) -> list:
+        sign = 1 if order.side == "buy" else -1
+        if order.status == "filled":
+            status = f"EXECUTED @ {order.average_price}({sign * order.filled})"
+        elif order.status == "canceled":
+            status = "CANCELED"
+        else:
+            status = "ACTIVE"
+        return [order.order_id, None, order.order_id, "t" + self.symbol(order.product), int(order.created * 1000),
+                int(order.updated * 1000), sign * (order.amount - order.filled), sign * order.amount,
+                "EXCHANGE LIMIT", None, None, None, 0, status, None, None, order.price, order.average_price, 0, 0,
+                None, None, None, 0, 0, None, None, None, "API>BFX", None, None, {}]
+
+    def _notification(self, notify_type: str, info, text: str, success: bool = True) -> list:
+        return [int(time.time() * 1000), notify_type, None, None, info, None, "SUCCESS" if success else "ERROR", text]
+
+    def _ticker(self, market: MockMarket) -> list:
+        return [market.bid, 1.0, market.ask, 1.0, 0.0, 0.0, market.last, market.volume, market.last, market.last]
+
+    def route(self, method: str, path: str, params: dict) -> tuple:
+        parts = path.strip("/").split("/")
+        if method == "GET" and parts == ["v1", "symbols_details"]:
+            return 200, [{"pair": symbol.lower(),
+                          "price_precision": 5,
+                          "initial_margin": "30.0",
+                          "minimum_margin": "15.0",
+                          "maximum_order_size": "2000.0",
+                          "minimum_order_size": _number(market.product.min_amount, 8),
+                          "expiration": "NA",
+                          "margin": False} for symbol, market in self._symbols.items()]
+        elif method == "GET" and len(parts) == 3 and parts[:2] == ["v2", "ticker"]:
+            market = self.market(parts[2][1:])
+            self._exchange.step(market)
+            return 200, self._ticker(market)
+        elif method == "GET" and parts == ["v2", "tickers"]:
+            result = []
+            for symbol in params["symbols"].split(","):
+                market = self.market(symbol[1:])
+                self._exchange.step(market)
+                result.append([symbol] + self._ticker(market))
+            return 200, result
+        elif method == "GET" and len(parts) == 4 and parts[:2] == ["v2", "book"]:
+            market = self.market(parts[2][1:])
+            self._exchange.step(market)
+            bids, asks = market.book(int(params.get("len", 25)))
+            return 200, [[price, 1, size] for price, size in bids] + [[price, 1, -size] for price, size in asks]
+        elif method == "POST" and parts == ["v2", "auth", "w", "order", "submit"]:
+            market = self.market(params["symbol"][1:])
+            amount = float(params["amount"])
+            order = self._exchange.place(self._exchange.next_id(), market.product.trading, market.product.buying,
+                                         "buy" if amount > 0 else "sell", float(params["price"]), abs(amount))
+            return 200, self._notification("on-req", [self._order(order)], "Submitting 1 orders.")
+        elif method == "POST" and parts == ["v2", "auth", "w", "order", "update"]:
+            try:
+                order = self._exchange.order(int(params["id"]))
+            except MockError:
+                return 200, self._notification("ou-req", None, "Order not found.", False)
+            return 200, self._notification("ou-req", self._order(order), "Submitting update to exchange limit order.")
+        elif method == "POST" and parts == ["v2", "auth", "w", "order", "cancel"]:
+            order = self._exchange.cancel(int(params["id"]))
+            return 200, self._notification("oc-req", self._order(order),
+                                           f"Submitted for cancellation; waiting for confirmation (ID: "
+                                           f"{order.order_id}).")
+        elif method == "POST" and parts == ["v2", "auth", "r", "wallets"]:
+            return 200, [["exchange", currency, balance, 0, balance - hold, None, None]
+                         for currency, (balance, hold) in self._exchange.balances().items()]
+        elif method == "POST" and len(parts) in [5, 6] and parts[:4] == ["v2", "auth", "r", "orders"]:
+            market = self.market(parts[4][1:])
+            orders = self._exchange.orders(market.product.trading, market.product.buying)
+            if len(parts) == 5:
+                return 200, [self._order(order) for order in orders if order.open]
+            closed = sorted([order for order in orders if not order.open], key=lambda order: -order.updated)
+            return 200, [self._order(order) for order in closed[:int(params.get("limit", 25))]]
+        return 404, ["error", 10020, "not found"]
+
+
+_DIALECTS = {"coinbase": CoinbaseDialect, "binance": BinanceDialect, "kraken": KrakenDialect,
+             "bitfinex": BitfinexDialect}
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive, like the exchanges do
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _respond(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _handle(self) -> None:
+        url = urlsplit(self.path)
+        exchange, _, path = url.path.lstrip("/").partition("/")
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length > 0 else b""
+
+        dialect = self.server.dialects.get(exchange)
+        if dialect is None or self.command == "HEAD":
+            self._respond(404 if dialect is None else 200, None)
+            return
+
+        params = dict(parse_qsl(url.query))
+        if body:
+            if dialect.json_body:
+                params.update(json.loads(body))
+            else:
+                params.update(parse_qsl(body.decode()))
+        self._respond(*self.server.dispatch(exchange, dialect, self.command, "/" + path, params))
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple, mock: "MockExchangeServer") -> None:
+        super().__init__(address, MockRequestHandler)
+        self.dialects = mock.dialects
+        self.dispatch = mock.dispatch
+
+
+class MockExchangeServer:
+    def __init__(self, products: list = None, balances: dict = None, seed: int = 0, host: str = "127.0.0.1",
+                 port: int = 0) -> None:
+        # one server for all four exchanges, each under its own path: http://host:port/<exchange>
+        products = products if products is not None else DEFAULT_PRODUCTS
+        balances = balances if balances is not None else DEFAULT_BALANCES
+        self.dialects = {name: dialect(MockExchange(products, balances, seed + i))
+                         for i, (name, dialect) in enumerate(_DIALECTS.items())}
+        self._address = (host, port)
+        self._server = None
+        self._lock = Lock()
+        self._rng = random.Random(seed)
+        self._latency = 0.0
+        self._jitter = 0.0
+        self._error_rate = 0.0
+        self._rate_limit_rate = 0.0
+        # requests per second per exchange, beyond that requests get a rate limit response
+        self._rate_limit = None
+        self._allowance = {}
+        self._statistics = {name: {"requests": 0, "errors": 0, "rate_limited": 0} for name in self.dialects}
+
+    def configure(self, latency: float = None, jitter: float = None, error_rate: float = None,
+                  rate_limit_rate: float = None, rate_limit: float = None) -> None:
+        # latency is added to every response, jitter is the mean of an exponentially distributed extra delay;
+        # error_rate and rate_limit_rate are the fractions of requests failing with an error or rate limit response
+        with self._lock:
+            if latency is not None:
+                self._latency = latency
+            if jitter is not None:
+                self._jitter = jitter
+            if error_rate is not None:
+                self._error_rate = error_rate
+            if rate_limit_rate is not None:
+                self._rate_limit_rate = rate_limit_rate
+            if rate_limit is not None:
+                self._rate_limit = rate_limit if rate_limit > 0 else None
+                self._allowance.clear()
+
+    @property
+    def statistics(self) -> dict:
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._statistics.items()}
+
+    def exchange(self, name: str) -> MockExchange:
+        return self.dialects[name]._exchange
+
+    def _throttled(self, exchange: str) -> bool:
+        # token bucket holding one second worth of requests
+        now = time.monotonic()
+        tokens, updated = self._allowance.get(exchange, (self._rate_limit, now))
+        tokens = min(self._rate_limit, tokens + (now - updated) * self._rate_limit)
+        if tokens < 1:
+            self._allowance[exchange] = (tokens, now)
+            return True
+        self._allowance[exchange] = (tokens - 1, now)
+        return False
+
+    def dispatch(self, exchange: str, dialect: Dialect, method: str, path: str, params: dict) -> tuple:
+        with self._lock:
+            statistics = self._statistics[exchange]
+            statistics["requests"] += 1
+            delay = self._latency + (self._rng.expovariate(1 / self._jitter) if self._jitter > 0 else 0.0)
+            if (self._rate_limit is not None and self._throttled(exchange)) or \
+                    self._rng.random() < self._rate_limit_rate:
+                statistics["rate_limited"] += 1
+                response = dialect.rate_limited()
+            elif self._rng.random() < self._error_rate:
+                statistics["errors"] += 1
+                response = dialect.failure()
+            else:
+                response = None
+
+        if delay > 0:
+            time.sleep(delay)
+        return response if response is not None else dialect.handle(method, path, params)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def credentials(self) -> dict:
+        # credentials for all exchanges pointing at this server; keys are not checked, but the SDKs expect base64
+        # encoded secrets for Coinbase Pro and Kraken
+        secret = base64.b64encode(b"mock secret").decode()
+        return {"coinbase": {"api_key": "mock", "api_secret": secret, "api_pass": "mock",
+                             "api_url": f"{self.url}/coinbase"},
+                "binance": {"api_key": "mock", "api_secret": "mock", "api_url": f"{self.url}/binance"},
+                "kraken": {"api_key": "mock", "api_secret": secret, "api_url": f"{self.url}/kraken"},
+                "bitfinex": {"api_key": "mock", "api_secret": "mock", "api_url": f"{self.url}/bitfinex"}}
+
+    def start(self) -> "MockExchangeServer":
+        self._server = _MockHTTPServer(self._address, self)
+        Thread(target=self._server.serve_forever, name="mockserver", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockExchangeServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+class MockStreamServer:
+    # a local stand-in for the Coinbase Pro websocket feed, ws://host:port: every interval seconds a step of the
+    # subscribed markets of a MockExchangeServer as ticker messages (None sends only what is broadcast); drop() cuts
+    # the clients off, stop() refuses them until started again, on the same port
+    def __init__(self, server: MockExchangeServer, interval: float = 0.01, host: str = "127.0.0.1",
+                 port: int = 0) -> None:
+        self._exchange = server.exchange("coinbase")
+        self._dialect = server.dialects["coinbase"]
+        self._interval = interval
+        self._address = (host, port)
+        self._loop = None
+        self._thread = None
+        self._server = None
+        self._connections = set()
+        # subscribe messages received, over all connections
+        self.subscriptions = []
+        self.accepted = 0
+        self.sent = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self._address
+        return f"ws://{host}:{port}"
+
+    def _tickers(self, products: set) -> list:
+        messages = []
+        with self._exchange.lock:
+            for market in self._exchange.markets:
+                symbol = self._dialect.symbol(market.product)
+                if symbol not in products:
+                    continue
+                self._exchange.step(market)
+                decimals = market.product.price_decimals
+                messages.append({"type": "ticker", "product_id": symbol, "sequence": market.trade_id,
+                                 "price": _number(market.last, decimals),
+                                 "best_bid": _number(market.bid, decimals), "best_ask": _number(market.ask, decimals),
+                                 "last_size": _number(market.product.min_amount, market.product.amount_decimals),
+                                 "time": _iso(time.time())})
+        return messages
+
+    async def _receive(self, websocket, products: set) -> None:
+        async for message in websocket:
+            message = json.loads(message)
+            if message.get("type") == "subscribe":
+                self.subscriptions.append(message)
+                products.update(message.get("product_ids", []))
+                await websocket.send(json.dumps({"type": "subscriptions", "channels": message.get("channels", [])}))
+
+    async def _handle(self, websocket, *args) -> None:
+        # websockets before 10.1 pass the path as well
+        self.accepted += 1
+        self._connections.add(websocket)
+        products = set()
+        receiver = asyncio.ensure_future(self._receive(websocket, products))
+        try:
+            while not receiver.done():
+                if self._interval is None:
+                    await asyncio.wait([receiver])
+                    break
+                for message in self._tickers(products):
+                    await websocket.send(json.dumps(message))
+                    self.sent += 1
+                await asyncio.sleep(self._interval)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            receiver.cancel()
+            self._connections.discard(websocket)
+
+    async def _serve(self) -> None:
+        self._server = await websockets.serve(self._handle, *self._address)
+        self._address = self._server.sockets[0].getsockname()[:2]
+
+    async def _close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _drop(self) -> None:
+        await asyncio.gather(*[websocket.close() for websocket in list(self._connections)])
+
+    async def _broadcast(self, message: dict) -> None:
+        text = json.dumps(message)
+        for websocket in list(self._connections):
+            await websocket.send(text)
+            self.sent += 1
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def broadcast(self, message: dict) -> None:
+        # sends a message to all connected clients, eg. the user channel's match and done messages
+        self._run(self._broadcast(message))
+
+    def drop(self) -> None:
+        self._run(self._drop())
+
+    def start(self) -> "MockStreamServer":
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, name="mockstream", daemon=True)
+        self._thread.start()
+        self._run(self._serve())
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._run(self._close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+
+    def __enter__(self) -> "MockStreamServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -1,79 +1,105 @@
+from datetime import datetime, timedelta
+
 from cryptrade.observers import Observer
+from cryptrade.rolling import RollingWindow
+from cryptrade.history import TickHistory, BalanceHistory
 from cryptrade.exchange_api import Ticker, Account, Order
 
 
 class TickerMonitor(Observer):
-    def __init__(self, ticker: Ticker, ticker_name: str, time_window: int) -> None:
+    def __init__(self, ticker: Ticker, ticker_name: str, time_window: int, capacity: int = 65536) -> None:
         super().__init__(ticker)
         self._name = ticker_name
         self._time_window = time_window
-        self._high = 0
-        self._low = 0
-        self._average = 0
-        self._ticker_data = []
+        # the window keeps its ticks in the history, capacity bounds both
+        self._window = RollingWindow(time_window, TickHistory(capacity))
+        # the volume traded between two notifications, only the streaming tickers see trades
+        self._volume = ticker.volume
 
     async def notify(self, ticker: Ticker) -> None:
-        # remove entries older than time_window
-        while len(self._ticker_data) > 0 and \
-                (ticker.timestamp - self._ticker_data[0]["time"]).total_seconds() > self._time_window:
-            self._ticker_data.pop(0)
-
         if ticker.timestamp is not None:
-            self._ticker_data.append({"time": ticker.timestamp,
-                                      "ask": ticker.ask,
-                                      "bid": ticker.bid,
-                                      "price": ticker.price})
-            prices = [data["price"] for data in self._ticker_data]
-            self._high = max(prices)
-            self._low = min(prices)
-            self._average = sum(prices) / len(prices)
+            volume, self._volume = max(ticker.volume - self._volume, 0.0), ticker.volume
+            self._window.add(ticker.timestamp.timestamp(), ticker.price, ticker.bid, ticker.ask, volume)
+
+    @property
+    def history(self) -> TickHistory:
+        return self._window.history
 
     @property
     def high(self) -> float:
-        return self._high
+        return self._window.high
 
     @property
     def low(self) -> float:
-        return self._low
+        return self._window.low
 
     @property
     def average(self) -> float:
-        return self._average
+        return self._window.average
+
+    @property
+    def vwap(self) -> float:
+        # weighted by the volume traded since the tick before, 0.0 without trades
+        return self._window.vwap
+
+    @property
+    def std_dev(self) -> float:
+        return self._window.std_dev
+
+    @property
+    def average_spread(self) -> float:
+        return self._window.average_spread
+
+    @property
+    def max_spread(self) -> float:
+        return self._window.max_spread
 
     def __str__(self) -> str:
-        if len(self._ticker_data) == 0:
+        if len(self._window) == 0:
             return ""
         else:
-            oldest_time = self._ticker_data[0]["time"]
-            newest_time = self._ticker_data[len(self._ticker_data) - 1]["time"]
-            time_period = newest_time - oldest_time
+            time_period = timedelta(seconds=self._window.newest - self._window.oldest)
             return (f"TICKER {self._name}\n"
                     f"Period : {time_period}\n"
-                    f"High   : {self._high:8.4f}\n"
-                    f"Low    : {self._low:8.4f}\n"
-                    f"Average: {self._average:8.4f}\n")
+                    f"High   : {self.high:8.4f}\n"
+                    f"Low    : {self.low:8.4f}\n"
+                    f"Average: {self.average:8.4f}\n"
+                    f"Std Dev: {self.std_dev:8.4f}\n"
+                    f"Spread : {self.average_spread:8.4f}\n")
 
 
 class AccountMonitor(Observer):
-    def __init__(self, account: Account, account_name: str) -> None:
+    def __init__(self, account: Account, account_name: str, retention: int = None, max_bytes: int = 1 << 20) -> None:
+        # retention: seconds of balance history to keep, max_bytes: the memory it may take
         super().__init__(account)
         self._name = account_name
-        self._account_data = []
+        self._account_data = BalanceHistory(retention, max_bytes)
 
     async def notify(self, account: Account) -> None:
         if account.timestamp is not None:
-            self._account_data.append({"time": account.timestamp, "balance": account.balance})
+            timestamp = int(account.timestamp.timestamp()) * 1000000000 + account.timestamp.microsecond * 1000
+            self._account_data.append(timestamp, account.balance)
+
+    @property
+    def history(self) -> BalanceHistory:
+        return self._account_data
+
+    def balance(self, time: datetime = None) -> dict:
+        # the balance as of the given time, the latest without one
+        if time is None:
+            return self._account_data.balance()
+        return self._account_data.balance(int(time.timestamp()) * 1000000000 + time.microsecond * 1000)
 
     def __str__(self) -> str:
-        if len(self._account_data) == 0:
+        if self._account_data.newest is None:
             return ""
         else:
-            oldest_time = self._account_data[0]["time"]
-            newest_time = self._account_data[len(self._account_data) - 1]["time"]
+            oldest_time = datetime.fromtimestamp(self._account_data.oldest / 1e9)
+            newest_time = datetime.fromtimestamp(self._account_data.newest / 1e9)
             time_period = newest_time - oldest_time
 
-            oldest_balance = self._account_data[0]["balance"]
-            newest_balance = self._account_data[len(self._account_data) - 1]["balance"]
+            oldest_balance = self._account_data.balance(self._account_data.oldest)
+            newest_balance = self._account_data.balance()
 
             balance_string = ""
             for currency, balance in newest_balance.items():
@@ -1,25 +1,141 @@
 import asyncio
 
+# overflow policies for observers that can't keep up
+CONFLATE = 0
+DROP_OLDEST = 1
+BLOCK = 2
+
+
+class Subscription:
+    def __init__(self, observer: "Observer", policy: int = CONFLATE, maxsize: int = 1) -> None:
+        self._observer = observer
+        self._policy = policy
+        # a conflating queue only holds the latest pending event
+        self._maxsize = 1 if policy == CONFLATE else max(maxsize, 1)
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._delivered = 0
+        self._dropped = 0
+        self._errors = 0
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(self._maxsize)
+            self._task = loop.create_task(self._consume())
+
+    async def put(self, observable: "Observable") -> None:
+        self._start()
+        if self._queue.full():
+            if self._policy == BLOCK:
+                await self._queue.put(observable)
+                return
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self._dropped += 1
+        self._queue.put_nowait(observable)
+
+    async def _consume(self) -> None:
+        while True:
+            observable = await self._queue.get()
+            try:
+                await self._observer.notify(observable)
+                self._delivered += 1
+            except Exception:
+                # a failing observer should not stop the delivery of later events
+                self._errors += 1
+            finally:
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def observer(self) -> "Observer":
+        return self._observer
+
+    @property
+    def policy(self) -> int:
+        return self._policy
+
+    @property
+    def lag(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def delivered(self) -> int:
+        return self._delivered
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def errors(self) -> int:
+        return self._errors
+
 
 class Observable:
+    # whether the observers get a copy of the state at the time of notify(), without one they read the live
+    # observable and only conflating makes sense
+    _copy_events = True
+
     def __init__(self) -> None:
-        self._observers = []
+        self._observers = {}
 
-    def attach(self, observer: "Observer") -> None:
-        self._observers.append(observer)
+    def attach(self, observer: "Observer", policy: int = CONFLATE, maxsize: int = 1) -> None:
+        if policy != CONFLATE and not self._copy_events:
+            raise ValueError(f"{type(self).__name__} observers can only conflate")
+        self._observers[observer] = Subscription(observer, policy, maxsize)
 
     def detach(self, observer: "Observer") -> None:
-        self._observers.remove(observer)
+        self._observers.pop(observer).cancel()
+
+    def subscription(self, observer: "Observer") -> Subscription:
+        return self._observers[observer]
+
+    @property
+    def subscriptions(self) -> list:
+        return list(self._observers.values())
+
+    def _event(self) -> "Observable":
+        # a shallow copy: queued events stay distinct, and observers don't read what update() changes meanwhile in
+        # the executor; mutable state has to be copied by the subclass
+        if not self._copy_events:
+            return self
+        event = object.__new__(type(self))
+        event.__dict__.update(self.__dict__)
+        event._observers = {}
+        return event
 
     async def notify(self) -> None:
-        if len(self._observers) > 0:
-            await asyncio.wait([observer.notify(self) for observer in self._observers])
+        # queue the event for every observer, each observer is served by its own consumer task
+        if len(self._observers) == 0:
+            return
+        event = self._event()
+        for subscription in list(self._observers.values()):
+            await subscription.put(event)
+
+    async def drain(self) -> None:
+        # wait until all observers have processed the events queued so far
+        await asyncio.gather(*[subscription.join() for subscription in list(self._observers.values())])
 
 
 class Observer:
+    _policy = CONFLATE
+    _maxsize = 1
+
     def __init__(self, observable: Observable) -> None:
         self._observable = observable
-        self._observable.attach(self)
+        self._observable.attach(self, self._policy, self._maxsize)
 
     async def notify(self, observable: Observable) -> None:
         pass
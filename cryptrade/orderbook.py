@@ -0,0 +1,385 @@
+import websockets
+from sortedcontainers import SortedDict
+
+from cryptrade.observers import Observable
+from cryptrade.exceptions import SequenceError
+
+import asyncio
+import json
+import time
+from datetime import datetime
+from itertools import islice
+from math import floor, ceil
+
+
+class BookSide:
+    # the price levels of one side, best first; prices and sizes are kept as integer steps as well, summed in two
+    # Fenwick trees (sizes and notional values) over the price steps for depth and VWAP queries in O(log n)
+    _min_bits = 16
+
+    def __init__(self, descending: bool, price_decimals: int = 8, size_decimals: int = 8) -> None:
+        self._sign = -1 if descending else 1
+        self._price_scale = 10 ** price_decimals
+        self._size_scale = 10 ** size_decimals
+        # key -> (price, size, lots), the key is the price in steps, negative for the bids to get the best first
+        self._levels = SortedDict()
+        # sparse trees over the keys from base on, node -> sum of lots and node -> sum of lots * steps
+        self._lots = {}
+        self._values = {}
+        self._base = 0
+        self._size = 0
+        self._total = 0
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def _key(self, price: float) -> int:
+        return self._sign * round(price * self._price_scale)
+
+    def _cover(self, key: int) -> None:
+        # rebuild the trees over a range twice the width of the keys in use, centered on them
+        keys = [key] + ([self._levels.keys()[0], self._levels.keys()[-1]] if len(self._levels) > 0 else [])
+        low, high = min(keys), max(keys)
+        span = high - low + 1
+        self._size = 1 << max(self._min_bits, (2 * span).bit_length())
+        self._base = low - (self._size - span) // 2
+        self._lots.clear()
+        self._values.clear()
+        self._total = 0
+        for level_key, (_, _, lots) in self._levels.items():
+            self._add(level_key, lots)
+
+    def _add(self, key: int, lots: int) -> None:
+        value = lots * self._sign * key
+        sizes, values, size = self._lots, self._values, self._size
+        node = key - self._base + 1
+        while node <= size:
+            total = sizes.get(node, 0) + lots
+            if total == 0:
+                # all levels below the node are gone, so is their value
+                del sizes[node]
+                values.pop(node, None)
+            else:
+                sizes[node] = total
+                values[node] = values.get(node, 0) + value
+            node += node & -node
+        self._total += lots
+
+    def _prefix(self, key: int) -> int:
+        # lots at the levels up to and including key
+        node = key - self._base + 1
+        if node <= 0:
+            return 0
+        if node >= self._size:
+            return self._total
+        sizes = self._lots
+        total = 0
+        while node > 0:
+            total += sizes.get(node, 0)
+            node -= node & -node
+        return total
+
+    def set(self, price: float, size: float) -> None:
+        # a size of 0 removes the level
+        key = self._key(price)
+        lots = round(size * self._size_scale)
+        level = self._levels.get(key)
+        if lots > 0 and level is None and not 0 <= key - self._base < self._size:
+            self._cover(key)
+        delta = lots - (level[2] if level is not None else 0)
+        if delta != 0:
+            self._add(key, delta)
+        if lots > 0:
+            self._levels[key] = (price, size, lots)
+        elif level is not None:
+            del self._levels[key]
+
+    def clear(self) -> None:
+        self._levels.clear()
+        self._lots.clear()
+        self._values.clear()
+        self._total = 0
+
+    def truncate(self, levels: int) -> list:
+        # drops the worst levels beyond the given number, returns their prices
+        removed = []
+        while len(self._levels) > levels:
+            key, (price, _, lots) = self._levels.popitem(-1)
+            self._add(key, -lots)
+            removed.append(price)
+        return removed
+
+    def best(self) -> tuple:
+        if len(self._levels) == 0:
+            return None
+        price, size, _ = self._levels.peekitem(0)[1]
+        return price, size
+
+    def levels(self, count: int = None) -> list:
+        # (price, size), best first
+        return [(price, size) for price, size, _ in islice(self._levels.values(), count)]
+
+    def depth(self, levels: int = None) -> float:
+        # total size of the best levels
+        if levels is None or levels >= len(self._levels):
+            return self._total / self._size_scale
+        if levels <= 0:
+            return 0.0
+        return self._prefix(self._levels.peekitem(levels - 1)[0]) / self._size_scale
+
+    def size_within(self, price: float) -> float:
+        # total size of the levels at the given price or better
+        steps = price * self._price_scale
+        nearest = round(steps)
+        if abs(steps - nearest) > 1e-9 * max(1.0, abs(steps)):
+            # in between two steps, only the levels on the better side count
+            nearest = floor(steps) if self._sign > 0 else ceil(steps)
+        return self._prefix(self._sign * nearest) / self._size_scale
+
+    def vwap(self, size: float) -> float:
+        # the average price of taking the given size, None if the book is not deep enough
+        lots = round(size * self._size_scale)
+        if lots <= 0 or lots > self._total:
+            return None
+        sizes, values = self._lots, self._values
+        # the last node before the level where the size is reached, with the lots and value up to it
+        node = lots_before = value_before = 0
+        step = self._size
+        while step > 0:
+            next_node = node + step
+            if next_node <= self._size:
+                next_lots = sizes.get(next_node, 0)
+                if lots_before + next_lots < lots:
+                    node = next_node
+                    lots_before += next_lots
+                    value_before += values.get(next_node, 0)
+            step >>= 1
+        steps = self._sign * (self._base + node)
+        return (value_before + (lots - lots_before) * steps) / lots / self._price_scale
+
+
+class OrderBook(Observable):
+    # too large to copy on every update, observers read the latest book
+    _copy_events = False
+    _stream_url = None
+    _reconnect_delay = 1
+    _max_reconnect_delay = 60
+    # a gap in the updates resubscribes sooner than a lost connection reconnects
+    _resync_delay = 0.1
+
+    def __init__(self, auth_client: "TradeClient", product: "Product", depth: int = 100) -> None:
+        super().__init__()
+        self._auth_client = auth_client
+        self._product = product
+        # the number of levels per side to request, exchanges only support some
+        self._levels = depth
+        self._bids = BookSide(True, product.price_decimals)
+        self._asks = BookSide(False, product.price_decimals)
+        self._stream_url = type(self)._stream_url
+        self._connected = False
+        # whether the book holds a snapshot with all updates since applied
+        self._synced = False
+        self._sequence = None
+        self._timestamp = None
+        self._updates = 0
+        self._resyncs = 0
+
+    @property
+    def product(self) -> "Product":
+        return self._product
+
+    @property
+    def stream_url(self) -> str:
+        return self._stream_url
+
+    @stream_url.setter
+    def stream_url(self, url: str) -> None:
+        self._stream_url = url
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    @property
+    def synced(self) -> bool:
+        return self._synced
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    @property
+    def timestamp(self) -> datetime:
+        return self._timestamp
+
+    @property
+    def updates(self) -> int:
+        return self._updates
+
+    @property
+    def resyncs(self) -> int:
+        return self._resyncs
+
+    @property
+    def bids(self) -> BookSide:
+        return self._bids
+
+    @property
+    def asks(self) -> BookSide:
+        return self._asks
+
+    @property
+    def best_bid(self) -> tuple:
+        return self._bids.best()
+
+    @property
+    def best_ask(self) -> tuple:
+        return self._asks.best()
+
+    @property
+    def mid(self) -> float:
+        bid, ask = self._bids.best(), self._asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    @property
+    def spread(self) -> float:
+        bid, ask = self._bids.best(), self._asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def depth(self, levels: int = None) -> tuple:
+        # (bid size, ask size) of the best levels, the whole book without a number of levels
+        return self._bids.depth(levels), self._asks.depth(levels)
+
+    def vwap(self, order_type: str, size: float) -> float:
+        # the average price of a market order of the given size, None if the book is not deep enough
+        return (self._asks if order_type == "buy" else self._bids).vwap(size)
+
+    def imbalance(self, levels: int = None, within: float = None) -> float:
+        # (bid size - ask size) / (bid size + ask size) of the best levels, or of the levels within a relative
+        # distance from the mid price, between -1 (only asks) and 1 (only bids)
+        if within is not None:
+            mid = self.mid
+            if mid is None:
+                return None
+            bid_size, ask_size = self._bids.size_within(mid * (1 - within)), self._asks.size_within(mid * (1 + within))
+        else:
+            bid_size, ask_size = self.depth(levels)
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total > 0 else None
+
+    def _load(self, bids: list, asks: list, sequence: int = None) -> None:
+        # replace the book with a snapshot of (price, size) levels
+        self._bids.clear()
+        self._asks.clear()
+        for price, size in bids:
+            self._bids.set(float(price), float(size))
+        for price, size in asks:
+            self._asks.set(float(price), float(size))
+        self._sequence = sequence
+        self._synced = True
+
+    def _fetch(self) -> tuple:
+        # REST snapshot: bids, asks and the sequence number the stream continues from (if any)
+        return [], [], None
+
+    def snapshot(self) -> None:
+        bids, asks, sequence = self._fetch()
+        self._load(bids, asks, sequence)
+        self._timestamp = datetime.now()
+
+    def update(self) -> None:
+        try:
+            self.snapshot()
+
+        except Exception:
+            # ignore exceptions
+            pass
+
+    def _endpoint(self) -> str:
+        return self._stream_url
+
+    def _subscriptions(self) -> list:
+        # messages to send after (re)connecting
+        return []
+
+    def _apply(self, message) -> bool:
+        # apply a decoded message, returns whether the book changed; raises SequenceError when updates were missed
+        return False
+
+    def feed(self, message) -> bool:
+        try:
+            changed = self._apply(message)
+        except SequenceError:
+            self._resyncs += 1
+            self._synced = False
+            raise
+        if changed:
+            self._updates += 1
+            self._timestamp = datetime.now()
+        return changed
+
+    async def _poll(self) -> None:
+        # only the request runs in the executor, the book changes on the loop where the observers read it
+        try:
+            bids, asks, sequence = await self._auth_client.run_in_executor(self._fetch)
+            self._load(bids, asks, sequence)
+            self._timestamp = datetime.now()
+
+        except Exception:
+            # ignore exceptions
+            pass
+
+    async def _stream(self) -> None:
+        delay = self._reconnect_delay
+        resync_delay = self._resync_delay
+        while True:
+            connected = time.monotonic()
+            try:
+                async with websockets.connect(self._endpoint()) as websocket:
+                    self._synced = False
+                    for subscription in self._subscriptions():
+                        await websocket.send(json.dumps(subscription))
+                    self._connected = True
+                    connected = time.monotonic()
+                    delay = self._reconnect_delay
+
+                    async for message in websocket:
+                        if self.feed(json.loads(message)):
+                            await self.notify()
+
+            except asyncio.CancelledError:
+                raise
+            except SequenceError:
+                # subscribing again gets a new snapshot, back off while the gaps keep coming
+                self._connected = False
+                if time.monotonic() - connected > self._max_reconnect_delay:
+                    resync_delay = self._resync_delay
+                await asyncio.sleep(resync_delay)
+                resync_delay = min(2 * resync_delay, self._max_reconnect_delay)
+                continue
+            except Exception:
+                # connection lost or refused, reconnect after a while
+                pass
+            finally:
+                self._connected = False
+
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, self._max_reconnect_delay)
+
+    async def _fallback(self, interval: int) -> None:
+        # REST snapshots for as long as the socket is down
+        while True:
+            if not self._connected:
+                await self._poll()
+                await self.notify()
+            await asyncio.sleep(interval)
+
+    async def produce(self, interval: int) -> None:
+        if self._stream_url is None:
+            await self._fallback(interval)
+        else:
+            await asyncio.gather(self._stream(), self._fallback(interval))
@@ -0,0 +1,252 @@
+from cryptrade.observers import Observer
+from cryptrade.exchange_api import Ticker
+from cryptrade.history import Ticks
+
+import mmap
+import os
+import re
+import struct
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_MAGIC = b"CTTICKS1"
+# magic, record size, capacity, first sequence, committed records (a hint, the data itself is authoritative)
+_HEADER = struct.Struct("<8sIqqq")
+_HEADER_SIZE = 64
+# time in ns since the epoch, bid, ask, last price; the sequence follows separately and is written last so a record
+# only counts once it is complete
+_BODY = struct.Struct("<qddd")
+_SEQUENCE = struct.Struct("<q")
+_RECORD = struct.Struct("<qdddq")
+_SEQUENCE_OFFSET = _BODY.size
+
+if np is not None:
+    TICK_DTYPE = np.dtype([("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("price", "<f8"), ("sequence", "<i8")])
+else:
+    TICK_DTYPE = None
+
+
+def segment_name(exchange: str, prod_id: str, number: int) -> str:
+    return f"{re.sub('[^A-Za-z0-9]+', '_', exchange)}-{re.sub('[^A-Za-z0-9]+', '_', prod_id)}-{number:06d}.ticks"
+
+
+def segment_paths(directory: str, exchange: str, prod_id: str) -> list:
+    prefix = segment_name(exchange, prod_id, 0)[:-len("000000.ticks")]
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith(prefix) and name.endswith(".ticks") and name[len(prefix):-len(".ticks")].isdigit()]
+
+
+def _read_header(buffer) -> tuple:
+    if len(buffer) < _HEADER_SIZE:
+        raise ValueError("not a tick segment")
+    magic, record_size, capacity, first_sequence, committed = _HEADER.unpack_from(buffer, 0)
+    if magic != _MAGIC or record_size != _RECORD.size:
+        raise ValueError("not a tick segment")
+    return capacity, first_sequence, committed
+
+
+def _sequence(buffer, index: int) -> int:
+    return _SEQUENCE.unpack_from(buffer, _HEADER_SIZE + index * _RECORD.size + _SEQUENCE_OFFSET)[0]
+
+
+def _recover(buffer, capacity: int, first_sequence: int, committed: int) -> int:
+    # number of complete records: the file is pre-sized with zeros and records are appended in sequence, so the
+    # end is the first slot that doesn't hold the expected sequence number
+    low, high = max(0, min(committed, capacity)), capacity
+    while low > 0 and _sequence(buffer, low - 1) != first_sequence + low - 1:
+        # the hint is ahead of what made it to disk
+        low -= 1
+    while low < high:
+        middle = (low + high) // 2
+        if _sequence(buffer, middle) == first_sequence + middle:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class TickRecorder(Observer):
+    def __init__(self, ticker: Ticker, directory: str, exchange: str, capacity: int = 1 << 20) -> None:
+        # one pre-sized, memory-mapped segment of capacity records at a time, continuing where a previous run stopped
+        super().__init__(ticker)
+        if capacity <= 0:
+            raise ValueError("capacity should be positive")
+
+        self._directory = directory
+        self._exchange = exchange
+        self._prod_id = ticker.product.prod_id
+        self._capacity = capacity
+        self._file = None
+        self._map = None
+        self._number = 0
+        self._count = 0
+        self._segment_capacity = 0
+        self._first_sequence = 1
+        self._last = None
+        os.makedirs(directory, exist_ok=True)
+        self._resume()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self._directory, segment_name(self._exchange, self._prod_id, self._number))
+
+    @property
+    def sequence(self) -> int:
+        # sequence number of the next record
+        return self._first_sequence + self._count
+
+    @property
+    def segments(self) -> list:
+        return segment_paths(self._directory, self._exchange, self._prod_id)
+
+    def _resume(self) -> None:
+        paths = self.segments
+        if len(paths) == 0:
+            self._open(0, 1)
+            return
+
+        last = paths[-1]
+        number = int(os.path.basename(last)[-len("000000.ticks"):-len(".ticks")])
+        try:
+            self._file = open(last, "r+b")
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            capacity, first_sequence, committed = _read_header(self._map)
+        except (OSError, ValueError):
+            # a crash while creating the segment, before its header was written
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+            first_sequence = 1
+            if len(paths) > 1:
+                first_sequence = TickReader.header(paths[-2])[1] + TickReader.count(paths[-2])
+            self._open(number, first_sequence)
+            return
+
+        self._number = number
+        self._segment_capacity = capacity
+        self._first_sequence = first_sequence
+        self._count = _recover(self._map, capacity, first_sequence, committed)
+        if self._count >= capacity:
+            self._roll()
+
+    def _open(self, number: int, first_sequence: int) -> None:
+        self._number = number
+        self._first_sequence = first_sequence
+        self._segment_capacity = self._capacity
+        self._count = 0
+        self._file = open(self.path, "w+b")
+        # sparse on most file systems, pages are only allocated once written
+        self._file.truncate(_HEADER_SIZE + self._capacity * _RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        _HEADER.pack_into(self._map, 0, _MAGIC, _RECORD.size, self._capacity, first_sequence, 0)
+        self._map.flush()
+
+    def _close_segment(self) -> None:
+        if self._map is not None:
+            _HEADER.pack_into(self._map, 0, _MAGIC, _RECORD.size, self._segment_capacity, self._first_sequence,
+                              self._count)
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+    def _roll(self) -> None:
+        sequence = self.sequence
+        self._close_segment()
+        self._open(self._number + 1, sequence)
+
+    def record(self, timestamp: int, bid: float, ask: float, price: float) -> None:
+        if self._count >= self._segment_capacity:
+            self._roll()
+        offset = _HEADER_SIZE + self._count * _RECORD.size
+        _BODY.pack_into(self._map, offset, timestamp, bid, ask, price)
+        _SEQUENCE.pack_into(self._map, offset + _SEQUENCE_OFFSET, self._first_sequence + self._count)
+        self._count += 1
+
+    async def notify(self, ticker: Ticker) -> None:
+        timestamp, bid, ask, price = quote = (ticker.timestamp, ticker.bid, ticker.ask, ticker.price)
+        if timestamp is None or self._map is None:
+            return
+        # polling tickers report the same quote until the exchange has a new one
+        if quote == self._last:
+            return
+        self._last = quote
+        self.record(int(timestamp.timestamp()) * 1000000000 + timestamp.microsecond * 1000, bid, ask, price)
+
+    def flush(self) -> None:
+        # records survive a crash of the process as soon as they are written, this also makes them survive a crash
+        # of the machine
+        if self._map is not None:
+            _HEADER.pack_into(self._map, 0, _MAGIC, _RECORD.size, self._segment_capacity, self._first_sequence,
+                              self._count)
+            self._map.flush()
+
+    def close(self) -> None:
+        self._close_segment()
+
+
+class TickReader:
+    def __init__(self, directory: str, exchange: str, prod_id: str) -> None:
+        self._directory = directory
+        self._exchange = exchange
+        self._prod_id = prod_id
+
+    @property
+    def segments(self) -> list:
+        return segment_paths(self._directory, self._exchange, self._prod_id)
+
+    @staticmethod
+    def header(path: str) -> tuple:
+        # capacity, first sequence and committed records
+        with open(path, "rb") as file:
+            return _read_header(file.read(_HEADER_SIZE))
+
+    @staticmethod
+    def count(path: str) -> int:
+        with open(path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                capacity, first_sequence, committed = _read_header(buffer)
+                return _recover(buffer, capacity, first_sequence, committed)
+
+    @staticmethod
+    def segment(path: str):
+        # the complete records of a segment as a structured array mapped onto the file, nothing is copied; this works
+        # on a segment that is still being written
+        count = TickReader.count(path)
+        if np is not None:
+            if count == 0:
+                return np.zeros(0, dtype=TICK_DTYPE)
+            return np.memmap(path, dtype=TICK_DTYPE, mode="r", offset=_HEADER_SIZE, shape=(count,))
+        else:
+            with open(path, "rb") as file:
+                file.seek(_HEADER_SIZE)
+                return list(_RECORD.iter_unpack(file.read(count * _RECORD.size)))
+
+    def records(self) -> list:
+        return [TickReader.segment(path) for path in self.segments]
+
+    def ticks(self, t0: int = None, t1: int = None) -> Ticks:
+        # all ticks with t0 <= time < t1 as columns, eg. for MatchingEngine.from_ticks
+        segments = self.records()
+        if np is not None:
+            records = np.concatenate(segments) if len(segments) > 0 else np.zeros(0, dtype=TICK_DTYPE)
+            first = 0 if t0 is None else int(np.searchsorted(records["time"], t0))
+            last = len(records) if t1 is None else int(np.searchsorted(records["time"], t1))
+            records = records[first:max(first, last)]
+            return Ticks(records["time"], records["ask"], records["bid"], records["price"])
+        else:
+            records = [record for segment in segments for record in segment
+                       if (t0 is None or record[0] >= t0) and (t1 is None or record[0] < t1)]
+            return Ticks(array("q", (record[0] for record in records)),
+                         array("d", (record[2] for record in records)),
+                         array("d", (record[1] for record in records)),
+                         array("d", (record[3] for record in records)))
@@ -0,0 +1,190 @@
+from cryptrade.history import TickHistory
+
+from collections import deque
+from math import sqrt
+
+
+class RollingWindow:
+    # the ticks of the window are kept in a TickHistory (eg. a monitor's), the ones leaving the window are read back
+    # from its columns; capacity only applies to a history of its own, a full history drops its oldest ticks
+    def __init__(self, time_window: float, history: TickHistory = None, capacity: int = 65536) -> None:
+        self._time_window = time_window
+        self._window = self._nanoseconds(time_window)
+        self._history = history if history is not None else TickHistory(capacity)
+        self._history.clear()
+        self._columns = self._history.columns
+        self._capacity = self._history.capacity
+        self._sequence = 0
+
+        # monotonic deques of (sequence, value), front holds the extreme of the window
+        self._high = deque()
+        self._low = deque()
+        self._spread_high = deque()
+        self._spread_low = deque()
+
+        # running sums; prices are shifted by the first sample to keep the variance stable
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._volume = 0.0
+        self._value = 0.0
+        self._spread_sum = 0.0
+
+    @property
+    def history(self) -> TickHistory:
+        return self._history
+
+    @staticmethod
+    def _nanoseconds(timestamp: float) -> int:
+        # the history's unit; rounded to microseconds, the resolution of a datetime, which a float in seconds only
+        # approximates
+        return round(timestamp * 1000000) * 1000
+
+    def _evict(self, first: int, size: int, cutoff: int, minimum: int = 0) -> int:
+        # takes the ticks from index first on that are older than cutoff (at least minimum of them) out of the sums,
+        # returns their number for the history to drop them
+        times, asks, bids, prices, volumes = self._columns
+        capacity = self._capacity
+        index = first
+        high, low, spread_high, spread_low = self._high, self._low, self._spread_high, self._spread_low
+        sequence = self._sequence - size
+        shift = self._shift
+        count = 0
+        while count < size and (count < minimum or times[index] < cutoff):
+            count += 1
+            sequence += 1
+            if high[0][0] == sequence:
+                high.popleft()
+            if low[0][0] == sequence:
+                low.popleft()
+            if spread_high[0][0] == sequence:
+                spread_high.popleft()
+            if spread_low[0][0] == sequence:
+                spread_low.popleft()
+
+            shifted = prices[index] - shift
+            volume = volumes[index]
+            self._sum -= shifted
+            self._sum_sq -= shifted * shifted
+            self._volume -= volume
+            self._value -= shifted * volume
+            self._spread_sum -= asks[index] - bids[index]
+            index += 1
+            if index == capacity:
+                index = 0
+        if count == size:
+            # window ran empty, start over without accumulated rounding errors
+            self._sum = self._sum_sq = self._volume = self._value = self._spread_sum = 0.0
+        return count
+
+    def evict(self, now: float) -> None:
+        history = self._history
+        history.drop(self._evict(history.index(0), len(history), self._nanoseconds(now) - self._window))
+
+    def add(self, timestamp: float, price: float, bid: float = 0.0, ask: float = 0.0, volume: float = 1.0) -> None:
+        history = self._history
+        # _nanoseconds(), inlined
+        now = round(timestamp * 1000000) * 1000
+        size = len(history)
+        if size > 0:
+            first = history.index(0)
+            # a tick out of order (eg. a poll racing the stream) counts as of the newest one, the history stays sorted
+            newest = self._columns[0][(first + size - 1) % self._capacity]
+            if now < newest:
+                now = newest
+            # when the ring is full, the oldest tick is about to be overwritten
+            count = self._evict(first, size, now - self._window, 1 if size == self._capacity else 0)
+            if count > 0:
+                history.drop(count)
+                size -= count
+        if size == 0:
+            self._shift = price
+
+        self._sequence += 1
+        sequence = self._sequence
+        spread = ask - bid
+        history.append(now, ask, bid, price, volume)
+        # the pushes of the monotonic deques, inlined as this runs for every tick
+        extremes = self._high
+        while extremes and extremes[-1][1] <= price:
+            extremes.pop()
+        extremes.append((sequence, price))
+        extremes = self._low
+        while extremes and extremes[-1][1] >= price:
+            extremes.pop()
+        extremes.append((sequence, price))
+        extremes = self._spread_high
+        while extremes and extremes[-1][1] <= spread:
+            extremes.pop()
+        extremes.append((sequence, spread))
+        extremes = self._spread_low
+        while extremes and extremes[-1][1] >= spread:
+            extremes.pop()
+        extremes.append((sequence, spread))
+
+        shifted = price - self._shift
+        self._sum += shifted
+        self._sum_sq += shifted * shifted
+        self._volume += volume
+        self._value += shifted * volume
+        self._spread_sum += spread
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    @property
+    def oldest(self) -> float:
+        return self._history.oldest / 1e9 if len(self._history) > 0 else None
+
+    @property
+    def newest(self) -> float:
+        return self._history.newest / 1e9 if len(self._history) > 0 else None
+
+    @property
+    def high(self) -> float:
+        return self._high[0][1] if self._high else 0.0
+
+    @property
+    def low(self) -> float:
+        return self._low[0][1] if self._low else 0.0
+
+    @property
+    def average(self) -> float:
+        count = len(self._history)
+        return self._shift + self._sum / count if count > 0 else 0.0
+
+    @property
+    def vwap(self) -> float:
+        return self._shift + self._value / self._volume if self._volume > 0 else 0.0
+
+    @property
+    def variance(self) -> float:
+        count = len(self._history)
+        if count < 2:
+            return 0.0
+        mean = self._sum / count
+        return max((self._sum_sq - count * mean * mean) / (count - 1), 0.0)
+
+    @property
+    def std_dev(self) -> float:
+        return sqrt(self.variance)
+
+    @property
+    def spread(self) -> float:
+        if len(self._history) == 0:
+            return 0.0
+        tick = self._history[-1]
+        return float(tick.ask - tick.bid)
+
+    @property
+    def average_spread(self) -> float:
+        count = len(self._history)
+        return self._spread_sum / count if count > 0 else 0.0
+
+    @property
+    def max_spread(self) -> float:
+        return self._spread_high[0][1] if self._spread_high else 0.0
+
+    @property
+    def min_spread(self) -> float:
+        return self._spread_low[0][1] if self._spread_low else 0.0
@@ -0,0 +1,123 @@
+import asyncio
+import heapq
+import itertools
+import time
+from threading import Condition
+
+# request priorities, lower values go first
+PRIORITY_TRADE = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET = 2
+
+
+class RateLimit:
+    # usage counter that decays at a fixed rate, models token buckets as well as Kraken's API counter
+    def __init__(self, capacity: float, rate: float) -> None:
+        self._capacity = capacity
+        self._rate = rate
+        self._level = 0.0
+        self._updated = time.monotonic()
+
+    def _decay(self) -> None:
+        now = time.monotonic()
+        self._level = max(0.0, self._level - (now - self._updated) * self._rate)
+        self._updated = now
+
+    @property
+    def capacity(self) -> float:
+        return self._capacity
+
+    @property
+    def remaining(self) -> float:
+        self._decay()
+        return self._capacity - self._level
+
+    def wait_time(self, cost: float) -> float:
+        self._decay()
+        excess = self._level + min(cost, self._capacity) - self._capacity
+        return excess / self._rate if excess > 0 else 0.0
+
+    def consume(self, cost: float) -> None:
+        self._decay()
+        self._level += cost
+
+    def penalize(self) -> None:
+        # the exchange reported we're over the limit, regardless of what we counted ourselves
+        self._decay()
+        self._level = max(self._level, self._capacity)
+
+
+class RequestScheduler:
+    def __init__(self, rate_limits: dict, request_costs: dict) -> None:
+        # rate_limits: name -> (capacity, decay rate per second)
+        # request_costs: operation -> (priority, {rate limit name: weight})
+        self._limits = {name: RateLimit(capacity, rate) for name, (capacity, rate) in rate_limits.items()}
+        self._costs = request_costs
+        self._condition = Condition()
+        self._waiting = []
+        self._counter = itertools.count()
+
+    def _cost(self, operation: str) -> tuple:
+        priority, weights = self._costs.get(operation, (PRIORITY_MARKET, {}))
+        return priority, {name: weight for name, weight in weights.items() if name in self._limits}
+
+    def _try_acquire(self, ticket: tuple, weights: dict) -> float:
+        # returns 0 when the request may go ahead, otherwise the time to wait before trying again
+        for other, other_weights in self._waiting:
+            if other < ticket and other_weights.keys() & weights.keys():
+                # an earlier or more important request is waiting for the same budget
+                return 0.05
+        wait = max([self._limits[name].wait_time(weight) for name, weight in weights.items()], default=0.0)
+        if wait == 0.0:
+            for name, weight in weights.items():
+                self._limits[name].consume(weight)
+        return wait
+
+    def _enqueue(self, operation: str) -> tuple:
+        priority, weights = self._cost(operation)
+        ticket = (priority, next(self._counter))
+        heapq.heappush(self._waiting, (ticket, weights))
+        return ticket, weights
+
+    def _dequeue(self, ticket: tuple) -> None:
+        self._waiting = [entry for entry in self._waiting if entry[0] != ticket]
+        heapq.heapify(self._waiting)
+        self._condition.notify_all()
+
+    def acquire(self, operation: str) -> None:
+        if len(self._limits) == 0:
+            return
+        with self._condition:
+            ticket, weights = self._enqueue(operation)
+            try:
+                wait = self._try_acquire(ticket, weights)
+                while wait > 0:
+                    self._condition.wait(wait)
+                    wait = self._try_acquire(ticket, weights)
+            finally:
+                self._dequeue(ticket)
+
+    async def async_acquire(self, operation: str) -> None:
+        if len(self._limits) == 0:
+            return
+        with self._condition:
+            ticket, weights = self._enqueue(operation)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_acquire(ticket, weights)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            with self._condition:
+                self._dequeue(ticket)
+
+    def penalize(self, operation: str) -> None:
+        with self._condition:
+            for name in self._cost(operation)[1]:
+                self._limits[name].penalize()
+
+    def remaining(self) -> dict:
+        with self._condition:
+            return {name: limit.remaining for name, limit in self._limits.items()}
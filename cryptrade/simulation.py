@@ -0,0 +1,468 @@
+from cryptrade.exchange_api import TradeClient, Currency, Product, Ticker, Order, Account, OrderManager, ApiCreator
+from cryptrade.executions import ExecutionStream
+from cryptrade.history import Ticks
+
+import asyncio
+import heapq
+import itertools
+import sys
+from array import array
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class MatchingEngine:
+    # first and maximum number of ticks scanned at once when looking for the next fill
+    _min_chunk = 1024
+    _max_chunk = 1 << 20
+
+    def __init__(self, times, asks, bids, prices=None, volumes=None, maker_fee: float = 0.0, taker_fee: float = 0.0,
+                 balances: dict = None, details: dict = None) -> None:
+        # times in ns since the epoch; volumes, if given, is the size available per tick which allows partial fills
+        if np is not None:
+            self._times = np.asarray(times, dtype=np.int64)
+            self._asks = np.asarray(asks, dtype=np.float64)
+            self._bids = np.asarray(bids, dtype=np.float64)
+            self._prices = np.asarray(prices if prices is not None else (self._asks + self._bids) / 2,
+                                      dtype=np.float64)
+            self._volumes = np.asarray(volumes, dtype=np.float64) if volumes is not None else None
+        else:
+            self._times = array("q", times)
+            self._asks = array("d", asks)
+            self._bids = array("d", bids)
+            self._prices = array("d", prices if prices is not None else
+                                 [(ask + bid) / 2 for ask, bid in zip(asks, bids)])
+            self._volumes = array("d", volumes) if volumes is not None else None
+
+        if len(self._times) == 0:
+            raise ValueError("no ticks to replay")
+
+        self._maker_fee = maker_fee
+        self._taker_fee = taker_fee
+        self._balances = dict(balances or {})
+        self._details = details
+        self._index = 0
+        self._finished = False
+        self._finish_waiters = []
+        # resting orders: (-price, sequence, order) for buys, (price, sequence, order) for sells
+        self._buys = []
+        self._sells = []
+        # orders crossing the quote when they were submitted
+        self._incoming = []
+        self._remaining = {}
+        self._sequence = itertools.count()
+        self._order_ids = itertools.count(1)
+        self._fills = 0
+        self._fees = 0.0
+
+    @classmethod
+    def from_ticks(cls, ticks: Ticks, **kwargs) -> "MatchingEngine":
+        # eg. MatchingEngine.from_ticks(monitor.history.slice(t0, t1), maker_fee=CBApiCreator.maker_fee())
+        return cls(ticks.time, ticks.ask, ticks.bid, ticks.price, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def time(self) -> int:
+        return int(self._times[self._index])
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.time / 10 ** 9)
+
+    @property
+    def ask(self) -> float:
+        return float(self._asks[self._index])
+
+    @property
+    def bid(self) -> float:
+        return float(self._bids[self._index])
+
+    @property
+    def price(self) -> float:
+        return float(self._prices[self._index])
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @property
+    def maker_fee(self) -> float:
+        return self._maker_fee
+
+    @property
+    def taker_fee(self) -> float:
+        return self._taker_fee
+
+    @property
+    def balances(self) -> dict:
+        return dict(self._balances)
+
+    @property
+    def details(self) -> dict:
+        return self._details
+
+    @property
+    def fills(self) -> int:
+        return self._fills
+
+    @property
+    def fees(self) -> float:
+        return self._fees
+
+    @property
+    def resting(self) -> list:
+        return list(self._remaining)
+
+    def next_order_id(self) -> int:
+        return next(self._order_ids)
+
+    def _clean(self, book: list) -> None:
+        # cancelled orders are removed lazily
+        while len(book) > 0 and book[0][2] not in self._remaining:
+            heapq.heappop(book)
+
+    def _fill(self, order: "SimulatedOrder", amount: float, price: float, fee_rate: float) -> None:
+        remaining = self._remaining[order] - amount
+        value = amount * price
+        fee = value * fee_rate
+        trading = str(order.product.trading_currency)
+        buying = str(order.product.buying_currency)
+        if order.order_type == "buy":
+            self._balances[trading] = self._balances.get(trading, 0.0) + amount
+            self._balances[buying] = self._balances.get(buying, 0.0) - value - fee
+        else:
+            self._balances[trading] = self._balances.get(trading, 0.0) - amount
+            self._balances[buying] = self._balances.get(buying, 0.0) + value - fee
+        self._fills += 1
+        self._fees += fee
+
+        # amounts are multiples of the lot, anything below half a lot is rounding noise
+        done = remaining < order.product.lot_amount(1) / 2
+        if done:
+            del self._remaining[order]
+        else:
+            self._remaining[order] = remaining
+        order._apply_update({"status": "done" if done else "open",
+                             "filled_size": order.filled_size + amount,
+                             "executed_value": order.executed_value + value,
+                             "settled": done,
+                             "time": self.timestamp})
+
+    def _volume(self, index: int) -> float:
+        return float(self._volumes[index]) if self._volumes is not None else float("inf")
+
+    def _rest(self, order: "SimulatedOrder") -> None:
+        if order.order_type == "buy":
+            heapq.heappush(self._buys, (-order.price, next(self._sequence), order))
+        else:
+            heapq.heappush(self._sells, (order.price, next(self._sequence), order))
+
+    def submit(self, order: "SimulatedOrder") -> bool:
+        if self._finished:
+            return False
+
+        self._remaining[order] = order.amount
+        if (order.order_type == "buy" and self.ask <= order.price) or \
+                (order.order_type == "sell" and self.bid >= order.price):
+            # crosses the current quote, it's filled as taker on the next step so its owner gets notified
+            self._incoming.append(order)
+        else:
+            self._rest(order)
+        return True
+
+    def _take(self) -> list:
+        changed = []
+        volume = {"buy": self._volume(self._index), "sell": self._volume(self._index)}
+        for order in self._incoming:
+            if order not in self._remaining:
+                continue
+            amount = min(self._remaining[order], volume[order.order_type])
+            if amount > 0:
+                volume[order.order_type] -= amount
+                self._fill(order, amount, self.ask if order.order_type == "buy" else self.bid, self._taker_fee)
+                changed.append(order)
+            if order in self._remaining:
+                self._rest(order)
+        self._incoming.clear()
+        return changed
+
+    def cancel(self, order: "SimulatedOrder") -> None:
+        self._remaining.pop(order, None)
+
+    def _next_trigger(self, start: int) -> int:
+        # first tick at or after start that can fill a resting order: an ask at or below the best buy, or a bid at
+        # or above the best sell
+        self._clean(self._buys)
+        self._clean(self._sells)
+        best_buy = -self._buys[0][0] if len(self._buys) > 0 else float("-inf")
+        best_sell = self._sells[0][0] if len(self._sells) > 0 else float("inf")
+        end = len(self._times)
+
+        if np is None:
+            for index in range(start, end):
+                if self._asks[index] <= best_buy or self._bids[index] >= best_sell:
+                    return index
+            return end
+
+        # growing chunks: fills close by are found quickly, quiet stretches are skipped in large vectorized steps
+        chunk = self._min_chunk
+        while start < end:
+            stop = min(start + chunk, end)
+            hits = np.flatnonzero((self._asks[start:stop] <= best_buy) | (self._bids[start:stop] >= best_sell))
+            if len(hits) > 0:
+                return start + int(hits[0])
+            start = stop
+            chunk = min(2 * chunk, self._max_chunk)
+        return end
+
+    def _match(self, index: int) -> list:
+        changed = []
+        for book, crosses in [(self._buys, lambda price: self._asks[index] <= price),
+                              (self._sells, lambda price: self._bids[index] >= price)]:
+            volume = self._volume(index)
+            self._clean(book)
+            while len(book) > 0 and volume > 0 and crosses(abs(book[0][0])):
+                order = book[0][2]
+                amount = min(self._remaining[order], volume)
+                volume -= amount
+                self._fill(order, amount, order.price, self._maker_fee)
+                changed.append(order)
+                self._clean(book)
+        return changed
+
+    def _finish(self) -> list:
+        # end of the data, whatever still rests is cancelled
+        self._finished = True
+        self._index = len(self._times) - 1
+        orders = list(self._remaining)
+        for order in orders:
+            order._apply_update({"status": "canceled",
+                                 "filled_size": order.filled_size,
+                                 "executed_value": order.executed_value,
+                                 "settled": True,
+                                 "time": self.timestamp})
+        self._remaining.clear()
+        self._incoming.clear()
+        for waiter in self._finish_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        return orders
+
+    def advance(self) -> list:
+        # move to the next tick that fills a resting order, or just the next tick when nothing rests; returns the
+        # orders that changed
+        if self._finished:
+            return []
+        if len(self._incoming) > 0:
+            return self._take()
+        if len(self._remaining) == 0:
+            if self._index + 1 >= len(self._times):
+                return self._finish()
+            self._index += 1
+            return []
+
+        index = self._next_trigger(self._index + 1)
+        if index >= len(self._times):
+            return self._finish()
+        self._index = index
+        return self._match(index)
+
+    async def wait_finished(self) -> None:
+        if not self._finished:
+            waiter = asyncio.get_running_loop().create_future()
+            self._finish_waiters.append(waiter)
+            await waiter
+
+
+class SimulatedTradeClient(TradeClient):
+    def __init__(self, engine: MatchingEngine, max_workers: int = None) -> None:
+        super().__init__(max_workers)
+        self._engine = engine
+
+    @property
+    def engine(self) -> MatchingEngine:
+        return self._engine
+
+    async def run_in_executor(self, function, *args):
+        # the engine is not thread-safe and replay has to be deterministic, so everything runs on the event loop
+        return function(*args)
+
+
+class SimulatedProduct(Product):
+    def __init__(self, auth_client: SimulatedTradeClient, trading_currency: Currency,
+                 buying_currency: Currency) -> None:
+        super().__init__(auth_client, trading_currency, buying_currency)
+        if self._auth_client.engine.details is not None:
+            self._set_details(self._auth_client.engine.details)
+
+
+class SimulatedTicker(Ticker):
+    def __init__(self, auth_client: SimulatedTradeClient, product: SimulatedProduct) -> None:
+        super().__init__(auth_client, product)
+        self._name = "Simulation"
+
+    def update(self) -> None:
+        engine = self._auth_client.engine
+        self._set_quote(engine.bid, engine.ask, engine.price, engine.timestamp)
+
+
+class SimulatedOrder(Order):
+    def __init__(self, auth_client: SimulatedTradeClient, product: SimulatedProduct, order_type: str,
+                 price: float, amount: float) -> None:
+        try:
+            super().__init__(auth_client, product, order_type, price, amount)
+
+            if not self._product.valid_steps(self._amount_lots, self._price_ticks):
+                raise AttributeError("Invalid amount/price for order")
+            if self._order_type not in ["buy", "sell"]:
+                raise AttributeError(f"Invalid order-type: {self._order_type}")
+
+            self._created = True
+            self._order_id = self._auth_client.engine.next_order_id()
+            self._message = "order creation successful"
+            if not self._auth_client.engine.submit(self):
+                raise AttributeError("replay finished")
+
+        except Exception:
+            self._created = False
+            self._status = "error"
+            self._settled = True
+            self._message = f"Invalid order: {sys.exc_info()[1]}"
+
+    def _parse_update(self, order_update: dict) -> None:
+        self._status = order_update["status"]
+        self._filled_size = order_update["filled_size"]
+        self._executed_value = order_update["executed_value"]
+        self._settled = order_update["settled"]
+
+    def _apply_update(self, order_update: dict) -> bool:
+        changed = super()._apply_update(order_update)
+        # simulated time rather than the wall clock
+        if self._settled:
+            self._timestamp = order_update["time"]
+        return changed
+
+    def status(self) -> bool:
+        # every poll waits for the next fill in the data
+        if not self._settled:
+            self._auth_client.engine.advance()
+        return self._settled
+
+    def cancel(self) -> None:
+        if not self._settled:
+            self._auth_client.engine.cancel(self)
+            super().cancel()
+
+
+class SimulatedAccount(Account):
+    def __init__(self, auth_client: SimulatedTradeClient) -> None:
+        super().__init__(auth_client)
+        self._name = "Simulation"
+
+    def update(self) -> None:
+        self._balance = {currency: balance for currency, balance in self._auth_client.engine.balances.items()
+                         if balance != 0}
+        self._timestamp = self._auth_client.engine.timestamp
+
+
+class SimulatedExecutionStream(ExecutionStream):
+    # the engine itself is the stream: every step moves the replay to the next fill
+    # number of event loop passes the replay waits for new orders to be tracked before moving on without them
+    _patience = 100
+
+    async def track(self, order: Order) -> None:
+        # like buffered events on a real stream, fills from before the order was tracked are reported now
+        self._order_manager.track(order)
+        if order.filled_size > 0 or order.settled:
+            await order.notify()
+
+    def _untracked(self, engine: MatchingEngine) -> bool:
+        return any(self._order_manager.order(order.order_id) is not order for order in engine.resting)
+
+    async def produce(self, interval: int) -> None:
+        engine = self._auth_client.engine
+        waited = 0
+        while not engine.finished:
+            # the market only moves on once the strategy has handed over the orders it just placed, otherwise the
+            # replay could skip ahead to the end while the strategy is still between placing and tracking
+            if self._untracked(engine) and waited < self._patience:
+                waited += 1
+                await asyncio.sleep(0)
+                continue
+            waited = 0
+
+            changed = engine.advance()
+            for order in changed:
+                if order.settled:
+                    self._order_manager.untrack(order)
+                await order.notify()
+            # let the strategy react before the market moves on
+            await asyncio.gather(*[order.drain() for order in changed])
+            await asyncio.sleep(0)
+
+
+class SimulatedApiCreator(ApiCreator):
+    def __init__(self, engine: MatchingEngine) -> None:
+        self._engine = engine
+
+    @property
+    def engine(self) -> MatchingEngine:
+        return self._engine
+
+    def create_trade_client(self, credentials: dict = None, max_workers: int = None) -> SimulatedTradeClient:
+        return SimulatedTradeClient(self._engine, max_workers)
+
+    @staticmethod
+    def create_product(auth_client: SimulatedTradeClient, trading_currency: Currency,
+                       buying_currency: Currency) -> SimulatedProduct:
+        return SimulatedProduct(auth_client, trading_currency, buying_currency)
+
+    @staticmethod
+    def create_ticker(auth_client: SimulatedTradeClient, product: SimulatedProduct) -> SimulatedTicker:
+        return SimulatedTicker(auth_client, product)
+
+    @staticmethod
+    def create_streaming_ticker(auth_client: SimulatedTradeClient, product: SimulatedProduct) -> SimulatedTicker:
+        return SimulatedTicker(auth_client, product)
+
+    @staticmethod
+    def create_order(auth_client: SimulatedTradeClient, product: SimulatedProduct, order_type: str, price: float,
+                     amount: float) -> SimulatedOrder:
+        return SimulatedOrder(auth_client, product, order_type, price, amount)
+
+    @staticmethod
+    def create_account(auth_client: SimulatedTradeClient) -> SimulatedAccount:
+        return SimulatedAccount(auth_client)
+
+    @staticmethod
+    def create_execution_stream(auth_client: SimulatedTradeClient, order_manager: OrderManager,
+                                products: list = None) -> SimulatedExecutionStream:
+        return SimulatedExecutionStream(auth_client, order_manager, products)
+
+    def maker_fee(self) -> float:
+        return self._engine.maker_fee
+
+    def taker_fee(self) -> float:
+        return self._engine.taker_fee
+
+
+async def replay(strategy, engine: MatchingEngine) -> None:
+    # run a strategy coroutine until the tick data is exhausted
+    task = asyncio.ensure_future(strategy)
+    finished = asyncio.ensure_future(engine.wait_finished())
+    await asyncio.wait([task, finished], return_when=asyncio.FIRST_COMPLETED)
+    for future in [task, finished]:
+        future.cancel()
+    await asyncio.gather(task, finished, return_exceptions=True)
+    if task.done() and not task.cancelled() and task.exception() is not None:
+        raise task.exception()
@@ -0,0 +1,84 @@
+import websockets
+
+from cryptrade.exchange_api import TradeClient, Product, Ticker
+
+import asyncio
+import json
+from datetime import datetime
+
+
+class StreamingTicker(Ticker):
+    _stream_url = None
+    _reconnect_delay = 1
+    _max_reconnect_delay = 60
+
+    def __init__(self, auth_client: TradeClient, product: Product) -> None:
+        super().__init__(auth_client, product)
+        self._stream_url = type(self)._stream_url
+        self._connected = False
+
+    @property
+    def stream_url(self) -> str:
+        return self._stream_url
+
+    @stream_url.setter
+    def stream_url(self, url: str) -> None:
+        self._stream_url = url
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def _endpoint(self) -> str:
+        return self._stream_url
+
+    def _subscriptions(self) -> list:
+        # messages to send after (re)connecting
+        return []
+
+    def _parse(self, message) -> bool:
+        # update the quote from a decoded message, returns whether it was a quote at all
+        return False
+
+    async def _poll(self) -> None:
+        await self._auth_client.run_in_executor(self.update)
+
+    async def _stream(self) -> None:
+        delay = self._reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(self._endpoint()) as websocket:
+                    for subscription in self._subscriptions():
+                        await websocket.send(json.dumps(subscription))
+                    self._connected = True
+                    delay = self._reconnect_delay
+
+                    async for message in websocket:
+                        if self._parse(json.loads(message)):
+                            self._timestamp = datetime.now()
+                            await self.notify()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # connection lost or refused, reconnect after a while
+                pass
+            finally:
+                self._connected = False
+
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, self._max_reconnect_delay)
+
+    async def _fallback(self, interval: int) -> None:
+        # REST polling for as long as the socket is down
+        while True:
+            if not self._connected:
+                await self._poll()
+                await self.notify()
+            await asyncio.sleep(interval)
+
+    async def produce(self, interval: int) -> None:
+        if self._stream_url is None:
+            await self._fallback(interval)
+        else:
+            await asyncio.gather(self._stream(), self._fallback(interval))
@@ -0,0 +1,19 @@
+class SymbolIndex:
+    def __init__(self, symbol_map: dict) -> None:
+        self._forward = dict(symbol_map)
+        self._reverse = {}
+        for symbol, exchange_symbol in symbol_map.items():
+            # when several symbols share an exchange symbol the first one wins
+            self._reverse.setdefault(exchange_symbol, symbol)
+
+    def to_exchange(self, symbol: str) -> str:
+        return self._forward.get(symbol, symbol)
+
+    def from_exchange(self, exchange_symbol: str) -> str:
+        return self._reverse.get(exchange_symbol)
+
+    def __contains__(self, exchange_symbol: str) -> bool:
+        return exchange_symbol in self._reverse
+
+    def __len__(self) -> int:
+        return len(self._forward)
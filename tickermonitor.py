@@ -4,6 +4,8 @@ from cryptrade.binance import BinApiCreator
 from cryptrade.kraken import KrakenApiCreator
 from cryptrade.bitfinex import BfxApiCreator
 from cryptrade.monitor import TickerMonitor
+from cryptrade.consolidated import ConsolidatedQuote
+from cryptrade.observers import Observer
 
 import asyncio
 import json
@@ -23,6 +25,8 @@ ticker = {}
 ticker_log = {}
 trading_currency = {}
 buying_currency = {}
+# best bid and ask over all exchanges, after taker fees; reports price differences of more than 0.5%
+consolidated = ConsolidatedQuote(threshold=0.005, max_age=30)
 
 for exchange, api_factory in APIs.items():
     client[exchange] = api_factory.create_trade_client(credentials)
@@ -32,16 +36,26 @@ for exchange, api_factory in APIs.items():
                                                    buying_currency[exchange])
     ticker[exchange] = api_factory.create_ticker(client[exchange], product[exchange])
     ticker_log[exchange] = TickerMonitor(ticker[exchange], exchange + " / " + product[exchange].prod_id, 24 * 60 * 60)
+    consolidated.watch(exchange, ticker[exchange], api_factory.taker_fee())
 
 
 async def report(interval):
     while True:
         for k, v in APIs.items():
             print(ticker_log[k])
+        print(consolidated)
         await asyncio.sleep(interval)
 
 
+class OpportunityReporter(Observer):
+    async def notify(self, observable: ConsolidatedQuote) -> None:
+        opportunity = observable.opportunity
+        print(f"{opportunity.product}: buy on {opportunity.buy_venue} at {opportunity.buy_price}, sell on "
+              f"{opportunity.sell_venue} at {opportunity.sell_price}, {opportunity.edge:.2%} after fees")
+
+
 async def main():
+    OpportunityReporter(consolidated)
     ticker_tasks = [ticker[k].produce(15) for k, v in APIs.items()]
     output_tasks = [report(15)]
     tasks = ticker_tasks + output_tasks